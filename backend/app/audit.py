@@ -0,0 +1,211 @@
+# Fichier: app/audit.py - Journal d'activité, écrit en arrière-plan et par lots
+#
+# Les actions importantes (visites, utilisateurs, clients, produits) sont relevées par
+# des événements de session SQLAlchemy : after_flush note les objets créés, modifiés
+# ou supprimés, after_commit met les entrées en file ; rien n'est journalisé pour une
+# transaction (ou un SAVEPOINT) annulée. Les connexions sont notées directement par
+# la route /token.
+#
+# La requête ne fait que déposer l'entrée dans une file bornée, sans attendre : si la
+# file est pleine, l'entrée est abandonnée et comptée. Un thread la vide par lots dans
+# activite_logs (un INSERT multi-lignes par lot, dans la partition du mois), sur sa
+# propre connexion. Un lot refusé par la base n'est pas perdu en bloc : il est réécrit
+# sans les utilisateurs supprimés entre-temps, puis entrée par entrée.
+
+import datetime
+import logging
+import queue
+import threading
+
+from sqlalchemy import event, exc, inspect as sa_inspect, select
+
+from . import database, models, partitions
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+CLE_EN_ATTENTE = "audit_en_attente"
+
+# Modèles journalisés et leur libellé dans le texte de l'action
+ENTITES = {
+    models.User: "utilisateur",
+    models.Client: "client",
+    models.Produit: "produit",
+    models.Visite: "visite",
+}
+DECISIONS_VISITE = {"valide": "Validation", "rejete": "Rejet"}
+
+
+class JournalActivite:
+    """File bornée d'entrées du journal, vidée par lots par un thread d'arrière-plan."""
+
+    def __init__(self, taille_max: int, taille_lot: int, intervalle: float):
+        self._file = queue.Queue(maxsize=taille_max)
+        self._taille_lot = taille_lot
+        self._intervalle = intervalle
+        self._arret = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.ecrites = 0
+        self.abandonnees = 0
+        self.echecs = 0
+
+    def enregistrer(self, user_id, action: str, timestamp=None):
+        """Dépose une entrée sans jamais bloquer ; renvoie False si la file est pleine."""
+        entree = {"user_id": user_id, "action": action, "timestamp": timestamp or datetime.datetime.utcnow()}
+        try:
+            self._file.put_nowait(entree)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.abandonnees += 1
+            return False
+
+    def en_attente(self) -> int:
+        return self._file.qsize()
+
+    def demarrer(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._arret.clear()
+            self._thread = threading.Thread(target=self._boucle, name="journal-activite", daemon=True)
+            self._thread.start()
+
+    def arreter(self, timeout: float = 5.0):
+        """Arrête le thread après avoir écrit ce qui reste dans la file."""
+        self._arret.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def vider(self):
+        """Écrit tout ce qui est en file, dans le thread appelant."""
+        while True:
+            lot = self._prendre_lot(attente=None)
+            if not lot:
+                return
+            self._ecrire(lot)
+
+    def _boucle(self):
+        while not self._arret.is_set():
+            lot = self._prendre_lot(attente=self._intervalle)
+            if lot:
+                self._ecrire(lot)
+        self.vider()
+
+    def _prendre_lot(self, attente):
+        """Jusqu'à taille_lot entrées ; attend au plus `attente` secondes la première."""
+        try:
+            lot = [self._file.get(timeout=attente) if attente else self._file.get_nowait()]
+        except queue.Empty:
+            return []
+        while len(lot) < self._taille_lot:
+            try:
+                lot.append(self._file.get_nowait())
+            except queue.Empty:
+                break
+        return lot
+
+    def _ecrire(self, lot):
+        try:
+            _inserer(lot)
+        except exc.IntegrityError:
+            # Le plus souvent un utilisateur supprimé entre l'action et l'écriture du lot (ON
+            # DELETE SET NULL ne vaut que pour les lignes déjà écrites) : ses entrées sont
+            # gardées sans utilisateur, puis, si le lot échoue encore, écrites une à une
+            self._ecrire_une_a_une(_sans_utilisateurs_supprimes(lot))
+        except Exception:
+            logger.exception("Écriture du journal d'activité impossible (%d entrées perdues)", len(lot))
+            with self._lock:
+                self.echecs += len(lot)
+        else:
+            with self._lock:
+                self.ecrites += len(lot)
+
+    def _ecrire_une_a_une(self, lot):
+        try:
+            _inserer(lot)
+            ecrites = len(lot)
+        except Exception:
+            ecrites = 0
+            for entree in lot:
+                try:
+                    _inserer([entree])
+                    ecrites += 1
+                except Exception:
+                    logger.exception("Entrée du journal d'activité perdue : %r", entree)
+        with self._lock:
+            self.ecrites += ecrites
+            self.echecs += len(lot) - ecrites
+
+
+def _inserer(lot):
+    with database.engine.begin() as conn:
+        partitions.inserer(conn, lot)
+
+
+def _sans_utilisateurs_supprimes(lot):
+    """Le lot, user_id remis à None pour les utilisateurs qui n'existent plus."""
+    ids = {entree["user_id"] for entree in lot if entree["user_id"] is not None}
+    if not ids:
+        return lot
+    with database.engine.connect() as conn:
+        existants = set(conn.scalars(select(models.User.id).where(models.User.id.in_(ids))))
+    return [entree if entree["user_id"] in existants else {**entree, "user_id": None} for entree in lot]
+
+
+journal = JournalActivite(settings.audit_queue_max, settings.audit_batch_size, settings.audit_flush_interval)
+
+
+def _transaction(session):
+    return session.get_nested_transaction() or session.get_transaction()
+
+
+def noter(session, action: str):
+    """Ajoute une action à journaliser au commit de `session` (écritures hors unité de travail ORM)."""
+    session.info.setdefault(CLE_EN_ATTENTE, []).append((_transaction(session), action))
+
+
+def _action(obj, operation: str):
+    libelle = ENTITES[type(obj)]
+    if operation == "modification" and isinstance(obj, models.Visite):
+        statut = sa_inspect(obj).attrs.statut_validation.history.added
+        if statut and statut[0] in DECISIONS_VISITE:
+            return f"{DECISIONS_VISITE[statut[0]]} visite #{obj.id}"
+    return f"{operation.capitalize()} {libelle} #{obj.id}"
+
+
+@event.listens_for(database.SessionLocal, "after_flush")
+def _relever(session, flush_context):
+    for operation, objets in (("création", session.new), ("modification", session.dirty), ("suppression", session.deleted)):
+        for obj in objets:
+            if type(obj) not in ENTITES:
+                continue
+            if operation == "modification" and not session.is_modified(obj, include_collections=False):
+                continue
+            noter(session, _action(obj, operation))
+
+
+@event.listens_for(database.SessionLocal, "after_soft_rollback")
+def _abandonner(session, transaction_annulee):
+    en_attente = session.info.get(CLE_EN_ATTENTE)
+    if not en_attente:
+        return
+
+    def annulee(transaction):
+        while transaction is not None:
+            if transaction is transaction_annulee:
+                return True
+            transaction = transaction.parent
+        return False
+
+    en_attente[:] = [(transaction, action) for transaction, action in en_attente if not annulee(transaction)]
+
+
+@event.listens_for(database.SessionLocal, "after_commit")
+def _publier(session):
+    en_attente = session.info.pop(CLE_EN_ATTENTE, None)
+    if not en_attente:
+        return
+    user_id = getattr(session.info.get("request_state"), "user_id", None)
+    for _, action in en_attente:
+        journal.enregistrer(user_id, action)
@@ -0,0 +1,132 @@
+# Fichier: app/cache.py - Caches en mémoire du processus
+
+import hashlib
+import threading
+import time
+
+from .config import settings
+
+
+class TTLCache:
+    """
+    Dictionnaire protégé par un verrou dont les entrées expirent après `ttl` secondes.
+    L'invalidation explicite garde le cache exact dans ce processus ; la durée de vie
+    borne le retard vu par les autres processus (plusieurs workers uvicorn).
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = {}
+        # Date (monotonic) de la dernière invalidation de chaque clé
+        self._invalidated = {}
+
+    def get(self, key):
+        """Renvoie la valeur en cache, ou None si elle est absente ou expirée."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, stored_at = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, invalidated_at=None):
+        """
+        Mémorise `value`. `invalidated_at` est la valeur de invalidated_at(key) lue avant
+        de calculer `value` : si la clé a été invalidée entre-temps, `value` est peut-être
+        déjà périmée et n'est pas gardée.
+        """
+        with self._lock:
+            if self._invalidated.get(key) != invalidated_at:
+                return
+            self._entries[key] = (value, time.monotonic())
+
+    def invalidate(self, *keys):
+        now = time.monotonic()
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+                self._invalidated[key] = now
+
+    def invalidated_at(self, key):
+        with self._lock:
+            return self._invalidated.get(key)
+
+    def invalidated_within(self, key, seconds: float) -> bool:
+        """La clé a-t-elle été invalidée il y a moins de `seconds` secondes ?"""
+        invalidated_at = self.invalidated_at(key)
+        return invalidated_at is not None and time.monotonic() - invalidated_at < seconds
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class VersionedCache:
+    """
+    Réponses sérialisées par nom de table, valides tant que la version de la table
+    n'a pas changé. crud.py incrémente la version après chaque écriture validée ;
+    la durée de vie borne le retard des autres processus, qui ne voient pas ces
+    incréments. L'ETag est un hash du contenu : il reste identique d'un processus ou
+    d'une reconstruction à l'autre tant que les données ne changent pas.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}
+        # Date (monotonic) du dernier incrément de chaque table
+        self._bumped = {}
+
+    def version(self, nom: str) -> int:
+        with self._lock:
+            return self._versions.get(nom, 0)
+
+    def bump(self, *noms):
+        now = time.monotonic()
+        with self._lock:
+            for nom in noms:
+                self._versions[nom] = self._versions.get(nom, 0) + 1
+                self._bumped[nom] = now
+
+    def bumped_within(self, nom: str, seconds: float) -> bool:
+        """La table a-t-elle été modifiée il y a moins de `seconds` secondes ?"""
+        with self._lock:
+            bumped_at = self._bumped.get(nom)
+        return bumped_at is not None and time.monotonic() - bumped_at < seconds
+
+    def get(self, nom: str):
+        """(corps, etag) si l'entrée est à jour, sinon None."""
+        with self._lock:
+            entry = self._entries.get(nom)
+            if entry is None:
+                return None
+            version, body, etag, stored_at = entry
+            if version != self._versions.get(nom, 0) or time.monotonic() - stored_at > self.ttl:
+                del self._entries[nom]
+                return None
+            return body, etag
+
+    def set(self, nom: str, version: int, body: bytes):
+        """Mémorise `body` lu à la `version` donnée (lue avant la requête) ; renvoie son etag."""
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        with self._lock:
+            self._entries[nom] = (version, body, etag, time.monotonic())
+        return etag
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Tableau de bord superviseur, par superviseur_id ; invalidé par crud à chaque
+# création, validation ou rejet de visite de l'équipe.
+dashboard_superviseur = TTLCache(ttl=settings.dashboard_cache_ttl)
+
+# Listes de référence (/clients/, /produits/...) par nom de table ; versions
+# incrémentées par crud à chaque création, modification ou suppression.
+references = VersionedCache(ttl=settings.reference_cache_ttl)
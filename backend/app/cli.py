@@ -0,0 +1,99 @@
+# Fichier: app/cli.py - Tâches d'exploitation, à lancer à la main ou depuis cron
+#
+#   python -m app.cli reconcilier-compteurs
+#   python -m app.cli reconstruire-stats-mensuelles [--merchandiser ID]
+#   python -m app.cli purger-journal --garder-mois 12 [--archive DOSSIER]
+
+import argparse
+import csv
+import gzip
+import os
+
+from sqlalchemy import select
+
+from . import crud, database, partitions
+
+
+def reconcilier_compteurs(args):
+    db = database.SessionLocal()
+    try:
+        corrections = crud.reconcilier_compteurs(db)
+    finally:
+        db.close()
+    if not corrections:
+        print("Compteurs à jour, aucune correction.")
+    for cle, (avant, apres) in sorted(corrections.items()):
+        print(f"{cle}: {avant} -> {apres}")
+
+
+def reconstruire_stats_mensuelles(args):
+    db = database.SessionLocal()
+    try:
+        nb_lignes = crud.reconstruire_stats_mensuelles(db, args.merchandiser)
+    finally:
+        db.close()
+    print(f"{nb_lignes} cumul(s) mensuel(s) reconstruit(s).")
+
+
+def _archiver_partition(conn, mois, dossier):
+    """Copie une partition du journal dans DOSSIER/activite_logs_AAAA_MM.csv.gz ; renvoie le nombre de lignes."""
+    table = partitions.table_partition(mois)
+    chemin = os.path.join(dossier, f"{table.name}.csv.gz")
+    nb_lignes = 0
+    with gzip.open(chemin, "wt", newline="", encoding="utf-8") as fichier:
+        writer = csv.writer(fichier)
+        writer.writerow([colonne.name for colonne in table.columns])
+        result = conn.execute(select(table).order_by(table.c.timestamp, table.c.id).execution_options(stream_results=True, yield_per=crud.EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            writer.writerows(partition)
+            nb_lignes += len(partition)
+    return nb_lignes
+
+
+def purger_journal(args):
+    """
+    Rétention du journal d'activité : supprime les partitions mensuelles plus anciennes
+    que les --garder-mois derniers mois, après les avoir archivées si --archive est
+    donné, puis prépare les partitions du mois courant et du suivant.
+    """
+    if args.garder_mois < 1:
+        raise SystemExit("--garder-mois doit valoir au moins 1")
+    if args.archive:
+        os.makedirs(args.archive, exist_ok=True)
+    with database.engine.begin() as conn:
+        partitions.initialiser(conn)
+        expirees = partitions.partitions_expirees(conn, args.garder_mois)
+    if not expirees:
+        print("Aucune partition à supprimer.")
+    for mois in expirees:
+        # Une transaction par mois : une purge interrompue garde les mois déjà archivés
+        with database.engine.begin() as conn:
+            detail = ""
+            if args.archive:
+                detail = f", {_archiver_partition(conn, mois, args.archive)} entrée(s) archivée(s)"
+            partitions.supprimer(conn, mois)
+        print(f"{partitions.nom_partition(mois)} supprimée{detail}.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.cli", description="Tâches d'exploitation de l'API")
+    commandes = parser.add_subparsers(dest="commande", required=True)
+
+    commande = commandes.add_parser("reconcilier-compteurs", help="recalcule les compteurs du tableau de bord admin")
+    commande.set_defaults(func=reconcilier_compteurs)
+
+    commande = commandes.add_parser("reconstruire-stats-mensuelles", help="recalcule les cumuls mensuels par merchandiser à partir des visites")
+    commande.add_argument("--merchandiser", type=int, default=None, help="limiter le recalcul à ce merchandiser")
+    commande.set_defaults(func=reconstruire_stats_mensuelles)
+
+    commande = commandes.add_parser("purger-journal", help="supprime (et archive) les mois anciens du journal d'activité")
+    commande.add_argument("--garder-mois", type=int, default=12, help="nombre de mois gardés, mois courant compris (12 par défaut)")
+    commande.add_argument("--archive", default=None, help="dossier où copier chaque mois supprimé (CSV compressé)")
+    commande.set_defaults(func=purger_journal)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,248 @@
 # Fichier: app/crud.py - VERSION FINALE COMPLÈTE ET INTÉGRALE
 
-from sqlalchemy.orm import Session, joinedload
-from . import models, schemas, security
+import base64
+import binascii
+import datetime
+import json
+from typing import List, Optional
+
+from sqlalchemy import Date, bindparam, case, cast, delete, exc, func, insert, inspect as sa_inspect, select, tuple_, update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from . import audit, cache, models, schemas, search, security
+from .config import settings
+
+# --- Options de chargement dérivées des schémas de réponse ---
+# Registre (schéma de réponse, modèle ORM) -> options de chargement. Chaque relation
+# sérialisée par le schéma est chargée d'avance : joinedload pour les relations
+# simples (many-to-one), selectinload pour les collections. Une liste de N visites
+# coûte ainsi un nombre fixe de requêtes au lieu de N chargements paresseux.
+_LOADER_OPTIONS = {}
+
+def _build_loader_options(schema, model, parent=None):
+    mapper = sa_inspect(model)
+    options = []
+    for name, field in schema.model_fields.items():
+        nested = schemas.nested_schema(field.annotation)
+        relationship = mapper.relationships.get(name)
+        if nested is None or relationship is None:
+            continue
+        attribute = getattr(model, name)
+        strategy = "selectinload" if relationship.uselist else "joinedload"
+        if parent is None:
+            loader = selectinload(attribute) if relationship.uselist else joinedload(attribute)
+        else:
+            loader = getattr(parent, strategy)(attribute)
+        # On ne garde que les chaînes complètes : une chaîne charge aussi ses maillons intermédiaires.
+        options.extend(_build_loader_options(nested, relationship.mapper.class_, loader) or [loader])
+    return options
+
+def loader_options(schema, model):
+    """Options de chargement (mises en cache) pour sérialiser `model` avec le schéma `schema`."""
+    key = (schema, model)
+    if key not in _LOADER_OPTIONS:
+        _LOADER_OPTIONS[key] = _build_loader_options(schema, model)
+    return _LOADER_OPTIONS[key]
+
+# --- Compteurs du tableau de bord admin ---
+# Les totaux affichés par l'admin sont lus dans stat_compteurs au lieu de count(*)
+# sur des tables qui grossissent. Chaque écriture ajuste le compteur dans sa propre
+# transaction ; reconcilier_compteurs recalcule les valeurs exactes en cas d'écart.
+COMPTEUR_USERS = "users"
+COMPTEUR_VISITES = "visites"
+COMPTEUR_PRODUITS = "produits"
+
+def compteur_role(role_id: int) -> str:
+    return f"users_role:{role_id}"
+
+def _incrementer_compteur(db: Session, cle: str, delta: int = 1):
+    result = db.execute(
+        update(models.StatCompteur)
+        .where(models.StatCompteur.cle == cle)
+        .values(valeur=models.StatCompteur.valeur + delta)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        # Compteur jamais initialisé : la prochaine réconciliation corrigera sa valeur
+        db.execute(insert(models.StatCompteur).values(cle=cle, valeur=max(delta, 0)))
+
+def get_compteurs(db: Session):
+    return dict(db.query(models.StatCompteur.cle, models.StatCompteur.valeur).all())
+
+def get_compteur(db: Session, cle: str) -> int:
+    return db.query(models.StatCompteur.valeur).filter(models.StatCompteur.cle == cle).scalar() or 0
+
+def get_admin_dashboard_stats(db: Session):
+    compteurs = get_compteurs(db)
+    roles = db.query(models.Role.id, models.Role.nom).all()
+    return {
+        "totalUsers": compteurs.get(COMPTEUR_USERS, 0),
+        "totalVisits": compteurs.get(COMPTEUR_VISITES, 0),
+        "totalProducts": compteurs.get(COMPTEUR_PRODUITS, 0),
+        "rolesDistribution": {nom: compteurs.get(compteur_role(role_id), 0) for role_id, nom in roles},
+    }
+
+def reconcilier_compteurs(db: Session):
+    """
+    Recalcule tous les compteurs à partir des tables et corrige les écarts.
+    Les lignes de compteurs sont verrouillées d'abord : les écritures concurrentes
+    attendent la fin du recalcul et s'appliquent ensuite sur la valeur exacte.
+    Renvoie les corrections appliquées {cle: (ancienne valeur, nouvelle valeur)}.
+    """
+    actuels = dict(db.query(models.StatCompteur.cle, models.StatCompteur.valeur).with_for_update().all())
+    attendus = {
+        COMPTEUR_USERS: db.query(func.count(models.User.id)).scalar(),
+        COMPTEUR_VISITES: db.query(func.count(models.Visite.id)).scalar(),
+        COMPTEUR_PRODUITS: db.query(func.count(models.Produit.id)).scalar(),
+    }
+    for role_id, nb_users in (
+        db.query(models.Role.id, func.count(models.User.id))
+        .outerjoin(models.User, models.Role.id == models.User.role_id)
+        .group_by(models.Role.id)
+    ):
+        attendus[compteur_role(role_id)] = nb_users
+    corrections = {}
+    for cle, valeur in attendus.items():
+        if cle not in actuels:
+            db.add(models.StatCompteur(cle=cle, valeur=valeur))
+        elif actuels[cle] != valeur:
+            db.query(models.StatCompteur).filter(models.StatCompteur.cle == cle).update({models.StatCompteur.valeur: valeur})
+        else:
+            continue
+        corrections[cle] = (actuels.get(cle), valeur)
+    db.commit()
+    return corrections
+
+# --- Cumuls mensuels par merchandiser ---
+# stat_merchandiser_mois évite de parcourir tout l'historique des visites pour le
+# tableau de bord merchandiser : la création d'une visite ajoute sa quantité commandée
+# au mois de la visite, la validation (ou son annulation) ajuste les totaux validés.
+TYPE_DETAIL_COMMANDE = "commande"
+
+def premier_jour_du_mois(jour: datetime.date) -> datetime.date:
+    return jour.replace(day=1)
+
+def quantite_commandee(visite: schemas.VisiteCreate) -> int:
+    return sum(d.quantite for d in visite.details_produits if d.type_detail == TYPE_DETAIL_COMMANDE)
+
+def _ajuster_stat_mois(db: Session, merchandiser_id: int, mois: datetime.date, **deltas):
+    stat = models.StatMerchandiserMois
+    result = db.execute(
+        update(stat)
+        .where(stat.merchandiser_id == merchandiser_id, stat.mois == mois)
+        .values({nom: getattr(stat, nom) + delta for nom, delta in deltas.items()})
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount == 0:
+        db.execute(insert(stat).values(merchandiser_id=merchandiser_id, mois=mois, **{nom: max(delta, 0) for nom, delta in deltas.items()}))
+
+def _ajuster_stats_mois(db: Session, deltas):
+    """
+    _ajuster_stat_mois pour plusieurs (merchandiser_id, mois) : deltas est
+    {(merchandiser_id, mois): {colonne: delta}}, mêmes colonnes partout. Un seul UPDATE
+    exécuté en lot (executemany) au lieu d'un par cumul, puis les cumuls absents insérés.
+    """
+    if not deltas:
+        return
+    stat = models.StatMerchandiserMois
+    colonnes = list(next(iter(deltas.values())))
+    existants = set(db.execute(
+        select(stat.merchandiser_id, stat.mois).where(tuple_(stat.merchandiser_id, stat.mois).in_(list(deltas)))
+    ).all())
+    if existants:
+        table = stat.__table__
+        db.execute(
+            update(table)
+            .where(table.c.merchandiser_id == bindparam("cle_merchandiser"), table.c.mois == bindparam("cle_mois"))
+            .values({nom: table.c[nom] + bindparam(f"delta_{nom}") for nom in colonnes}),
+            [
+                {"cle_merchandiser": merchandiser_id, "cle_mois": mois, **{f"delta_{nom}": delta for nom, delta in deltas[(merchandiser_id, mois)].items()}}
+                for merchandiser_id, mois in existants
+            ],
+        )
+    manquants = [cle for cle in deltas if cle not in existants]
+    if manquants:
+        db.execute(insert(stat), [
+            {"merchandiser_id": merchandiser_id, "mois": mois, **{nom: max(delta, 0) for nom, delta in deltas[(merchandiser_id, mois)].items()}}
+            for merchandiser_id, mois in manquants
+        ])
+
+def get_stat_merchandiser_mois(db: Session, merchandiser_id: int, mois: datetime.date):
+    return db.get(models.StatMerchandiserMois, (merchandiser_id, premier_jour_du_mois(mois)))
+
+def _mois_expr(db: Session, colonne):
+    """Premier jour du mois de `colonne`, en SQL (PostgreSQL ou SQLite)."""
+    if db.get_bind().dialect.name == "sqlite":
+        return func.date(colonne, "start of month")
+    return cast(func.date_trunc("month", colonne), Date)
+
+def reconstruire_stats_mensuelles(db: Session, merchandiser_id: Optional[int] = None):
+    """
+    Recalcule stat_merchandiser_mois à partir des visites (tout l'historique, ou un seul
+    merchandiser) et remplace les lignes existantes dans une seule transaction.
+    À lancer hors des heures d'activité : une visite créée pendant le recalcul peut
+    être comptée deux fois ou pas du tout. Renvoie le nombre de lignes écrites.
+    """
+    quantites = (
+        select(models.DetailVisiteProduit.visite_id, func.sum(models.DetailVisiteProduit.quantite).label("quantite"))
+        .where(models.DetailVisiteProduit.type_detail == TYPE_DETAIL_COMMANDE)
+        .group_by(models.DetailVisiteProduit.visite_id)
+        .subquery()
+    )
+    mois = _mois_expr(db, models.Visite.date_visite)
+    quantite = func.coalesce(quantites.c.quantite, 0)
+    validee = models.Visite.statut_validation == 'valide'
+    stmt = (
+        select(
+            models.Visite.merchandiser_id,
+            mois,
+            func.count(models.Visite.id),
+            func.sum(case((validee, 1), else_=0)),
+            func.sum(quantite),
+            func.sum(case((validee, quantite), else_=0)),
+        )
+        .outerjoin(quantites, quantites.c.visite_id == models.Visite.id)
+        .where(models.Visite.merchandiser_id.is_not(None))
+        .group_by(models.Visite.merchandiser_id, mois)
+    )
+    suppression = delete(models.StatMerchandiserMois)
+    if merchandiser_id is not None:
+        stmt = stmt.where(models.Visite.merchandiser_id == merchandiser_id)
+        suppression = suppression.where(models.StatMerchandiserMois.merchandiser_id == merchandiser_id)
+    lignes = [
+        {
+            "merchandiser_id": m_id,
+            "mois": datetime.date.fromisoformat(m) if isinstance(m, str) else m,
+            "nb_visites": nb,
+            "nb_visites_validees": nb_validees,
+            "quantite_commandee": q,
+            "quantite_validee": q_validee,
+        }
+        for m_id, m, nb, nb_validees, q, q_validee in db.execute(stmt)
+    ]
+    db.execute(suppression)
+    if lignes:
+        db.execute(insert(models.StatMerchandiserMois), lignes)
+    db.commit()
+    return len(lignes)
 
 # --- Utilisateurs et Profils ---
 def get_user_by_email(db: Session, email: str):
     return db.query(models.User).options(joinedload(models.User.role), joinedload(models.User.merchandiser_profile), joinedload(models.User.superviseur_profile)).filter(models.User.email == email).first()
+def get_user(db: Session, user_id: int):
+    return db.query(models.User).options(joinedload(models.User.role)).filter(models.User.id == user_id).first()
+def get_token_version(db: Session, user_id: int):
+    """Version courante des jetons de l'utilisateur, ou None s'il n'existe plus."""
+    return db.query(models.User.token_version).filter(models.User.id == user_id).scalar()
 def create_user(db: Session, user: schemas.UserCreate):
     hashed_password = security.get_password_hash(user.password)
     db_user = models.User(email=user.email, nom=user.nom, password_hash=hashed_password, role_id=user.role_id)
     db.add(db_user)
+    _incrementer_compteur(db, COMPTEUR_USERS)
+    if user.role_id is not None:
+        _incrementer_compteur(db, compteur_role(user.role_id))
     db.commit()
     db.refresh(db_user)
+    search.indexer("users", db_user)
     return db_user
 # Dans app/crud.py
 
@@ -26,22 +257,47 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate):
     
     # On récupère les données envoyées SANS les valeurs non définies
     update_data = user_update.dict(exclude_unset=True)
+    ancien_role_id = db_user.role_id
     
     for key, value in update_data.items():
         # Utilise setattr pour mettre à jour les champs dynamiquement
         setattr(db_user, key, value)
+
+    # Un changement d'email, de rôle ou d'activation invalide les jetons déjà émis
+    revoquer = any(key in update_data for key in ("email", "role_id", "is_active"))
+    if revoquer:
+        db_user.token_version = (db_user.token_version or 0) + 1
+    if db_user.role_id != ancien_role_id:
+        if ancien_role_id is not None:
+            _incrementer_compteur(db, compteur_role(ancien_role_id), -1)
+        if db_user.role_id is not None:
+            _incrementer_compteur(db, compteur_role(db_user.role_id))
             
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    search.indexer("users", db_user)
+    if revoquer:
+        security.remember_token_version(db_user.id, db_user.token_version)
     return db_user
 
+def update_password_hash(db: Session, user_id: int, password_hash: str):
+    """Remplace le hash du mot de passe (recalcul après un changement du coût bcrypt)."""
+    db.query(models.User).filter(models.User.id == user_id).update({models.User.password_hash: password_hash})
+    db.commit()
+
 def create_superviseur_profile(db: Session, user_id: int):
     db_profile = models.Superviseur(user_id=user_id)
     db.add(db_profile)
     db.commit()
     db.refresh(db_profile)
     return db_profile
+def search_users(db: Session, query: str, limit: int = search.SEARCH_DEFAULT_LIMIT, prefix: bool = False, offset: int = 0):
+    return search.rechercher(db, "users", query, limit, prefix, loader_options(schemas.User, models.User), offset)
+
+def get_superviseurs(db: Session):
+    return db.query(models.Superviseur).options(*loader_options(schemas.Superviseur, models.Superviseur)).all()
+
 def create_merchandiser_profile(db: Session, profile: schemas.MerchandiserCreate):
     db_profile = models.Merchandiser(**profile.dict())
     db.add(db_profile)
@@ -74,7 +330,12 @@ def delete_user(db: Session, user_id: int):
     db_user = db.query(models.User).filter(models.User.id == user_id).first()
     if db_user:
         db.delete(db_user)
+        _incrementer_compteur(db, COMPTEUR_USERS, -1)
+        if db_user.role_id is not None:
+            _incrementer_compteur(db, compteur_role(db_user.role_id), -1)
         db.commit()
+        security.remember_token_version(user_id, None)
+        search.desindexer("users", user_id)
         return db_user
     return None
 
@@ -82,10 +343,12 @@ def delete_user(db: Session, user_id: int):
 def get_clients(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Client).offset(skip).limit(limit).all()
 def create_client(db: Session, client: schemas.ClientCreate):
-    db_client = models.Client(**client.dict())
+    db_client = models.Client(**client.dict(), version_sync=prochaine_version_sync(db))
     db.add(db_client)
     db.commit()
     db.refresh(db_client)
+    search.indexer("clients", db_client)
+    cache.references.bump("clients")
     return db_client
 
 
@@ -97,7 +360,10 @@ def delete_client(db: Session, client_id: int):
         # d'intégrité référentielle. Une vraie application gérerait ce cas
         # (ex: suppression en cascade ou anonymisation).
         db.delete(db_client)
+        _tracer_suppression(db, "clients", client_id)
         db.commit()
+        search.desindexer("clients", client_id)
+        cache.references.bump("clients")
         return db_client
     return None
 
@@ -108,22 +374,27 @@ def update_client(db: Session, client_id: int, client_update: schemas.ClientUpda
     update_data = client_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_client, key, value)
+    db_client.version_sync = prochaine_version_sync(db)
     db.add(db_client)
     db.commit()
     db.refresh(db_client)
+    search.indexer("clients", db_client)
+    cache.references.bump("clients")
     return db_client
 
-def search_clients(db: Session, query: str):
-    search_filter = models.Client.nom_client.ilike(f"%{query}%") | models.Client.contact.ilike(f"%{query}%")
-    return db.query(models.Client).filter(search_filter).all()
+def search_clients(db: Session, query: str, limit: int = search.SEARCH_DEFAULT_LIMIT, prefix: bool = False, offset: int = 0):
+    return search.rechercher(db, "clients", query, limit, prefix, (), offset)
 
 def get_produits(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.Produit).offset(skip).limit(limit).all()
+    return db.query(models.Produit).options(*loader_options(schemas.Produit, models.Produit)).offset(skip).limit(limit).all()
 def create_produit(db: Session, produit: schemas.ProduitCreate):
-    db_produit = models.Produit(**produit.dict())
+    db_produit = models.Produit(**produit.dict(), version_sync=prochaine_version_sync(db))
     db.add(db_produit)
+    _incrementer_compteur(db, COMPTEUR_PRODUITS)
     db.commit()
     db.refresh(db_produit)
+    search.indexer("produits", db_produit)
+    cache.references.bump("produits")
     return db_produit
 
 def delete_produit(db: Session, produit_id: int):
@@ -131,7 +402,11 @@ def delete_produit(db: Session, produit_id: int):
     db_produit = db.query(models.Produit).filter(models.Produit.id == produit_id).first()
     if db_produit:
         db.delete(db_produit)
+        _incrementer_compteur(db, COMPTEUR_PRODUITS, -1)
+        _tracer_suppression(db, "produits", produit_id)
         db.commit()
+        search.desindexer("produits", produit_id)
+        cache.references.bump("produits")
         return db_produit
     return None
 
@@ -143,14 +418,16 @@ def update_produit(db: Session, produit_id: int, produit_update: schemas.Produit
     update_data = produit_update.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_produit, key, value)
+    db_produit.version_sync = prochaine_version_sync(db)
     db.add(db_produit)
     db.commit()
     db.refresh(db_produit)
+    search.indexer("produits", db_produit)
+    cache.references.bump("produits")
     return db_produit
 
-def search_produits(db: Session, query: str):
-    search_filter = models.Produit.nom_produit.ilike(f"%{query}%") | models.Produit.marque.ilike(f"%{query}%")
-    return db.query(models.Produit).filter(search_filter).all()
+def search_produits(db: Session, query: str, limit: int = search.SEARCH_DEFAULT_LIMIT, prefix: bool = False, offset: int = 0):
+    return search.rechercher(db, "produits", query, limit, prefix, loader_options(schemas.Produit, models.Produit), offset)
 
 def get_categories_produit(db: Session, skip: int = 0, limit: int = 100):
     """Récupère la liste de toutes les catégories de produits."""
@@ -158,10 +435,11 @@ def get_categories_produit(db: Session, skip: int = 0, limit: int = 100):
 
 def create_categorie_produit(db: Session, categorie: schemas.CategorieProduitCreate):
     """Crée une nouvelle catégorie de produit."""
-    db_categorie = models.CategorieProduit(**categorie.dict())
+    db_categorie = models.CategorieProduit(**categorie.dict(), version_sync=prochaine_version_sync(db))
     db.add(db_categorie)
     db.commit()
     db.refresh(db_categorie)
+    cache.references.bump("categories_produit")
     return db_categorie
 
 def get_concurrent_by_nom(db: Session, nom: str):
@@ -169,32 +447,468 @@ def get_concurrent_by_nom(db: Session, nom: str):
 def get_concurrents(db: Session, skip: int = 0, limit: int = 100):
     return db.query(models.Concurrent).offset(skip).limit(limit).all()
 def create_concurrent(db: Session, concurrent: schemas.ConcurrentCreate):
-    db_concurrent = models.Concurrent(nom=concurrent.nom)
+    db_concurrent = models.Concurrent(nom=concurrent.nom, version_sync=prochaine_version_sync(db))
     db.add(db_concurrent)
     db.commit()
     db.refresh(db_concurrent)
+    cache.references.bump("concurrents")
     return db_concurrent
 
+# --- Synchronisation des données de référence (appareils mobiles) ---
+# Chaque écriture reçoit une version tirée d'un compteur global (ligne de
+# stat_compteurs verrouillée jusqu'au commit : les versions suivent l'ordre des
+# commits). Un appareil envoie le jeton reçu à sa dernière synchronisation et ne
+# reçoit que les lignes modifiées ou supprimées depuis, par pages, dans l'ordre
+# (version_sync, table, id) : le jeton encode la dernière position renvoyée.
+CLE_VERSION_SYNC = "version_sync_reference"
+SYNC_PAGE_SIZE = 500
+SYNC_MAX_PAGE_SIZE = 2000
+SYNC_TABLES = (
+    ("categories_produit", models.CategorieProduit, schemas.CategorieProduit),
+    ("produits", models.Produit, schemas.Produit),
+    ("concurrents", models.Concurrent, schemas.Concurrent),
+    ("clients", models.Client, schemas.Client),
+    ("suppressions", models.SuppressionReference, None),
+)
+
+def prochaine_version_sync(db: Session) -> int:
+    stat = models.StatCompteur
+    version = db.execute(
+        update(stat)
+        .where(stat.cle == CLE_VERSION_SYNC)
+        .values(valeur=stat.valeur + 1)
+        .returning(stat.valeur)
+        .execution_options(synchronize_session=False)
+    ).scalar()
+    if version is None:
+        version = 1
+        db.execute(insert(stat).values(cle=CLE_VERSION_SYNC, valeur=version))
+    return version
+
+def _tracer_suppression(db: Session, table_nom: str, objet_id: int):
+    db.add(models.SuppressionReference(table_nom=table_nom, objet_id=objet_id, version_sync=prochaine_version_sync(db)))
+
+def encode_sync_token(version: int, rang: int, objet_id: int) -> str:
+    raw = json.dumps([version, rang, objet_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_sync_token(token: Optional[str]):
+    """Position (version, rang de table, id) ; avant toute ligne si le jeton est absent."""
+    if not token:
+        return -1, 0, 0
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        version, rang, objet_id = (int(x) for x in json.loads(raw))
+        return version, rang, objet_id
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Jeton de synchronisation invalide")
+
+def sync_reference_stmts(since: Optional[str], limit: int):
+    """(rang, nom, requête) par table : au plus limit + 1 lignes après la position du jeton."""
+    version, rang_jeton, objet_id = decode_sync_token(since)
+    for rang, (nom, model, schema) in enumerate(SYNC_TABLES):
+        if rang == rang_jeton:
+            apres = tuple_(model.version_sync, model.id) > tuple_(version, objet_id)
+        elif rang > rang_jeton:
+            apres = model.version_sync >= version
+        else:
+            apres = model.version_sync > version
+        stmt = select(model).where(apres).order_by(model.version_sync, model.id).limit(limit + 1)
+        if schema is not None:
+            stmt = stmt.options(*loader_options(schema, model))
+        yield rang, nom, stmt
+
+def assembler_sync(lignes_par_table, since: Optional[str], limit: int):
+    """Fusionne les lignes de chaque table [(rang, nom, objets)] en une page ordonnée."""
+    fusion = sorted(
+        ((obj.version_sync, rang, obj.id, nom, obj) for rang, nom, objets in lignes_par_table for obj in objets),
+        key=lambda ligne: ligne[:3],
+    )
+    page = fusion[:limit]
+    reponse = {nom: [] for nom, _, _ in SYNC_TABLES}
+    for _, _, _, nom, obj in page:
+        if nom == "suppressions":
+            reponse[nom].append({"table": obj.table_nom, "id": obj.objet_id})
+        else:
+            reponse[nom].append(obj)
+    reponse["next_since"] = encode_sync_token(*page[-1][:3]) if page else (since or encode_sync_token(*decode_sync_token(None)))
+    reponse["has_more"] = len(fusion) > limit
+    return reponse
+
+def get_sync_reference(db: Session, since: Optional[str] = None, limit: int = SYNC_PAGE_SIZE):
+    limit = max(1, min(limit, SYNC_MAX_PAGE_SIZE))
+    lignes = [(rang, nom, db.scalars(stmt).all()) for rang, nom, stmt in sync_reference_stmts(since, limit)]
+    return assembler_sync(lignes, since, limit)
+
 # --- Visites ---
-def create_visite(db: Session, visite: schemas.VisiteCreate, merchandiser_id: int):
-    db_visite = models.Visite(client_id=visite.client_id, merchandiser_id=merchandiser_id, observations_generales=visite.observations_generales, fifo_respecte=visite.fifo_respecte, planogramme_respecte=visite.planogramme_respecte)
+def _lignes_visite(visite: schemas.VisiteCreate):
+    return (
+        (models.ReleveStock, visite.releves_stock),
+        (models.DetailVisiteProduit, visite.details_produits),
+        (models.VeilleConcurrentielle, visite.veilles_concurrentielles),
+    )
+
+def _ajouter_visite(db: Session, visite: schemas.VisiteCreate, merchandiser_id: int, idempotency_key: Optional[str] = None, bulk: Optional[bool] = None):
+    """
+    Ajoute la visite et ses lignes à la session, sans valider la transaction.
+    En mode `bulk` (par défaut, voir VISITE_BULK_INSERT), chaque table de lignes est
+    écrite par un seul INSERT multi-lignes au lieu d'un objet ORM par ligne ; la
+    visite est alors insérée immédiatement (flush) pour connaître son id.
+    """
+    if bulk is None:
+        bulk = settings.visite_bulk_insert
+    db_visite = models.Visite(client_id=visite.client_id, merchandiser_id=merchandiser_id, observations_generales=visite.observations_generales, fifo_respecte=visite.fifo_respecte, planogramme_respecte=visite.planogramme_respecte, idempotency_key=idempotency_key)
     db.add(db_visite)
-    for stock_item in visite.releves_stock:
-        db_stock = models.ReleveStock(**stock_item.dict(), visite=db_visite)
-        db.add(db_stock)
-    for detail_item in visite.details_produits:
-        db_detail = models.DetailVisiteProduit(**detail_item.dict(), visite=db_visite)
-        db.add(db_detail)
-    for veille_item in visite.veilles_concurrentielles:
-        db_veille = models.VeilleConcurrentielle(**veille_item.dict(), visite=db_visite)
-        db.add(db_veille)
+    _incrementer_compteur(db, COMPTEUR_VISITES)
+    _ajuster_stat_mois(db, merchandiser_id, premier_jour_du_mois(datetime.date.today()), nb_visites=1, quantite_commandee=quantite_commandee(visite))
+    if bulk:
+        db.flush()
+        for model, items in _lignes_visite(visite):
+            if items:
+                db.execute(insert(model), [dict(item.dict(), visite_id=db_visite.id) for item in items])
+        return db_visite
+    for model, items in _lignes_visite(visite):
+        for item in items:
+            db.add(model(**item.dict(), visite=db_visite))
+    return db_visite
+
+def create_visite(db: Session, visite: schemas.VisiteCreate, merchandiser_id: int, bulk: Optional[bool] = None):
+    db_visite = _ajouter_visite(db, visite, merchandiser_id, bulk=bulk)
     db.commit()
+    invalider_dashboard_merchandiser(db, merchandiser_id)
     db.refresh(db_visite)
     return db_visite
 
+def create_visites_batch(db: Session, items: List[schemas.VisiteBatchItem], merchandiser_id: int):
+    """
+    Insère un lot de visites dans une seule transaction, chacune dans son SAVEPOINT.
+    Un renvoi (même clé d'idempotence) est détecté par l'index unique
+    (merchandiser_id, idempotency_key) : pas de lecture avant l'écriture, on ne relit
+    la visite existante qu'après un conflit.
+    """
+    results = []
+    for item in items:
+        try:
+            with db.begin_nested():
+                db_visite = _ajouter_visite(db, item.visite, merchandiser_id, item.idempotency_key)
+            results.append({"idempotency_key": item.idempotency_key, "statut": "cree", "visite_id": db_visite.id})
+        except exc.IntegrityError as e:
+            existante = (
+                db.query(models.Visite.id)
+                .filter(models.Visite.merchandiser_id == merchandiser_id, models.Visite.idempotency_key == item.idempotency_key)
+                .scalar()
+            )
+            if existante is not None:
+                results.append({"idempotency_key": item.idempotency_key, "statut": "doublon", "visite_id": existante})
+            else:
+                results.append({"idempotency_key": item.idempotency_key, "statut": "erreur", "detail": str(e.orig)})
+        except exc.DBAPIError as e:
+            results.append({"idempotency_key": item.idempotency_key, "statut": "erreur", "detail": str(e.orig)})
+    db.commit()
+    if any(r["statut"] == "cree" for r in results):
+        invalider_dashboard_merchandiser(db, merchandiser_id)
+    return results
+
+def _visites_equipe(superviseur_id: int):
+    """Filtre des visites des merchandisers de l'équipe du superviseur."""
+    return models.Visite.merchandiser_id.in_(select(models.Merchandiser.id).where(models.Merchandiser.manager_id == superviseur_id))
+
+def _quantites_commandees(db: Session, visite_ids):
+    """Quantité commandée par visite (les visites sans commande sont absentes)."""
+    detail = models.DetailVisiteProduit
+    return dict(db.execute(
+        select(detail.visite_id, func.sum(detail.quantite))
+        .where(detail.visite_id.in_(visite_ids), detail.type_detail == TYPE_DETAIL_COMMANDE)
+        .group_by(detail.visite_id)
+    ).all())
+
+def changer_statut_visite(db: Session, visite_id: int, statut: str, validateur_id: int):
+    """Valide ou rejette une visite de l'équipe du superviseur ; renvoie None si elle n'existe pas ou n'en fait pas partie."""
+    db_visite = db.query(models.Visite).filter(models.Visite.id == visite_id, _visites_equipe(validateur_id)).first()
+    if not db_visite:
+        return None
+    sens = (statut == 'valide') - (db_visite.statut_validation == 'valide')
+    if sens:
+        quantite = _quantites_commandees(db, [visite_id]).get(visite_id, 0)
+        _ajuster_stat_mois(db, db_visite.merchandiser_id, premier_jour_du_mois(db_visite.date_visite), nb_visites_validees=sens, quantite_validee=sens * quantite)
+    db_visite.statut_validation = statut
+    db_visite.validateur_id = validateur_id
+    db_visite.date_validation = datetime.date.today()
+    db.commit()
+    cache.dashboard_superviseur.invalidate(validateur_id)
+    db.refresh(db_visite)
+    return db_visite
+
+def decider_visites_batch(db: Session, visite_ids: List[int], statut: str, superviseur_id: int):
+    """
+    Valide ou rejette d'un coup les visites 'soumis' de l'équipe parmi `visite_ids` :
+    un seul UPDATE ... RETURNING, puis les cumuls mensuels ajustés en un UPDATE groupé.
+    Renvoie un résultat par id demandé : le nouveau statut, 'deja_traitee' (visite de
+    l'équipe qui n'est plus 'soumis') ou 'introuvable' (inexistante ou hors de l'équipe).
+    """
+    ids = list(dict.fromkeys(visite_ids))
+    traitees = db.execute(
+        update(models.Visite)
+        .where(models.Visite.id.in_(ids), models.Visite.statut_validation == 'soumis', _visites_equipe(superviseur_id))
+        .values(statut_validation=statut, validateur_id=superviseur_id, date_validation=datetime.date.today())
+        .returning(models.Visite.id, models.Visite.merchandiser_id, models.Visite.date_visite)
+        .execution_options(synchronize_session=False)
+    ).all()
+    if statut == 'valide' and traitees:
+        quantites = _quantites_commandees(db, [visite.id for visite in traitees])
+        cumuls = {}
+        for visite_id, merchandiser_id, date_visite in traitees:
+            cle = (merchandiser_id, premier_jour_du_mois(date_visite))
+            nb, quantite = cumuls.get(cle, (0, 0))
+            cumuls[cle] = (nb + 1, quantite + quantites.get(visite_id, 0))
+        _ajuster_stats_mois(db, {
+            cle: {"nb_visites_validees": nb, "quantite_validee": quantite} for cle, (nb, quantite) in cumuls.items()
+        })
+    traitees_ids = {visite.id for visite in traitees}
+    for visite_id in traitees_ids:
+        # UPDATE hors unité de travail : non vu par les événements de flush
+        audit.noter(db, f"{audit.DECISIONS_VISITE[statut]} visite #{visite_id}")
+    restants = [visite_id for visite_id in ids if visite_id not in traitees_ids]
+    deja_traitees = set()
+    if restants:
+        deja_traitees = set(db.scalars(select(models.Visite.id).where(models.Visite.id.in_(restants), _visites_equipe(superviseur_id))))
+    db.commit()
+    if traitees:
+        cache.dashboard_superviseur.invalidate(superviseur_id)
+    return [
+        {"visite_id": visite_id, "statut": statut if visite_id in traitees_ids else 'deja_traitee' if visite_id in deja_traitees else 'introuvable'}
+        for visite_id in visite_ids
+    ]
+
+def visite_detail_stmt(visite_id: int):
+    return (
+        select(models.Visite)
+        .options(*loader_options(schemas.VisiteDetail, models.Visite))
+        .where(models.Visite.id == visite_id)
+    )
+
+def get_visite_detail(db: Session, visite_id: int):
+    return db.scalars(visite_detail_stmt(visite_id)).first()
+
+# --- Tableau de bord superviseur ---
+def dashboard_superviseur_stmt(superviseur_id: int):
+    """
+    Une seule requête pour tout le tableau de bord : nombre de visites par
+    (merchandiser, statut) sur l'équipe. Le LEFT JOIN garde les merchandisers sans
+    visite (ligne avec statut NULL et total 0).
+    """
+    equipe = (
+        select(models.Merchandiser.id.label("merchandiser_id"), models.User.nom.label("nom"))
+        .join(models.User, models.Merchandiser.user_id == models.User.id)
+        .where(models.Merchandiser.manager_id == superviseur_id)
+        .cte("equipe")
+    )
+    return (
+        select(equipe.c.merchandiser_id, equipe.c.nom, models.Visite.statut_validation, func.count(models.Visite.id))
+        .select_from(equipe)
+        .outerjoin(models.Visite, models.Visite.merchandiser_id == equipe.c.merchandiser_id)
+        .group_by(equipe.c.merchandiser_id, equipe.c.nom, models.Visite.statut_validation)
+        .order_by(equipe.c.merchandiser_id)
+    )
+
+def agreger_dashboard_superviseur(rows):
+    """Construit la réponse du tableau de bord à partir des lignes de dashboard_superviseur_stmt."""
+    statuts = {}
+    performance = {}
+    for merchandiser_id, nom, statut, total in rows:
+        membre = performance.setdefault(merchandiser_id, {"merchandiser_id": merchandiser_id, "nom": nom, "visites": 0})
+        if statut is None:
+            continue
+        membre["visites"] += total
+        statuts[statut] = statuts.get(statut, 0) + total
+    return {
+        "visitesEnAttente": statuts.get("soumis", 0),
+        "statutsData": statuts,
+        "performanceEquipe": list(performance.values()),
+    }
+
+def get_dashboard_superviseur(db: Session, superviseur_id: int):
+    stats = cache.dashboard_superviseur.get(superviseur_id)
+    if stats is None:
+        # Lue avant la requête : une invalidation survenue pendant le calcul empêche la mise en cache
+        invalidated_at = cache.dashboard_superviseur.invalidated_at(superviseur_id)
+        stats = agreger_dashboard_superviseur(db.execute(dashboard_superviseur_stmt(superviseur_id)).all())
+        cache.dashboard_superviseur.set(superviseur_id, stats, invalidated_at)
+    return stats
+
+def invalider_dashboard_merchandiser(db: Session, merchandiser_id: int):
+    """Invalide le tableau de bord en cache du superviseur de ce merchandiser (après commit)."""
+    manager_id = db.query(models.Merchandiser.manager_id).filter(models.Merchandiser.id == merchandiser_id).scalar()
+    if manager_id is not None:
+        cache.dashboard_superviseur.invalidate(manager_id)
+
+# --- Pagination par curseur (keyset) des listes de visites ---
+# Le curseur opaque encode (date_visite, id) de la dernière ligne renvoyée : la page
+# suivante reprend juste après via une comparaison de tuples, ce qui coûte le même
+# prix quelle que soit la profondeur (contrairement à OFFSET).
+# Les requêtes sont construites ici et partagées avec crud_async.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def encode_cursor(date_visite: datetime.date, visite_id: int) -> str:
+    raw = json.dumps([date_visite.isoformat(), visite_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        date_visite, visite_id = json.loads(raw)
+        return datetime.date.fromisoformat(date_visite), int(visite_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Curseur de pagination invalide")
+
+def visites_validees_stmt():
+    return select(models.Visite).where(models.Visite.statut_validation == 'valide')
+
+def visites_en_attente_stmt():
+    return select(models.Visite).where(models.Visite.statut_validation == 'soumis')
+
+def visites_equipe_stmt(superviseur_id: int, statut: str):
+    return (
+        select(models.Visite)
+        .join(models.Merchandiser)
+        .where(models.Visite.statut_validation == statut, models.Merchandiser.manager_id == superviseur_id)
+    )
+
+def visites_flux_stmt(stmt, cursor: Optional[str] = None):
+    """Ajoute à `stmt` le tri des listes de visites et le curseur, sans limite."""
+    stmt = stmt.options(*loader_options(schemas.VisiteInfo, models.Visite))
+    if cursor:
+        stmt = stmt.where(tuple_(models.Visite.date_visite, models.Visite.id) < tuple_(*decode_cursor(cursor)))
+    return stmt.order_by(models.Visite.date_visite.desc(), models.Visite.id.desc())
+
+def page_visites_stmt(stmt, cursor: Optional[str], limit: int):
+    """Ajoute tri, curseur et limite à `stmt` ; renvoie (requête, taille de page effective)."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    # On lit une ligne de plus pour savoir s'il existe une page suivante.
+    return visites_flux_stmt(stmt, cursor).limit(limit + 1), limit
+
+def page_visites(rows, limit: int):
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].date_visite, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
+
+def _paginer_visites(db: Session, stmt, cursor: Optional[str], limit: int):
+    stmt, limit = page_visites_stmt(stmt, cursor, limit)
+    return page_visites(db.scalars(stmt).all(), limit)
+
+def get_visites_validees(db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return _paginer_visites(db, visites_validees_stmt(), cursor, limit)
+
+def get_visites_en_attente(db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return _paginer_visites(db, visites_en_attente_stmt(), cursor, limit)
+
+def get_visites_en_attente_equipe(db: Session, superviseur_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return _paginer_visites(db, visites_equipe_stmt(superviseur_id, 'soumis'), cursor, limit)
+
+def get_historique_visites_equipe(db: Session, superviseur_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return _paginer_visites(db, visites_equipe_stmt(superviseur_id, 'valide'), cursor, limit)
+
+# --- Export CSV ---
+EXPORT_BATCH_SIZE = 1000
+
+def export_visites_validees_stmt(
+    superviseur_id: int,
+    date_debut: Optional[datetime.date] = None,
+    date_fin: Optional[datetime.date] = None,
+):
+    stmt = (
+        select(
+            models.Visite.id,
+            models.Visite.date_visite,
+            models.User.nom,
+            models.Client.nom_client,
+            models.Visite.statut_validation,
+            models.Visite.validateur_id,
+        )
+        .join(models.Merchandiser, models.Visite.merchandiser_id == models.Merchandiser.id)
+        .join(models.User, models.Merchandiser.user_id == models.User.id)
+        .outerjoin(models.Client, models.Visite.client_id == models.Client.id)
+        .where(models.Visite.statut_validation == 'valide', models.Merchandiser.manager_id == superviseur_id)
+        .order_by(models.Visite.date_visite, models.Visite.id)
+    )
+    if date_debut:
+        stmt = stmt.where(models.Visite.date_visite >= date_debut)
+    if date_fin:
+        stmt = stmt.where(models.Visite.date_visite <= date_fin)
+    return stmt
+
+def iter_export_visites_validees(
+    db: Session,
+    superviseur_id: int,
+    date_debut: Optional[datetime.date] = None,
+    date_fin: Optional[datetime.date] = None,
+):
+    """
+    Itère sur les visites validées de l'équipe, colonne par colonne et sans objets ORM.
+    Les lignes sont lues par lots depuis un curseur côté serveur (stream_results),
+    la mémoire utilisée ne dépend donc pas du nombre de visites exportées.
+    """
+    stmt = export_visites_validees_stmt(superviseur_id, date_debut, date_fin)
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+def users_flux_stmt():
+    return select(models.User).options(*loader_options(schemas.User, models.User)).order_by(models.User.id)
+
+def iter_par_lots(db: Session, stmt):
+    """
+    Itère sur les objets ORM de `stmt` lus par lots depuis un curseur côté serveur,
+    comme l'export CSV : la mémoire utilisée ne dépend pas du nombre de lignes.
+    Les relations de `stmt` doivent être chargées d'avance (loader_options).
+    """
+    result = db.scalars(stmt.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE))
+    for partition in result.partitions():
+        yield from partition
+
+# --- Journal d'activité ---
+# Dernières activités d'abord, page par page : le curseur encode (timestamp, id) de la
+# dernière entrée renvoyée, comme pour les listes de visites. Lecture servie par
+# l'index (timestamp DESC, id DESC) de chaque partition mensuelle (voir partitions.py).
+DEFAULT_ACTIVITE_PAGE_SIZE = 10
+MAX_ACTIVITE_PAGE_SIZE = 100
+
+def encode_cursor_activite(timestamp: datetime.datetime, log_id: int) -> str:
+    raw = json.dumps([timestamp.isoformat(), log_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def decode_cursor_activite(cursor: str):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, log_id = json.loads(raw)
+        return datetime.datetime.fromisoformat(timestamp), int(log_id)
+    except (binascii.Error, UnicodeDecodeError, TypeError, ValueError):
+        raise ValueError("Curseur de pagination invalide")
+
+def activity_logs_stmt(cursor: Optional[str], limit: int):
+    """Page du journal (une ligne de plus pour savoir s'il y a une suite) ; renvoie (requête, limite)."""
+    limit = max(1, min(limit, MAX_ACTIVITE_PAGE_SIZE))
+    log = models.ActiviteLog
+    stmt = select(log).options(*loader_options(schemas.ActiviteLog, log))
+    if cursor:
+        timestamp, log_id = decode_cursor_activite(cursor)
+        # La borne simple sur timestamp écarte d'emblée les partitions plus récentes
+        stmt = stmt.where(log.timestamp <= timestamp, tuple_(log.timestamp, log.id) < tuple_(timestamp, log_id))
+    return stmt.order_by(log.timestamp.desc(), log.id.desc()).limit(limit + 1), limit
+
+def get_activity_logs(db: Session, cursor: Optional[str] = None, limit: int = DEFAULT_ACTIVITE_PAGE_SIZE):
+    stmt, limit = activity_logs_stmt(cursor, limit)
+    rows = db.scalars(stmt).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor_activite(rows[-1].timestamp, rows[-1].id)
+    return {"items": rows, "next_cursor": next_cursor}
 
 def log_activity(db: Session, user_id: int, action: str):
-    """Enregistre une nouvelle activité dans le journal."""
-    db_log = models.ActiviteLog(user_id=user_id, action=action)
-    db.add(db_log)
+    """Enregistre une nouvelle activité dans le journal (écrite en arrière-plan, voir audit.py)."""
+    audit.journal.enregistrer(user_id, action)
     
\ No newline at end of file
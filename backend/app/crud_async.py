@@ -0,0 +1,68 @@
+# Fichier: app/crud_async.py - Versions asynchrones des lectures de crud.py
+#
+# Mêmes requêtes que crud.py (construites par les mêmes fonctions), exécutées sur une
+# AsyncSession. Les relations sérialisées doivent être chargées d'avance : le
+# chargement paresseux n'est pas possible en asynchrone.
+
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from . import cache, crud, models, schemas
+from .crud import DEFAULT_PAGE_SIZE, loader_options
+
+# --- Utilisateurs ---
+async def get_token_version(db: AsyncSession, user_id: int):
+    """Version courante des jetons de l'utilisateur, ou None s'il n'existe plus."""
+    return await db.scalar(select(models.User.token_version).where(models.User.id == user_id))
+
+# --- Synchronisation des données de référence ---
+async def get_sync_reference(db: AsyncSession, since: Optional[str] = None, limit: int = crud.SYNC_PAGE_SIZE):
+    limit = max(1, min(limit, crud.SYNC_MAX_PAGE_SIZE))
+    lignes = [(rang, nom, (await db.scalars(stmt)).all()) for rang, nom, stmt in crud.sync_reference_stmts(since, limit)]
+    return crud.assembler_sync(lignes, since, limit)
+
+# --- Tableau de bord superviseur ---
+async def get_dashboard_superviseur(db: AsyncSession, superviseur_id: int):
+    stats = cache.dashboard_superviseur.get(superviseur_id)
+    if stats is None:
+        invalidated_at = cache.dashboard_superviseur.invalidated_at(superviseur_id)
+        rows = (await db.execute(crud.dashboard_superviseur_stmt(superviseur_id))).all()
+        stats = crud.agreger_dashboard_superviseur(rows)
+        cache.dashboard_superviseur.set(superviseur_id, stats, invalidated_at)
+    return stats
+
+# --- Données de Référence ---
+async def get_clients(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (await db.scalars(select(models.Client).offset(skip).limit(limit))).all()
+
+async def get_produits(db: AsyncSession, skip: int = 0, limit: int = 100):
+    stmt = select(models.Produit).options(*loader_options(schemas.Produit, models.Produit)).offset(skip).limit(limit)
+    return (await db.scalars(stmt)).all()
+
+async def get_categories_produit(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (await db.scalars(select(models.CategorieProduit).offset(skip).limit(limit))).all()
+
+async def get_concurrents(db: AsyncSession, skip: int = 0, limit: int = 100):
+    return (await db.scalars(select(models.Concurrent).offset(skip).limit(limit))).all()
+
+# --- Visites ---
+async def get_visite_detail(db: AsyncSession, visite_id: int):
+    return (await db.scalars(crud.visite_detail_stmt(visite_id))).first()
+
+async def _paginer_visites(db: AsyncSession, stmt, cursor: Optional[str], limit: int):
+    stmt, limit = crud.page_visites_stmt(stmt, cursor, limit)
+    return crud.page_visites((await db.scalars(stmt)).all(), limit)
+
+async def get_visites_validees(db: AsyncSession, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await _paginer_visites(db, crud.visites_validees_stmt(), cursor, limit)
+
+async def get_visites_en_attente(db: AsyncSession, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await _paginer_visites(db, crud.visites_en_attente_stmt(), cursor, limit)
+
+async def get_visites_en_attente_equipe(db: AsyncSession, superviseur_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await _paginer_visites(db, crud.visites_equipe_stmt(superviseur_id, 'soumis'), cursor, limit)
+
+async def get_historique_visites_equipe(db: AsyncSession, superviseur_id: int, cursor: Optional[str] = None, limit: int = DEFAULT_PAGE_SIZE):
+    return await _paginer_visites(db, crud.visites_equipe_stmt(superviseur_id, 'valide'), cursor, limit)
@@ -1,33 +1,95 @@
 # Fichier: app/main.py - VERSION FINALE COMPLÈTE ET INTÉGRALE
 
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List
+from sqlalchemy import select
+from typing import List, Optional
+from pydantic import TypeAdapter
 import datetime
+import functools
 import io
+import secrets
 import csv
-from fastapi.responses import StreamingResponse
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 
-from . import models, schemas, crud, security, database
+from . import audit, cache, metrics, models, partitions, schemas, crud, crud_async, search, security, serialization, database
+from .config import settings
 
-models.Base.metadata.create_all(bind=database.engine)
-app = FastAPI(title="API Source du Pays")
+# orjson pour les routes qui renvoient des dict sans response_model. La classe reste
+# enveloppée dans Default(...) : une classe explicite ferait perdre aux routes avec
+# response_model la sérialisation directe en octets par Pydantic.
+# Les grosses réponses (détail de visite, pages de visites) passent par serialization.reponse.
+app = FastAPI(title="API Source du Pays", default_response_class=Default(serialization.ORJSONReponse))
 
-# Configuration CORS
-origins = ["http://localhost", "http://localhost:3000", "http://10.105.50.117"]
-app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"])
+EN_TETE_ECRITURE = "X-Last-Write"
+
+
+class DerniereEcritureMiddleware:
+    """
+    Middleware ASGI : une requête qui a écrit sur le primaire renvoie X-Last-Write, jeton
+    signé de l'instant de l'écriture. Le client le représente à ses requêtes suivantes
+    (get_current_user) : quel que soit le worker qui les sert, il lit sur le primaire
+    pendant READ_YOUR_WRITES_SECONDS.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_avec_jeton(message):
+            if message["type"] == "http.response.start":
+                etat = scope.get("state") or {}
+                if etat.get("last_write") is not None and etat.get("user_id") is not None:
+                    jeton = security.signer_ecriture(etat["user_id"], etat["last_write"])
+                    message = {**message, "headers": [*message.get("headers", []), (EN_TETE_ECRITURE.lower().encode(), jeton.encode())]}
+            await send(message)
 
+        await self.app(scope, receive, send_avec_jeton)
 
 
+# Configuration CORS
+origins = ["http://localhost", "http://localhost:3000", "http://10.105.50.117"]
+app.add_middleware(
+    CORSMiddleware, allow_origins=origins, allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
+    expose_headers=[EN_TETE_ECRITURE],
+)
+# Latence et requêtes SQL par route, exposées par GET /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+app.add_middleware(DerniereEcritureMiddleware)
+
+
+@app.exception_handler(security.PasswordHashingBusy)
+def password_hashing_busy_handler(request: Request, exc: security.PasswordHashingBusy):
+    return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content={"detail": "Serveur occupé, veuillez réessayer dans quelques instants"}, headers={"Retry-After": "1"})
+
+def _creer_schema(engine):
+    """create_all, sauf le journal d'activité partitionné, créé par app/partitions.py."""
+    tables = [table for table in models.Base.metadata.sorted_tables if not table.info.get("partitionnee")]
+    models.Base.metadata.create_all(bind=engine, tables=tables)
+    with engine.begin() as conn:
+        partitions.initialiser(conn)
+
 @app.on_event("startup")
 def startup_event():
     """
     Cette fonction s'exécute une seule fois au démarrage de l'API.
     Nous l'utilisons pour créer les données de base si elles n'existent pas.
     """
+    if settings.db_create_all:
+        # Base SQLite de développement : pas de migrations, on crée les tables manquantes
+        _creer_schema(database.engine)
+        if database.read_engine is not database.engine and database.read_engine.dialect.name == "sqlite":
+            # Deux fichiers SQLite (primaire + "réplique") : utile pour tester le routage en local
+            _creer_schema(database.read_engine)
     db = database.SessionLocal()
     try:
         # 1. Vérifier si des rôles existent
@@ -38,6 +100,13 @@ def startup_event():
             db.add(models.Role(nom="Merchandiser", description="Employé terrain"))
             db.commit()
 
+        # Premier démarrage avec les compteurs du tableau de bord : on les initialise
+        if db.query(models.StatCompteur).first() is None:
+            crud.reconcilier_compteurs(db)
+        # Idem pour les cumuls mensuels par merchandiser
+        if db.query(models.StatMerchandiserMois).first() is None and db.query(models.Visite.id).first() is not None:
+            crud.reconstruire_stats_mensuelles(db)
+
         # 2. Vérifier si un admin existe
         admin_role = db.query(models.Role).filter(models.Role.nom == "Administrateur").first()
         if admin_role:
@@ -55,44 +124,185 @@ def startup_event():
 
     finally:
         db.close()
+    audit.journal.demarrer()
+
+@app.on_event("shutdown")
+def shutdown_event():
+    # Écrit les dernières entrées du journal d'activité encore en file
+    audit.journal.arreter()
 
 # --- Dépendances ---
-def get_db():
-    db = database.SessionLocal()
+def get_db(request: Request):
+    # L'état de la requête permet de savoir, au commit, quel utilisateur vient d'écrire
+    db = database.SessionLocal(info={"request_state": request.state})
     try:
         yield db
     finally:
         db.close()
+async def get_async_db():
+    async with database.AsyncSessionLocal() as db:
+        yield db
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """
+    Renvoie le principal porté par le jeton (id, rôle, profils) sans charger l'utilisateur.
+    Seule la version du jeton est vérifiée, depuis un cache mémoire : la base n'est
+    interrogée qu'à l'expiration de l'entrée (voir security.TOKEN_VERSION_TTL).
+    """
     credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Impossible de valider les identifiants", headers={"WWW-Authenticate": "Bearer"})
     token_data = security.verify_token(token, credentials_exception)
-    user = crud.get_user_by_email(db, email=token_data.email)
-    if user is None:
+    try:
+        version = security.get_cached_token_version(token_data.user_id)
+    except KeyError:
+        version = await crud_async.get_token_version(db, user_id=token_data.user_id)
+        security.remember_token_version(token_data.user_id, version)
+    if version is None or version != token_data.token_version:
         raise credentials_exception
+    request.state.user_id = token_data.user_id
+    # Écriture récente passée par un autre worker : les lectures suivantes iront au primaire
+    jeton_ecriture = request.headers.get(EN_TETE_ECRITURE)
+    if jeton_ecriture:
+        written_at = security.verifier_ecriture(jeton_ecriture, token_data.user_id)
+        if written_at is not None:
+            database.note_write(token_data.user_id, written_at)
+    return token_data
+def get_read_db(current_user: schemas.TokenData = Depends(get_current_user)):
+    """Session de lecture : réplique, sauf si l'utilisateur vient d'écrire sur le primaire."""
+    db = database.read_session_factory(current_user.user_id)()
+    try:
+        yield db
+    finally:
+        db.close()
+async def get_async_anonymous_read_db():
+    async with database.AsyncReadSessionLocal() as db:
+        yield db
+async def get_async_read_db(current_user: schemas.TokenData = Depends(get_current_user)):
+    async with database.async_read_session_factory(current_user.user_id)() as db:
+        yield db
+async def get_async_dashboard_superviseur_db(current_user: schemas.TokenData = Depends(get_current_user)):
+    """
+    Session du tableau de bord superviseur. Une visite créée ou décidée par un autre
+    utilisateur invalide l'entrée en cache : pendant READ_YOUR_WRITES_SECONDS, elle est
+    recalculée sur le primaire, la réplique pouvant ne pas encore voir l'écriture.
+    """
+    if current_user.superviseur_id is not None and cache.dashboard_superviseur.invalidated_within(
+        current_user.superviseur_id, settings.read_your_writes_seconds
+    ):
+        factory = database.AsyncSessionLocal
+    else:
+        factory = database.async_read_session_factory(current_user.user_id)
+    async with factory() as db:
+        yield db
+def get_current_db_user(current_user: schemas.TokenData = Depends(get_current_user), db: Session = Depends(get_db)):
+    """Charge l'utilisateur ORM complet, pour les routes qui en ont réellement besoin."""
+    user = crud.get_user(db, user_id=current_user.user_id)
+    if user is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Impossible de valider les identifiants", headers={"WWW-Authenticate": "Bearer"})
     return user
-def get_current_admin_user(current_user: models.User = Depends(get_current_user)):
-    if not current_user.role or current_user.role.nom.lower() != "administrateur":
+def get_current_admin_user(current_user: schemas.TokenData = Depends(get_current_user)):
+    if not current_user.role or current_user.role.lower() != "administrateur":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Action réservée aux administrateurs")
     return current_user
 
+def _generer_ndjson(session_factory, schema, stmt):
+    """
+    Flux NDJSON des objets de `stmt`, lus par lots depuis un curseur côté serveur.
+    Comme pour l'export CSV, le générateur ouvre sa propre session : il est consommé
+    après la fin de la route.
+    """
+    db = session_factory()
+    try:
+        yield from serialization.ndjson(schema, crud.iter_par_lots(db, stmt))
+    finally:
+        db.close()
+
+def _reponse_ndjson(current_user: schemas.TokenData, schema, stmt):
+    """Réponse `Accept: application/x-ndjson` des listes : tout le résultat (à partir du curseur éventuel), un objet par ligne."""
+    session_factory = database.read_session_factory(current_user.user_id)
+    return StreamingResponse(_generer_ndjson(session_factory, schema, stmt), media_type=serialization.NDJSON)
+
 # --- Routes d'Authentification et Publiques ---
+def _lire_identifiants(db: Session, email: str):
+    """
+    Lit ce dont la connexion a besoin puis rend la connexion base au pool, pour ne
+    pas la garder pendant l'attente de bcrypt (une rafale de connexions épuiserait
+    sinon le pool utilisé par les autres routes).
+    """
+    try:
+        user = crud.get_user_by_email(db, email=email)
+        if not user:
+            return None
+        return user.id, user.password_hash, security.user_claims(user), user.role.nom
+    finally:
+        db.close()
+
 @app.post("/token", response_model=schemas.Token, tags=["Authentification"])
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = crud.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.password_hash):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    # Route asynchrone : bcrypt tourne sur le pool dédié de security, et les accès
+    # base (synchrones) sur le threadpool, jamais sur la boucle d'événements.
+    identifiants = await run_in_threadpool(_lire_identifiants, db, form_data.username)
+    if not identifiants:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou mot de passe incorrect")
-    return {"access_token": security.create_access_token(data={"sub": user.email}), "token_type": "bearer", "user_role": user.role.nom}
+    user_id, password_hash, claims, role_nom = identifiants
+    valide, nouveau_hash = await security.verify_password_async(form_data.password, password_hash)
+    if not valide:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Email ou mot de passe incorrect")
+    if nouveau_hash:
+        await run_in_threadpool(crud.update_password_hash, db, user_id=user_id, password_hash=nouveau_hash)
+    audit.journal.enregistrer(user_id, "Connexion")
+    return {"access_token": security.create_access_token(data=claims), "token_type": "bearer", "user_role": role_nom}
 @app.get("/users/me/", response_model=schemas.User, tags=["Authentification"])
-def read_users_me(current_user: models.User = Depends(get_current_user)):
+def read_users_me(current_user: models.User = Depends(get_current_db_user)):
     return current_user
+# --- Listes de référence en cache (ETag / 304) ---
+@functools.lru_cache(maxsize=None)
+def _adaptateur_liste(schema):
+    return TypeAdapter(List[schema])
+
+def _etag_correspond(request: Request, etag: str) -> bool:
+    """If-None-Match contient-il `etag` ? (comparaison faible, comme le veut la RFC 9110)"""
+    valeur = request.headers.get("if-none-match")
+    if not valeur:
+        return False
+    if valeur.strip() == "*":
+        return True
+    return etag in (v.strip().removeprefix("W/") for v in valeur.split(","))
+
+async def _liste_reference(request: Request, nom: str, schema, charger, db: AsyncSession):
+    """
+    Liste de référence sérialisée une fois puis servie depuis cache.references tant
+    que crud n'a pas modifié la table : pas d'accès base, et un 304 sans corps quand
+    le client renvoie l'ETag qu'il a déjà. `charger(session)` lit la liste sur `db`
+    (la réplique), ou sur le primaire pendant READ_YOUR_WRITES_SECONDS après une
+    modification : la réplique pourrait encore servir l'ancienne liste, qui serait
+    mise en cache sous la nouvelle version pour toute la durée de vie.
+    """
+    entree = cache.references.get(nom)
+    if entree is None:
+        version = cache.references.version(nom)
+        if cache.references.bumped_within(nom, settings.read_your_writes_seconds):
+            async with database.AsyncSessionLocal() as primaire:
+                liste = await charger(primaire)
+        else:
+            liste = await charger(db)
+        adaptateur = _adaptateur_liste(schema)
+        body = adaptateur.dump_json(adaptateur.validate_python(liste, from_attributes=True))
+        entree = body, cache.references.set(nom, version, body)
+    body, etag = entree
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if _etag_correspond(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 @app.get("/roles/", response_model=List[schemas.Role], tags=["Données de Référence"])
-def read_roles(db: Session = Depends(get_db)):
-    return db.query(models.Role).all()
+async def read_roles(request: Request, db: AsyncSession = Depends(get_async_anonymous_read_db)):
+    async def charger(session):
+        return (await session.scalars(select(models.Role))).all()
+    return await _liste_reference(request, "roles", schemas.Role, charger, db)
 
 # --- Routes Admin ---
 @app.post("/admin/full-user", response_model=schemas.User, tags=["Admin - Gestion Utilisateurs"])
-def create_full_user_and_profile(user_data: schemas.FullUserCreate, db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
+def create_full_user_and_profile(user_data: schemas.FullUserCreate, db: Session = Depends(get_db), admin_user: schemas.TokenData = Depends(get_current_admin_user)):
     if crud.get_user_by_email(db, email=user_data.email):
         raise HTTPException(status_code=400, detail="Cet email est déjà utilisé")
     try:
@@ -100,40 +310,43 @@ def create_full_user_and_profile(user_data: schemas.FullUserCreate, db: Session
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 @app.get("/admin/users", response_model=List[schemas.User], tags=["Admin - Gestion Utilisateurs"])
-def read_all_users(db: Session = Depends(get_db), admin_user: models.User = Depends(get_current_admin_user)):
-    return db.query(models.User).all()
-
-@app.get("/admin/visites/validees", response_model=List[schemas.VisiteInfo], tags=["Admin - Rapports"])
-def read_visites_validees(
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user),
-    skip: int = 0,
-    limit: int = 100
+def read_all_users(request: Request, db: Session = Depends(get_read_db), admin_user: schemas.TokenData = Depends(get_current_admin_user)):
+    """Liste des utilisateurs ; avec `Accept: application/x-ndjson`, un utilisateur par ligne en flux."""
+    if serialization.accepte_ndjson(request):
+        return _reponse_ndjson(admin_user, schemas.User, crud.users_flux_stmt())
+    users = db.query(models.User).options(*crud.loader_options(schemas.User, models.User)).all()
+    return serialization.reponse(schemas.User, users, liste=True)
+
+@app.get("/admin/visites/validees", response_model=schemas.VisiteInfoPage, tags=["Admin - Rapports"])
+async def read_visites_validees(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE)
 ):
-    """Récupère la liste de tous les rapports de visite qui ont été validés."""
-    visites = (
-        db.query(models.Visite)
-        .filter(models.Visite.statut_validation == 'valide')
-        .order_by(models.Visite.date_visite.desc())
-        .offset(skip)
-        .limit(limit)
-        .all()
-    )
-    return visites
+    """Récupère une page des rapports de visite qui ont été validés."""
+    try:
+        if serialization.accepte_ndjson(request):
+            return _reponse_ndjson(admin_user, schemas.VisiteInfo, crud.visites_flux_stmt(crud.visites_validees_stmt(), cursor))
+        page = await crud_async.get_visites_validees(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.reponse(schemas.VisiteInfoPage, page)
 
 @app.get("/admin/stats/total-visites", response_model=int, tags=["Admin - Statistiques"])
 def get_total_visites_count(
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """Compte le nombre total de visites dans la base de données."""
-    return db.query(models.Visite).count()
+    return crud.get_compteur(db, crud.COMPTEUR_VISITES)
 
 @app.post("/admin/clients/", response_model=schemas.Client, tags=["Admin - Gestion Données"])
 def create_client_by_admin(
     client: schemas.ClientCreate,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """Permet à un admin de créer un nouveau client."""
     return crud.create_client(db=db, client=client)
@@ -144,7 +357,7 @@ def update_client(
     client_id: int,
     client_update: schemas.ClientUpdate,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     updated_client = crud.update_client(db, client_id=client_id, client_update=client_update)
     if not updated_client:
@@ -154,17 +367,21 @@ def update_client(
 @app.get("/admin/clients/search", response_model=List[schemas.Client], tags=["Admin - Gestion Données"])
 def search_clients(
     query: str = "",
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    limit: int = Query(search.SEARCH_DEFAULT_LIMIT, ge=1, le=search.SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    prefix: bool = False,
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
-    return crud.search_clients(db, query=query)
+    """Recherche classée par pertinence, par pages (`offset`) ; `prefix=true` pour l'autocomplétion."""
+    return crud.search_clients(db, query=query, limit=limit, prefix=prefix, offset=offset)
 
 
 @app.delete("/admin/clients/{client_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Admin - Gestion Données"])
 def delete_client(
     client_id: int,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """
     Supprime un client.
@@ -180,15 +397,14 @@ def delete_client(
 @app.get("/admin/users/search", response_model=List[schemas.User], tags=["Admin - Gestion Utilisateurs"])
 def search_users(
     query: str = "",
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    limit: int = Query(search.SEARCH_DEFAULT_LIMIT, ge=1, le=search.SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    prefix: bool = False,
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
-    """Recherche des utilisateurs par nom ou email."""
-    if not query:
-        return db.query(models.User).all()
-    # On fait une recherche insensible à la casse
-    search_filter = models.User.nom.ilike(f"%{query}%") | models.User.email.ilike(f"%{query}%")
-    return db.query(models.User).filter(search_filter).all()
+    """Recherche des utilisateurs par nom ou email, classée par pertinence, par pages (`offset`)."""
+    return crud.search_users(db, query=query, limit=limit, prefix=prefix, offset=offset)
 
 # Dans app/main.py, dans la section des routes Admin
 
@@ -197,7 +413,7 @@ def update_user(
     user_id: int,
     user_update: schemas.UserUpdate, # Le schéma pour les données de mise à jour
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """Met à jour les informations d'un utilisateur."""
     updated_user = crud.update_user(db, user_id=user_id, user_update=user_update)
@@ -207,44 +423,66 @@ def update_user(
 
 @app.get("/admin/stats/total-produits", response_model=int, tags=["Admin - Statistiques"])
 def get_total_produits_count(
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """Compte le nombre total de produits dans le catalogue."""
-    return db.query(models.Produit).count()
+    return crud.get_compteur(db, crud.COMPTEUR_PRODUITS)
+
+def _pools_stats():
+    stats = {
+        "sync": database.pool_stats(database.engine, database.engine_metrics),
+        "async": database.pool_stats(database.async_engine.sync_engine, database.async_engine_metrics),
+    }
+    if database.read_engine is not database.engine:
+        stats["read_sync"] = database.pool_stats(database.read_engine, database.read_engine_metrics)
+        stats["read_async"] = database.pool_stats(database.read_async_engine.sync_engine, database.read_async_engine_metrics)
+    return stats
+
+@app.get("/admin/db/pool-stats", tags=["Admin - Statistiques"])
+def read_pool_stats(admin_user: schemas.TokenData = Depends(get_current_admin_user)):
+    """Occupation des pools de connexions (synchrone et asynchrone) et temps d'attente cumulés."""
+    return _pools_stats()
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics(request: Request):
+    """
+    Métriques au format texte Prometheus : latence, nombre de requêtes SQL, temps en
+    base et lignes par route, pools de connexions, journal d'activité (voir app/metrics.py).
+    """
+    if settings.metrics_token:
+        if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.metrics_token}"):
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Jeton de métriques invalide")
+    elif not settings.metrics_public:
+        # Trafic, pools et journal sont réservés aux administrateurs ailleurs (/admin/db/pool-stats)
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Métriques désactivées : définir METRICS_TOKEN (ou METRICS_PUBLIC=1)")
+    return Response(content=metrics.exposer(_pools_stats(), audit.journal), media_type=metrics.CONTENT_TYPE)
 
 @app.get("/admin/dashboard-stats", tags=["Admin - Tableau de Bord"])
 def get_admin_dashboard_stats(
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """
     Récupère toutes les statistiques agrégées pour le tableau de bord de l'admin.
+    Les totaux viennent des compteurs tenus à jour à chaque écriture (stat_compteurs).
     """
-    total_users = db.query(models.User).count()
-    total_visites = db.query(models.Visite).count()
-    total_produits = db.query(models.Produit).count()
-    
-    roles_query = (
-        db.query(models.Role.nom, func.count(models.User.id))
-        .join(models.User, models.Role.id == models.User.role_id, isouter=True)
-        .group_by(models.Role.nom)
-        .all()
-    )
-    roles_distribution = {nom: count for nom, count in roles_query}
+    return crud.get_admin_dashboard_stats(db)
 
-    return {
-        "totalUsers": total_users,
-        "totalVisits": total_visites,
-        "totalProducts": total_produits,
-        "rolesDistribution": roles_distribution
-    }
+@app.post("/admin/stats/reconcilier", tags=["Admin - Statistiques"])
+def reconcilier_compteurs(
+    db: Session = Depends(get_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
+):
+    """Recalcule les compteurs du tableau de bord et renvoie les écarts corrigés."""
+    corrections = crud.reconcilier_compteurs(db)
+    return {cle: {"avant": avant, "apres": apres} for cle, (avant, apres) in corrections.items()}
 
 @app.post("/produits/", response_model=schemas.Produit, tags=["Produits"])
 def create_produit(
     produit: schemas.ProduitCreate,
     db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_admin_user)
+    current_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     return crud.create_produit(db=db, produit=produit)
 
@@ -253,7 +491,7 @@ def create_produit(
 def delete_produit(
     produit_id: int,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """
     Supprime un produit du catalogue.
@@ -270,7 +508,7 @@ def update_produit(
     produit_id: int,
     produit_update: schemas.ProduitUpdate,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     updated_produit = crud.update_produit(db, produit_id=produit_id, produit_update=produit_update)
     if not updated_produit:
@@ -280,19 +518,23 @@ def update_produit(
 @app.get("/admin/produits/search", response_model=List[schemas.Produit], tags=["Admin - Gestion"])
 def search_produits(
     query: str = "",
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    limit: int = Query(search.SEARCH_DEFAULT_LIMIT, ge=1, le=search.SEARCH_MAX_LIMIT),
+    offset: int = Query(0, ge=0),
+    prefix: bool = False,
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
-    return crud.search_produits(db, query=query)
+    """Recherche classée par pertinence, par pages (`offset`) ; `prefix=true` pour l'autocomplétion."""
+    return crud.search_produits(db, query=query, limit=limit, prefix=prefix, offset=offset)
 
 @app.delete("/admin/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT, tags=["Admin - Gestion Utilisateurs"])
 def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """Supprime un utilisateur."""
-    if user_id == admin_user.id:
+    if user_id == admin_user.user_id:
         raise HTTPException(status_code=400, detail="Un administrateur ne peut pas se supprimer lui-même.")
 
     deleted_user = crud.delete_user(db, user_id=user_id)
@@ -302,111 +544,112 @@ def delete_user(
 
 # --- Routes Superviseur ---
 @app.get("/superviseur/dashboard-stats", tags=["Superviseur - Tableau de Bord"])
-def get_dashboard_stats(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if not current_user.superviseur_profile:
+async def get_dashboard_stats(db: AsyncSession = Depends(get_async_dashboard_superviseur_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    if current_user.superviseur_id is None:
         raise HTTPException(status_code=403, detail="Accès réservé aux superviseurs")
-    superviseur_id = current_user.superviseur_profile.id
-    visites_en_attente = db.query(models.Visite).join(models.Merchandiser).filter(models.Visite.statut_validation == 'soumis', models.Merchandiser.manager_id == superviseur_id).count()
-    statuts_query = db.query(models.Visite.statut_validation, func.count(models.Visite.id)).join(models.Merchandiser).filter(models.Merchandiser.manager_id == superviseur_id).group_by(models.Visite.statut_validation).all()
-    performance_query = db.query(models.User.nom, func.count(models.Visite.id)).join(models.Merchandiser, models.Merchandiser.user_id == models.User.id).join(models.Visite, models.Visite.merchandiser_id == models.Merchandiser.id).filter(models.Merchandiser.manager_id == superviseur_id).group_by(models.User.nom).all()
-    return {"visitesEnAttente": visites_en_attente, "statutsData": dict(statuts_query), "performanceEquipe": dict(performance_query)}
-
-@app.get("/superviseur/visites/en-attente", response_model=List[schemas.VisiteInfo], tags=["Superviseur - Validation"])
-def read_visites_en_attente(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if not current_user.superviseur_profile:
+    return await crud_async.get_dashboard_superviseur(db, current_user.superviseur_id)
+
+@app.get("/superviseur/visites/en-attente", response_model=schemas.VisiteInfoPage, tags=["Superviseur - Validation"])
+async def read_visites_en_attente(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: schemas.TokenData = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE)
+):
+    if current_user.superviseur_id is None:
         raise HTTPException(status_code=403, detail="Accès réservé aux superviseurs")
-    return db.query(models.Visite).join(models.Merchandiser).filter(models.Visite.statut_validation == 'soumis', models.Merchandiser.manager_id == current_user.superviseur_profile.id).all()
-
-@app.get("/admin/visites/en-attente/all", tags=["Admin - Rapports"])
-def read_all_visites_en_attente_pour_admin(
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    try:
+        page = await crud_async.get_visites_en_attente_equipe(db, superviseur_id=current_user.superviseur_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.reponse(schemas.VisiteInfoPage, page)
+
+@app.get("/admin/visites/en-attente/all", response_model=schemas.VisiteInfoPage, tags=["Admin - Rapports"])
+async def read_all_visites_en_attente_pour_admin(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE)
 ):
-    """Récupère TOUS les rapports en attente de TOUTES les équipes."""
-    return db.query(models.Visite).filter(models.Visite.statut_validation == 'soumis').all()
+    """Récupère, page par page, les rapports en attente de TOUTES les équipes."""
+    try:
+        if serialization.accepte_ndjson(request):
+            return _reponse_ndjson(admin_user, schemas.VisiteInfo, crud.visites_flux_stmt(crud.visites_en_attente_stmt(), cursor))
+        page = await crud_async.get_visites_en_attente(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.reponse(schemas.VisiteInfoPage, page)
 
 @app.get("/superviseurs/", response_model=List[schemas.Superviseur], tags=["Admin - Gestion Utilisateurs"])
 def read_all_superviseurs(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
     # On protège la route pour que seuls les admins puissent voir la liste
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     """Récupère la liste de tous les profils de superviseurs."""
-    superviseurs = db.query(models.Superviseur).all()
-    return superviseurs
-
-@app.get("/superviseur/visites/historique", response_model=List[schemas.VisiteInfo], tags=["Superviseur - Rapports"])
-def read_historique_visites_equipe(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    return crud.get_superviseurs(db)
+
+@app.get("/superviseur/visites/historique", response_model=schemas.VisiteInfoPage, tags=["Superviseur - Rapports"])
+async def read_historique_visites_equipe(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: schemas.TokenData = Depends(get_current_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE)
 ):
     """Récupère l'historique des visites (validées ET rejetées) de l'équipe du superviseur."""
-    if not current_user.superviseur_profile:
+    if current_user.superviseur_id is None:
         raise HTTPException(status_code=403, detail="Accès réservé aux superviseurs")
-    
-    superviseur_id = current_user.superviseur_profile.id
+    try:
+        if serialization.accepte_ndjson(request):
+            return _reponse_ndjson(current_user, schemas.VisiteInfo, crud.visites_flux_stmt(crud.visites_equipe_stmt(current_user.superviseur_id, 'valide'), cursor))
+        page = await crud_async.get_historique_visites_equipe(db, superviseur_id=current_user.superviseur_id, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return serialization.reponse(schemas.VisiteInfoPage, page)
 
-    visites = (
-        db.query(models.Visite)
-        .join(models.Merchandiser)
-        .filter(
-            # On ne cherche que le statut 'valide'
-            models.Visite.statut_validation == 'valide', 
-            models.Merchandiser.manager_id == superviseur_id
-        )
-        .order_by(models.Visite.date_visite.desc())
-        .all()
-    )
-    return visites
 
+EXPORT_CHUNK_ROWS = 500
+
+def _generer_csv_visites_validees(session_factory, superviseur_id: int, date_debut: Optional[datetime.date], date_fin: Optional[datetime.date]):
+    """
+    Produit le CSV morceau par morceau, au fil des lignes lues en base.
+    Le générateur ouvre sa propre session : il est consommé après la fin de la
+    route, quand la session de `get_db` peut déjà être fermée.
+    """
+    db = session_factory()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['ID Visite', 'Date', 'Nom Merchandiser', 'Nom Client', 'Statut', 'Validé par ID'])
+        for i, row in enumerate(crud.iter_export_visites_validees(db, superviseur_id, date_debut, date_fin), 1):
+            writer.writerow(row)
+            if i % EXPORT_CHUNK_ROWS == 0:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+        yield buffer.getvalue()
+    finally:
+        db.close()
 
 @app.get("/superviseur/export/visites-validees", tags=["Superviseur - Rapports"])
 def export_visites_validees(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    date_debut: Optional[datetime.date] = None,
+    date_fin: Optional[datetime.date] = None,
+    current_user: schemas.TokenData = Depends(get_current_user)
 ):
     """
-    Exporte tous les rapports validés de l'équipe du superviseur au format CSV.
+    Exporte les rapports validés de l'équipe du superviseur au format CSV,
+    éventuellement limités à une période (`date_debut` / `date_fin` incluses).
     """
-    if not current_user.superviseur_profile:
+    if current_user.superviseur_id is None:
         raise HTTPException(status_code=403, detail="Accès réservé aux superviseurs")
-    
-    # 1. On récupère les données à exporter
-    visites_validees = (
-        db.query(models.Visite)
-        .join(models.Merchandiser)
-        .filter(
-            models.Visite.statut_validation == 'valide',
-            models.Merchandiser.manager_id == current_user.superviseur_profile.id
-        )
-        .all()
-    )
+    if date_debut and date_fin and date_debut > date_fin:
+        raise HTTPException(status_code=400, detail="La date de début doit précéder la date de fin")
 
-    # 2. On prépare le fichier CSV en mémoire
-    output = io.StringIO()
-    writer = csv.writer(output)
-
-    # 3. On écrit la ligne d'en-tête
-    header = ['ID Visite', 'Date', 'Nom Merchandiser', 'Nom Client', 'Statut', 'Validé par ID']
-    writer.writerow(header)
-
-    # 4. On écrit une ligne pour chaque visite
-    for visite in visites_validees:
-        row = [
-            visite.id,
-            visite.date_visite,
-            visite.merchandiser.user.nom,
-            visite.client.nom_client,
-            visite.statut_validation,
-            visite.validateur_id
-        ]
-        writer.writerow(row)
-
-    output.seek(0) # On remet le curseur au début du fichier en mémoire
-
-    # 5. On renvoie le fichier
     return StreamingResponse(
-        output,
+        _generer_csv_visites_validees(database.read_session_factory(current_user.user_id), current_user.superviseur_id, date_debut, date_fin),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename=rapports_valides_{datetime.date.today()}.csv"}
     )
@@ -414,38 +657,52 @@ def export_visites_validees(
 
 # --- Routes de Visites ---
 @app.post("/visites/", response_model=schemas.Visite, tags=["Visites"])
-def create_visite(visite: schemas.VisiteCreate, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    if not current_user.merchandiser_profile:
+def create_visite(visite: schemas.VisiteCreate, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    if current_user.merchandiser_id is None:
         raise HTTPException(status_code=403, detail="Seul un merchandiser peut créer une visite")
-    return crud.create_visite(db=db, visite=visite, merchandiser_id=current_user.merchandiser_profile.id)
+    return crud.create_visite(db=db, visite=visite, merchandiser_id=current_user.merchandiser_id)
+@app.post("/visites/batch", response_model=List[schemas.VisiteBatchResult], tags=["Visites"])
+def create_visites_batch(lot: schemas.VisiteBatchCreate, db: Session = Depends(get_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    """
+    Synchronisation hors ligne : enregistre un lot de visites en une transaction.
+    Chaque visite porte une clé d'idempotence générée par l'appareil ; un renvoi
+    de la même clé est signalé comme 'doublon' au lieu de créer une copie.
+    """
+    if current_user.merchandiser_id is None:
+        raise HTTPException(status_code=403, detail="Seul un merchandiser peut créer une visite")
+    return crud.create_visites_batch(db, items=lot.visites, merchandiser_id=current_user.merchandiser_id)
 @app.get("/visites/{visite_id}", response_model=schemas.VisiteDetail, tags=["Visites"])
-def read_visite_details(visite_id: int, db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    db_visite = db.query(models.Visite).filter(models.Visite.id == visite_id).first()
+async def read_visite_details(visite_id: int, db: AsyncSession = Depends(get_async_read_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    db_visite = await crud_async.get_visite_detail(db, visite_id=visite_id)
     if not db_visite:
         raise HTTPException(status_code=404, detail="Visite non trouvée")
-    return db_visite
+    return serialization.reponse(schemas.VisiteDetail, db_visite)
+@app.put("/visites/validation-batch", response_model=List[schemas.VisiteValidationResult], tags=["Superviseur - Validation"])
+def decider_visites_batch(
+    lot: schemas.VisiteValidationBatch,
+    db: Session = Depends(get_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """
+    Valide ou rejette (`decision`) jusqu'à 200 rapports de l'équipe en une requête.
+    Seules les visites encore 'soumis' changent ; le résultat indique le sort de chaque id.
+    """
+    if current_user.superviseur_id is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès réservé aux superviseurs")
+    return crud.decider_visites_batch(db, lot.visite_ids, lot.decision, current_user.superviseur_id)
 @app.put("/visites/{visite_id}/valider", response_model=schemas.Visite, tags=["Superviseur - Validation"])
 def valider_visite(
     visite_id: int, 
     db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.TokenData = Depends(get_current_user)
 ):
     """Change le statut d'une visite à 'valide'."""
     # On vérifie que l'utilisateur est bien un superviseur
-    if not current_user.superviseur_profile:
+    if current_user.superviseur_id is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès réservé aux superviseurs")
-    # 1. On récupère la visite depuis la base de données
-    db_visite = db.query(models.Visite).filter(models.Visite.id == visite_id).first()
-    
-    # 2. On vérifie si la visite existe
+    db_visite = crud.changer_statut_visite(db, visite_id, 'valide', current_user.superviseur_id)
     if not db_visite:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Visite non trouvée")
-    
-    db_visite.statut_validation = 'valide'
-    db_visite.validateur_id = current_user.superviseur_profile.id
-    
-    db.commit()
-    db.refresh(db_visite)
     return db_visite
 
 
@@ -453,38 +710,28 @@ def valider_visite(
 def rejeter_visite(
     visite_id: int, 
     db: Session = Depends(get_db), 
-    current_user: models.User = Depends(get_current_user)
+    current_user: schemas.TokenData = Depends(get_current_user)
 ):
     """Change le statut d'une visite à 'rejete'."""
     # On vérifie que l'utilisateur est bien un superviseur
-    if not current_user.superviseur_profile:
+    if current_user.superviseur_id is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Accès réservé aux superviseurs")
-
-    # 1. On récupère la visite depuis la base de données
-    db_visite = db.query(models.Visite).filter(models.Visite.id == visite_id).first()
-    
-    # 2. On vérifie si la visite existe
+    db_visite = crud.changer_statut_visite(db, visite_id, 'rejete', current_user.superviseur_id)
     if not db_visite:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Visite non trouvée")
-
-    db_visite.statut_validation = 'rejete'
-    db_visite.validateur_id = current_user.superviseur_profile.id
-    
-    db.commit()
-    db.refresh(db_visite)
     return db_visite
 
 
 
 @app.get("/merchandiser/dashboard-stats", tags=["Merchandiser - Tableau de Bord"])
 def get_merchandiser_dashboard_stats(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+    db: Session = Depends(get_read_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    if not current_user.merchandiser_profile:
+    if current_user.merchandiser_id is None:
         raise HTTPException(status_code=403, detail="Accès réservé aux merchandisers")
     
-    merchandiser_id = current_user.merchandiser_profile.id
+    merchandiser_id = current_user.merchandiser_id
     today = datetime.date.today()
 
     # 1. Compter les visites du jour
@@ -506,12 +753,9 @@ def get_merchandiser_dashboard_stats(
         .all()
     )
 
-    # 3. (Exemple) Calculer le CA du mois (simplifié)
-    # Pour une vraie appli, ce calcul serait plus complexe
-    ca_du_mois = db.query(func.sum(models.DetailVisiteProduit.quantite)).join(models.Visite).filter(
-        models.Visite.merchandiser_id == merchandiser_id,
-        # Vous pourriez filtrer par mois ici
-    ).scalar() or 0
+    # 3. CA du mois, lu dans le cumul mensuel (quantités commandées du mois en cours)
+    stat_mois = crud.get_stat_merchandiser_mois(db, merchandiser_id, today)
+    ca_du_mois = stat_mois.quantite_commandee if stat_mois else 0
 
     return {
         "visitesAujourdhui": visites_aujourdhui,
@@ -522,26 +766,45 @@ def get_merchandiser_dashboard_stats(
     }
 
 # --- Routes de Données de Référence ---
+@app.get("/sync/reference", response_model=schemas.SyncReference, tags=["Données de Référence"])
+async def sync_reference(
+    since: Optional[str] = None,
+    limit: int = Query(crud.SYNC_PAGE_SIZE, ge=1, le=crud.SYNC_MAX_PAGE_SIZE),
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
+):
+    """
+    Modifications des clients, produits, catégories et concurrents depuis le jeton
+    `since` (tout le catalogue sans jeton). Rappeler avec `next_since` tant que
+    `has_more` est vrai, puis le conserver pour la synchronisation suivante.
+    """
+    try:
+        return await crud_async.get_sync_reference(db, since=since, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 @app.get("/clients/", response_model=List[schemas.Client], tags=["Données de Référence"])
-def read_clients(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.get_clients(db)
+async def read_clients(request: Request, db: AsyncSession = Depends(get_async_read_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    return await _liste_reference(request, "clients", schemas.Client, crud_async.get_clients, db)
 @app.get("/produits/", response_model=List[schemas.Produit], tags=["Données de Référence"])
-def read_produits(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.get_produits(db)
+async def read_produits(request: Request, db: AsyncSession = Depends(get_async_read_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    return await _liste_reference(request, "produits", schemas.Produit, crud_async.get_produits, db)
 @app.get("/concurrents/", response_model=List[schemas.Concurrent], tags=["Données de Référence"])
-def read_concurrents(db: Session = Depends(get_db), current_user: models.User = Depends(get_current_user)):
-    return crud.get_concurrents(db)
+async def read_concurrents(request: Request, db: AsyncSession = Depends(get_async_read_db), current_user: schemas.TokenData = Depends(get_current_user)):
+    return await _liste_reference(request, "concurrents", schemas.Concurrent, crud_async.get_concurrents, db)
 
 
-@app.get("/admin/activity-logs", response_model=List[schemas.ActiviteLog], tags=["Admin - Tableau de Bord"])
+@app.get("/admin/activity-logs", response_model=schemas.ActiviteLogPage, tags=["Admin - Tableau de Bord"])
 def read_activity_logs(
-    db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user),
-    limit: int = 10
+    db: Session = Depends(get_read_db),
+    admin_user: schemas.TokenData = Depends(get_current_admin_user),
+    cursor: Optional[str] = None,
+    limit: int = Query(crud.DEFAULT_ACTIVITE_PAGE_SIZE, ge=1, le=crud.MAX_ACTIVITE_PAGE_SIZE)
 ):
-    """Récupère les dernières activités du système."""
-    logs = db.query(models.ActiviteLog).order_by(models.ActiviteLog.timestamp.desc()).limit(limit).all()
-    return logs
+    """Récupère les dernières activités du système ; `next_cursor` remonte dans le temps."""
+    try:
+        return crud.get_activity_logs(db, cursor=cursor, limit=limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 
@@ -549,14 +812,15 @@ def read_activity_logs(
 def create_categorie_produit(
     categorie: schemas.CategorieProduitCreate,
     db: Session = Depends(get_db),
-    admin_user: models.User = Depends(get_current_admin_user)
+    admin_user: schemas.TokenData = Depends(get_current_admin_user)
 ):
     # Ajouter une vérification pour l'unicité du nom
     return crud.create_categorie_produit(db, categorie=categorie)
 
 @app.get("/categories-produit/", response_model=List[schemas.CategorieProduit], tags=["Données de Référence"])
-def read_categories_produit(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def read_categories_produit(
+    request: Request,
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: schemas.TokenData = Depends(get_current_user)
 ):
-    return crud.get_categories_produit(db)
\ No newline at end of file
+    return await _liste_reference(request, "categories_produit", schemas.CategorieProduit, crud_async.get_categories_produit, db)
\ No newline at end of file
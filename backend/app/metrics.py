@@ -0,0 +1,252 @@
+# Fichier: app/metrics.py - Métriques par route (latence, requêtes SQL) au format Prometheus
+#
+# Un middleware ASGI ouvre un relevé par requête HTTP, porté par une ContextVar ; les
+# événements before/after_cursor_execute de SQLAlchemy (tous les moteurs, synchrones
+# et asynchrones) y ajoutent chaque requête SQL : nombre, durée, lignes. La ContextVar
+# suit la requête dans le pool de threads des routes synchrones, dans les greenlets
+# des sessions asynchrones et dans les générateurs des réponses en flux (CSV, NDJSON).
+#
+# À la fin de la réponse, le relevé est ajouté aux totaux de sa route (le gabarit,
+# ex. /visites/{visite_id}, pour ne pas créer une série par id) : un seul verrou par
+# requête HTTP, aucun par requête SQL. GET /metrics les expose au format texte
+# Prometheus, avec l'état des pools de connexions et du journal d'activité.
+#
+# Lignes : nombre de lignes donné par le pilote. PostgreSQL le donne pour les SELECT
+# comme pour les écritures ; SQLite seulement pour les écritures.
+
+import bisect
+import contextvars
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIXE = "merchflow"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Requêtes qui ne correspondent à aucune route (404) : une seule série
+HORS_ROUTE = "<aucune>"
+
+BORNES_LATENCE = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BORNES_REQUETES_SQL = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+class Histogramme:
+    """Histogramme cumulable (compte par intervalle, somme, nombre), non verrouillé."""
+
+    __slots__ = ("bornes", "comptes", "somme", "nombre")
+
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.comptes = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur):
+        self.comptes[bisect.bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def cumuls(self):
+        """(borne, nombre d'observations <= borne) comme attendu par Prometheus, +Inf compris."""
+        total = 0
+        for borne, compte in zip(self.bornes + (float("inf"),), self.comptes):
+            total += compte
+            yield borne, total
+
+
+class StatsRoute:
+    """Totaux d'une route (méthode, gabarit)."""
+
+    __slots__ = ("latence", "requetes_sql", "statuts", "sql_total", "sql_secondes", "sql_lignes")
+
+    def __init__(self):
+        self.latence = Histogramme(BORNES_LATENCE)
+        self.requetes_sql = Histogramme(BORNES_REQUETES_SQL)
+        self.statuts = {}
+        self.sql_total = 0
+        self.sql_secondes = 0.0
+        self.sql_lignes = 0
+
+
+class Releve:
+    """Ce qu'a fait une requête HTTP en base ; rempli par les événements SQLAlchemy."""
+
+    __slots__ = ("requetes", "secondes", "lignes")
+
+    def __init__(self):
+        self.requetes = 0
+        self.secondes = 0.0
+        self.lignes = 0
+
+
+_releve_courant = contextvars.ContextVar("releve_sql", default=None)
+_routes = {}
+_lock = threading.Lock()
+
+
+def releve_courant():
+    """Relevé SQL de la requête HTTP en cours (None hors requête)."""
+    return _releve_courant.get()
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _avant_execution(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and _releve_courant.get() is not None:
+        context._debut_metrics = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _apres_execution(conn, cursor, statement, parameters, context, executemany):
+    releve = _releve_courant.get()
+    if releve is None or context is None:
+        return
+    debut = getattr(context, "_debut_metrics", None)
+    if debut is not None:
+        releve.secondes += time.perf_counter() - debut
+    releve.requetes += 1
+    if cursor.rowcount > 0:
+        releve.lignes += cursor.rowcount
+
+
+def _enregistrer(methode, route, statut, duree, releve):
+    with _lock:
+        stats = _routes.get((methode, route))
+        if stats is None:
+            stats = _routes[(methode, route)] = StatsRoute()
+        stats.latence.observer(duree)
+        stats.requetes_sql.observer(releve.requetes)
+        stats.statuts[statut] = stats.statuts.get(statut, 0) + 1
+        stats.sql_total += releve.requetes
+        stats.sql_secondes += releve.secondes
+        stats.sql_lignes += releve.lignes
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence de bout en bout (corps en flux compris) et relevé SQL par route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        releve = Releve()
+        jeton = _releve_courant.set(releve)
+        statut = 500
+        debut = time.perf_counter()
+
+        async def send_avec_statut(message):
+            nonlocal statut
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_avec_statut)
+        finally:
+            duree = time.perf_counter() - debut
+            _releve_courant.reset(jeton)
+            route = scope.get("route")
+            _enregistrer(scope["method"], getattr(route, "path", HORS_ROUTE), statut, duree, releve)
+
+
+def _etiquettes(**valeurs):
+    def echapper(valeur):
+        return str(valeur).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return "{" + ",".join(f'{nom}="{echapper(valeur)}"' for nom, valeur in valeurs.items()) + "}"
+
+
+def _format_borne(borne):
+    return "+Inf" if borne == float("inf") else repr(float(borne))
+
+
+def _histogramme(lignes, nom, etiquettes, histogramme):
+    for borne, cumul in histogramme.cumuls():
+        lignes.append(f"{nom}_bucket{_etiquettes(**etiquettes, le=_format_borne(borne))} {cumul}")
+    lignes.append(f"{nom}_sum{_etiquettes(**etiquettes)} {histogramme.somme}")
+    lignes.append(f"{nom}_count{_etiquettes(**etiquettes)} {histogramme.nombre}")
+
+
+def _entete(lignes, nom, type_, aide):
+    lignes.append(f"# HELP {nom} {aide}")
+    lignes.append(f"# TYPE {nom} {type_}")
+
+
+def exposer(pools, journal) -> str:
+    """
+    Texte Prometheus de toutes les métriques. `pools` : {nom: database.pool_stats(...)},
+    `journal` : le JournalActivite de app/audit.py.
+    """
+    with _lock:
+        # Copie sous verrou, mise en forme hors verrou
+        routes = []
+        for (methode, route), stats in sorted(_routes.items()):
+            copie = StatsRoute()
+            for attribut in ("sql_total", "sql_secondes", "sql_lignes"):
+                setattr(copie, attribut, getattr(stats, attribut))
+            copie.statuts = dict(stats.statuts)
+            for attribut in ("latence", "requetes_sql"):
+                source, cible = getattr(stats, attribut), getattr(copie, attribut)
+                cible.comptes, cible.somme, cible.nombre = list(source.comptes), source.somme, source.nombre
+            routes.append((methode, route, copie))
+
+    lignes = []
+    nom = f"{PREFIXE}_http_requests_total"
+    _entete(lignes, nom, "counter", "Requêtes HTTP par route et code de statut.")
+    for methode, route, stats in routes:
+        for statut, nombre in sorted(stats.statuts.items()):
+            lignes.append(f"{nom}{_etiquettes(method=methode, route=route, status=statut)} {nombre}")
+
+    nom = f"{PREFIXE}_http_request_duration_seconds"
+    _entete(lignes, nom, "histogram", "Durée des requêtes HTTP, corps de la réponse compris.")
+    for methode, route, stats in routes:
+        _histogramme(lignes, nom, {"method": methode, "route": route}, stats.latence)
+
+    nom = f"{PREFIXE}_db_queries_per_request"
+    _entete(lignes, nom, "histogram", "Requêtes SQL émises par requête HTTP.")
+    for methode, route, stats in routes:
+        _histogramme(lignes, nom, {"method": methode, "route": route}, stats.requetes_sql)
+
+    for suffixe, attribut, aide in (
+        ("db_queries_total", "sql_total", "Requêtes SQL émises par la route."),
+        ("db_query_duration_seconds_total", "sql_secondes", "Temps passé en base par la route."),
+        ("db_rows_total", "sql_lignes", "Lignes lues ou écrites selon le pilote (SQLite : écritures seulement)."),
+    ):
+        nom = f"{PREFIXE}_{suffixe}"
+        _entete(lignes, nom, "counter", aide)
+        for methode, route, stats in routes:
+            lignes.append(f"{nom}{_etiquettes(method=methode, route=route)} {getattr(stats, attribut)}")
+
+    for suffixe, cle, type_, aide in (
+        ("db_pool_connections_in_use", "in_use", "gauge", "Connexions empruntées au pool."),
+        ("db_pool_connections_idle", "checked_in", "gauge", "Connexions disponibles dans le pool."),
+        ("db_pool_overflow", "overflow", "gauge", "Connexions ouvertes au-delà de la taille du pool."),
+        ("db_pool_checkouts_total", "checkouts", "counter", "Emprunts de connexion."),
+        ("db_pool_timeouts_total", "timeouts", "counter", "Emprunts abandonnés faute de connexion libre."),
+        ("db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Attente cumulée pour obtenir une connexion."),
+    ):
+        nom = f"{PREFIXE}_{suffixe}"
+        _entete(lignes, nom, type_, aide)
+        for pool, stats in pools.items():
+            if cle in stats:
+                lignes.append(f"{nom}{_etiquettes(pool=pool)} {stats[cle]}")
+
+    for suffixe, valeur, type_, aide in (
+        ("audit_queue_size", journal.en_attente(), "gauge", "Entrées du journal d'activité en attente d'écriture."),
+        ("audit_written_total", journal.ecrites, "counter", "Entrées du journal d'activité écrites."),
+        ("audit_dropped_total", journal.abandonnees, "counter", "Entrées abandonnées, file pleine."),
+        ("audit_failed_total", journal.echecs, "counter", "Entrées perdues sur erreur d'écriture."),
+    ):
+        nom = f"{PREFIXE}_{suffixe}"
+        _entete(lignes, nom, type_, aide)
+        lignes.append(f"{nom} {valeur}")
+
+    return "\n".join(lignes) + "\n"
+
+
+def reinitialiser():
+    """Remet les totaux à zéro (benchmarks)."""
+    with _lock:
+        _routes.clear()
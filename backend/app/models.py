@@ -2,11 +2,41 @@
 
 import datetime
 from sqlalchemy import (
-    Column, Integer, String, Text, Boolean, TIMESTAMP, ForeignKey, Date, Time
+    Column, Integer, BigInteger, String, Text, Boolean, TIMESTAMP, ForeignKey, Date, Time, UniqueConstraint, Index, text
 )
 from sqlalchemy.orm import relationship
 from .database import Base
 
+
+def index_recherche(table: str, *colonnes):
+    """
+    Index PostgreSQL de app/search.py : trigrammes (GIN, pg_trgm) pour la recherche
+    par sous-chaîne ou similarité, B-tree sur lower(colonne) pour les préfixes.
+    """
+    index = [
+        Index(f"ix_{table}_{colonne}_trgm", colonne, postgresql_using="gin", postgresql_ops={colonne: "gin_trgm_ops"})
+        for colonne in colonnes
+    ]
+    index += [Index(f"ix_{table}_{colonne}_lower", text(f"lower({colonne}) text_pattern_ops")) for colonne in colonnes]
+    return tuple(i.ddl_if(dialect="postgresql") for i in index)
+
+
+def colonnes_sync():
+    """
+    Suivi des modifications pour /sync/reference : date de dernière modification et
+    version de synchronisation, attribuée par crud à chaque écriture à partir d'un
+    compteur global (voir crud.prochaine_version_sync).
+    """
+    return (
+        Column('updated_at', TIMESTAMP, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow),
+        Column('version_sync', BigInteger, nullable=False, default=0, server_default='0'),
+    )
+
+
+def index_sync(table: str):
+    return Index(f"ix_{table}_version_sync", 'version_sync', 'id')
+
+
 # --- DOMAINE: SÉCURITÉ & AUTHENTIFICATION ---
 
 class Role(Base):
@@ -26,6 +56,10 @@ class User(Base):
     is_active = Column(Boolean, default=True)
     created_at = Column(TIMESTAMP, default=datetime.datetime.utcnow)
     role_id = Column(Integer, ForeignKey('roles.id'))
+    # Incrémentée pour révoquer les jetons déjà émis (voir crud.update_user / delete_user)
+    token_version = Column(Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = index_recherche('users', 'nom', 'email')
     
     # --- RELATIONS ---
     role = relationship("Role", back_populates="users")
@@ -49,7 +83,7 @@ class Merchandiser(Base):
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey('users.id'), unique=True)
     zone_geographique = Column(String(100), nullable=True)
-    manager_id = Column(Integer, ForeignKey('superviseurs.id'))
+    manager_id = Column(Integer, ForeignKey('superviseurs.id'), index=True)
     
     manager = relationship("Superviseur", back_populates="merchandisers")
     user = relationship("User", back_populates="merchandiser_profile")
@@ -65,6 +99,8 @@ class Client(Base):
     typologie = Column(String(100), nullable=True)
     localisation = Column(String(255), nullable=True)
     createur_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    updated_at, version_sync = colonnes_sync()
+    __table_args__ = index_recherche('clients', 'nom_client', 'contact') + (index_sync('clients'),)
     createur = relationship("User", back_populates="clients_crees")   
 
     visites = relationship("Visite", back_populates="client")
@@ -75,6 +111,8 @@ class Produit(Base):
     nom_produit = Column(String(200), nullable=False)
     marque = Column(String(100), nullable=True)
     categorie_id = Column(Integer, ForeignKey('categories_produit.id'))
+    updated_at, version_sync = colonnes_sync()
+    __table_args__ = index_recherche('produits', 'nom_produit', 'marque') + (index_sync('produits'),)
 
     categorie = relationship("CategorieProduit", back_populates="produits")
 
@@ -83,6 +121,8 @@ class CategorieProduit(Base):
     __tablename__ = 'categories_produit'
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String(100), unique=True, nullable=False)
+    updated_at, version_sync = colonnes_sync()
+    __table_args__ = (index_sync('categories_produit'),)
     
     # Relation inverse vers les produits
     produits = relationship("Produit", back_populates="categorie")
@@ -92,6 +132,8 @@ class Concurrent(Base):
     __tablename__ = 'concurrents'
     id = Column(Integer, primary_key=True, index=True)
     nom = Column(String(255), unique=True, nullable=False)
+    updated_at, version_sync = colonnes_sync()
+    __table_args__ = (index_sync('concurrents'),)
 
 # --- DOMAINE: PROCESSUS OPÉRATIONNEL ---
 
@@ -99,8 +141,8 @@ class Visite(Base):
     __tablename__ = 'visites'
     id = Column(Integer, primary_key=True, index=True)
     merchandiser_id = Column(Integer, ForeignKey('merchandisers.id'))
-    client_id = Column(Integer, ForeignKey('clients.id'))
-    date_visite = Column(Date, default=datetime.date.today)
+    client_id = Column(Integer, ForeignKey('clients.id'), index=True)
+    date_visite = Column(Date, nullable=False, default=datetime.date.today)
     statut_validation = Column(String(50), default='soumis')
     observations_generales = Column(Text, nullable=True)
     fifo_respecte = Column(Boolean, default=True)
@@ -108,6 +150,15 @@ class Visite(Base):
     validateur_id = Column(Integer, ForeignKey('superviseurs.id'), nullable=True)
     date_validation = Column(Date, nullable=True)
     heure_debut = Column(Time, nullable=True)
+    # Clé générée par l'application mobile : un renvoi de la même visite est rejeté par l'index unique
+    idempotency_key = Column(String(64), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint('merchandiser_id', 'idempotency_key', name='uq_visites_merchandiser_idempotency'),
+        # Listes paginées par statut et historique d'un merchandiser, triés par (date_visite, id)
+        Index('ix_visites_statut_date', 'statut_validation', 'date_visite', 'id'),
+        Index('ix_visites_merchandiser_date', 'merchandiser_id', 'date_visite', 'id'),
+    )
     
     merchandiser = relationship("Merchandiser", back_populates="visites")
     validateur = relationship("Superviseur")
@@ -119,8 +170,8 @@ class Visite(Base):
 class ReleveStock(Base):
     __tablename__ = 'releves_stock'
     id = Column(Integer, primary_key=True, index=True)
-    visite_id = Column(Integer, ForeignKey('visites.id'))
-    produit_id = Column(Integer, ForeignKey('produits.id'))
+    visite_id = Column(Integer, ForeignKey('visites.id'), index=True)
+    produit_id = Column(Integer, ForeignKey('produits.id'), index=True)
     quantite_en_stock = Column(Integer, nullable=True)
     est_en_rupture = Column(Boolean, default=False)
     type_rupture = Column(String(100), nullable=True)
@@ -131,8 +182,8 @@ class ReleveStock(Base):
 class DetailVisiteProduit(Base):
     __tablename__ = 'details_visite_produit'
     id = Column(Integer, primary_key=True, index=True)
-    visite_id = Column(Integer, ForeignKey('visites.id'))
-    produit_id = Column(Integer, ForeignKey('produits.id'))
+    visite_id = Column(Integer, ForeignKey('visites.id'), index=True)
+    produit_id = Column(Integer, ForeignKey('produits.id'), index=True)
     type_detail = Column(String(50), nullable=False) # 'commande' ou 'incident'
     quantite = Column(Integer)
     observation = Column(Text, nullable=True)
@@ -144,8 +195,8 @@ class DetailVisiteProduit(Base):
 class VeilleConcurrentielle(Base):
     __tablename__ = 'veilles_concurrentielles'
     id = Column(Integer, primary_key=True, index=True)
-    visite_id = Column(Integer, ForeignKey('visites.id'))
-    concurrent_id = Column(Integer, ForeignKey('concurrents.id'))
+    visite_id = Column(Integer, ForeignKey('visites.id'), index=True)
+    concurrent_id = Column(Integer, ForeignKey('concurrents.id'), index=True)
     
     marque = Column(String(255), nullable=True)
     
@@ -159,10 +210,58 @@ class VeilleConcurrentielle(Base):
 # Dans app/models.py
 
 class ActiviteLog(Base):
+    """
+    Journal d'activité, partitionné par mois (voir app/partitions.py) : table
+    partitionnée sur PostgreSQL, vue sur une table par mois sur SQLite. Le schéma est
+    géré par partitions.py et non par create_all (info "partitionnee").
+    """
     __tablename__ = 'activite_logs'
-    id = Column(Integer, primary_key=True, index=True)
-    timestamp = Column(TIMESTAMP, default=datetime.datetime.utcnow)
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # Clé de partitionnement : fait partie de la clé primaire (exigé par PostgreSQL)
+    timestamp = Column(TIMESTAMP, primary_key=True, default=datetime.datetime.utcnow)
+    # Les entrées survivent à la suppression de l'utilisateur, anonymisées
+    user_id = Column(Integer, ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
     action = Column(Text, nullable=False)
-    
-    user = relationship("User")
\ No newline at end of file
+
+    user = relationship("User")
+
+    __table_args__ = (
+        # "Dernières activités" et pagination par (timestamp, id) décroissants
+        Index('ix_activite_logs_timestamp', timestamp.desc(), id.desc()),
+        {"info": {"partitionnee": True}},
+    )
+
+
+# --- DOMAINE: STATISTIQUES ---
+
+class StatCompteur(Base):
+    """Compteurs agrégés (utilisateurs, visites, produits...) tenus à jour par les écritures de crud.py."""
+    __tablename__ = 'stat_compteurs'
+    cle = Column(String(100), primary_key=True)
+    valeur = Column(BigInteger, nullable=False, default=0)
+
+class StatMerchandiserMois(Base):
+    """
+    Cumul mensuel par merchandiser, tenu à jour par crud.py à la création et à la
+    validation des visites. `mois` est le premier jour du mois de date_visite.
+    """
+    __tablename__ = 'stat_merchandiser_mois'
+    merchandiser_id = Column(Integer, ForeignKey('merchandisers.id'), primary_key=True)
+    mois = Column(Date, primary_key=True)
+    nb_visites = Column(Integer, nullable=False, default=0)
+    nb_visites_validees = Column(Integer, nullable=False, default=0)
+    # Somme des quantités des détails de type 'commande'
+    quantite_commandee = Column(BigInteger, nullable=False, default=0)
+    quantite_validee = Column(BigInteger, nullable=False, default=0)
+
+
+class SuppressionReference(Base):
+    """Trace d'une donnée de référence supprimée, renvoyée par /sync/reference aux appareils."""
+    __tablename__ = 'suppressions_reference'
+    id = Column(Integer, primary_key=True)
+    table_nom = Column(String(50), nullable=False)
+    objet_id = Column(Integer, nullable=False)
+    supprime_le = Column(TIMESTAMP, default=datetime.datetime.utcnow)
+    version_sync = Column(BigInteger, nullable=False)
+
+    __table_args__ = (index_sync('suppressions_reference'),)
@@ -0,0 +1,221 @@
+# Fichier: app/partitions.py - Partitions mensuelles du journal d'activité
+#
+# activite_logs grossit sans fin ; on le découpe par mois pour que la purge des vieux
+# mois soit un DROP TABLE au lieu d'un DELETE massif.
+#   - PostgreSQL : table partitionnée (PARTITION BY RANGE (timestamp)), une partition
+#     activite_logs_AAAA_MM par mois ; l'index (timestamp DESC, id DESC) du parent est
+#     créé sur chaque partition.
+#   - SQLite : une table activite_logs_AAAA_MM par mois et une vue activite_logs qui les
+#     réunit (UNION ALL). SQLite fusionne les branches dans l'ordre de leurs index :
+#     "ORDER BY timestamp DESC LIMIT n" sur la vue ne trie pas tout le journal.
+# Dans les deux cas l'ORM lit activite_logs normalement ; les écritures (audit.py)
+# passent par inserer(), qui crée au besoin la partition du mois.
+
+import datetime
+import re
+
+from sqlalchemy import Column, Integer, MetaData, Table, Text, TIMESTAMP, insert, inspect as sa_inspect
+
+from . import models
+
+TABLE = models.ActiviteLog.__tablename__
+MOTIF_PARTITION = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+
+# Mois dont la partition existe déjà (par moteur), pour ne pas la vérifier à chaque lot.
+# Seuls y entrent les mois trouvés en base : une partition créée par la transaction en
+# cours peut encore être annulée avec elle (DDL transactionnel), elle n'est retenue
+# qu'au lot suivant, une fois validée.
+_connues = {}
+
+
+def premier_jour(valeur) -> datetime.date:
+    return datetime.date(valeur.year, valeur.month, 1)
+
+
+def mois_suivant(mois: datetime.date) -> datetime.date:
+    return datetime.date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+
+
+def mois_precedent(mois: datetime.date, nombre: int = 1) -> datetime.date:
+    index = mois.year * 12 + mois.month - 1 - nombre
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def nom_partition(mois: datetime.date) -> str:
+    return f"{TABLE}_{mois.year:04d}_{mois.month:02d}"
+
+
+def table_partition(mois: datetime.date) -> Table:
+    """Table Core d'une partition (écriture directe sur SQLite, archivage)."""
+    return Table(
+        nom_partition(mois), MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("timestamp", TIMESTAMP, nullable=False),
+        Column("user_id", Integer),
+        Column("action", Text, nullable=False),
+    )
+
+
+def lister(conn):
+    """Mois des partitions existantes, du plus ancien au plus récent."""
+    mois = []
+    for nom in sa_inspect(conn).get_table_names():
+        trouve = MOTIF_PARTITION.match(nom)
+        if trouve:
+            mois.append(datetime.date(int(trouve.group(1)), int(trouve.group(2)), 1))
+    return sorted(mois)
+
+
+def _est_sqlite(conn) -> bool:
+    return conn.dialect.name == "sqlite"
+
+
+def _est_partitionnee(conn) -> bool:
+    """activite_logs est-elle déjà la table partitionnée (PostgreSQL) ? Toujours faux sur SQLite, où c'est une vue."""
+    if _est_sqlite(conn):
+        return False
+    return conn.exec_driver_sql(f"SELECT relkind FROM pg_class WHERE relname = '{TABLE}'").scalar() == "p"
+
+
+def _recreer_vue(conn):
+    """SQLite : la vue activite_logs réunit toutes les partitions existantes."""
+    conn.exec_driver_sql(f"DROP VIEW IF EXISTS {TABLE}")
+    branches = [f'SELECT id, "timestamp", user_id, action FROM {nom_partition(mois)}' for mois in lister(conn)]
+    if not branches:
+        branches = ['SELECT NULL AS id, NULL AS "timestamp", NULL AS user_id, NULL AS action WHERE 0']
+    conn.exec_driver_sql(f"CREATE VIEW {TABLE} AS " + " UNION ALL ".join(branches))
+
+
+def _creer_partition(conn, mois: datetime.date):
+    nom = nom_partition(mois)
+    if _est_sqlite(conn):
+        # Idempotent : un autre processus peut créer la même partition entre lister() et ici
+        conn.exec_driver_sql(
+            f'CREATE TABLE IF NOT EXISTS {nom} (id INTEGER PRIMARY KEY AUTOINCREMENT, "timestamp" TIMESTAMP NOT NULL, '
+            f'user_id INTEGER REFERENCES users (id) ON DELETE SET NULL, action TEXT NOT NULL)'
+        )
+        # Les ids restent uniques d'un mois à l'autre : la séquence repart du plus grand id du journal
+        conn.exec_driver_sql(
+            f"INSERT INTO sqlite_sequence (name, seq) SELECT '{nom}', (SELECT COALESCE(MAX(id), 0) FROM {TABLE}) "
+            f"WHERE NOT EXISTS (SELECT 1 FROM sqlite_sequence WHERE name = '{nom}')"
+        )
+        conn.exec_driver_sql(f'CREATE INDEX IF NOT EXISTS ix_{nom}_timestamp ON {nom} ("timestamp" DESC, id DESC)')
+        _recreer_vue(conn)
+    else:
+        conn.exec_driver_sql(
+            f"CREATE TABLE IF NOT EXISTS {nom} PARTITION OF {TABLE} "
+            f"FOR VALUES FROM ('{mois.isoformat()}') TO ('{mois_suivant(mois).isoformat()}')"
+        )
+
+
+def assurer(conn, mois_a_couvrir):
+    """Crée les partitions manquantes pour ces mois."""
+    connues = _connues.setdefault(conn.engine.url, set())
+    manquants = set(mois_a_couvrir) - connues
+    if not manquants:
+        return
+    existants = set(lister(conn))
+    for mois in sorted(manquants - existants):
+        _creer_partition(conn, mois)
+    connues.update(manquants & existants)
+
+
+def initialiser(conn):
+    """
+    Crée le journal partitionné s'il n'existe pas (base créée par create_all ; sinon
+    c'est la migration 0006), puis les partitions du mois courant et du suivant.
+    """
+    inspecteur = sa_inspect(conn)
+    if TABLE in inspecteur.get_table_names() and not _est_partitionnee(conn):
+        convertir(conn)
+        return
+    if not inspecteur.has_table(TABLE):
+        if _est_sqlite(conn):
+            _recreer_vue(conn)
+        else:
+            conn.exec_driver_sql(
+                f'CREATE TABLE {TABLE} (id BIGSERIAL, "timestamp" TIMESTAMP NOT NULL, '
+                f'user_id INTEGER REFERENCES users (id) ON DELETE SET NULL, action TEXT NOT NULL, PRIMARY KEY (id, "timestamp")) '
+                f'PARTITION BY RANGE ("timestamp")'
+            )
+            conn.exec_driver_sql(f'CREATE INDEX ix_{TABLE}_timestamp ON {TABLE} ("timestamp" DESC, id DESC)')
+    mois = premier_jour(datetime.datetime.utcnow())
+    assurer(conn, [mois, mois_suivant(mois)])
+
+
+def convertir(conn):
+    """
+    Transforme une table activite_logs ordinaire (schéma d'avant la migration 0006)
+    en journal partitionné, en gardant les entrées et leurs ids.
+    """
+    ancien = f"{TABLE}_avant_partitions"
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {ancien}")
+    conn.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{TABLE}_id")
+    conn.exec_driver_sql(
+        f'UPDATE {ancien} SET "timestamp" = COALESCE((SELECT MIN("timestamp") FROM {ancien}), CURRENT_TIMESTAMP) '
+        f'WHERE "timestamp" IS NULL'
+    )
+    initialiser(conn)
+    debut, fin = conn.exec_driver_sql(f'SELECT MIN("timestamp"), MAX("timestamp") FROM {ancien}').one()
+    if debut is not None:
+        if isinstance(debut, str):
+            debut, fin = datetime.datetime.fromisoformat(debut), datetime.datetime.fromisoformat(fin)
+        mois, couverts = premier_jour(debut), []
+        while mois <= premier_jour(fin):
+            couverts.append(mois)
+            mois = mois_suivant(mois)
+        assurer(conn, couverts)
+        if _est_sqlite(conn):
+            for mois in couverts:
+                conn.exec_driver_sql(
+                    f'INSERT INTO {nom_partition(mois)} (id, "timestamp", user_id, action) '
+                    f'SELECT id, "timestamp", user_id, action FROM {ancien} WHERE "timestamp" >= ? AND "timestamp" < ?',
+                    (mois.isoformat(), mois_suivant(mois).isoformat()),
+                )
+        else:
+            conn.exec_driver_sql(
+                f'INSERT INTO {TABLE} (id, "timestamp", user_id, action) SELECT id, "timestamp", user_id, action FROM {ancien}'
+            )
+    if _est_sqlite(conn):
+        # Les partitions créées avant la copie doivent aussi repartir après le plus grand id copié
+        conn.exec_driver_sql(
+            f"UPDATE sqlite_sequence SET seq = (SELECT COALESCE(MAX(id), 0) FROM {TABLE}) WHERE name GLOB '{TABLE}_[0-9]*'"
+        )
+    else:
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), (SELECT COALESCE(MAX(id), 0) + 1 FROM {TABLE}), false)"
+        )
+    conn.exec_driver_sql(f"DROP TABLE {ancien}")
+
+
+def inserer(conn, lignes):
+    """Insère des entrées du journal (dict user_id, action, timestamp), partition créée au besoin."""
+    par_mois = {}
+    for ligne in lignes:
+        par_mois.setdefault(premier_jour(ligne["timestamp"]), []).append(ligne)
+    assurer(conn, par_mois)
+    if not _est_sqlite(conn):
+        conn.execute(insert(models.ActiviteLog), lignes)
+        return
+    for mois, lot in par_mois.items():
+        # Chaque table a sa séquence : on l'aligne sur la plus avancée avant d'écrire, pour
+        # que les ids restent uniques dans la vue (l'UPDATE prend aussi le verrou d'écriture)
+        conn.exec_driver_sql(
+            f"UPDATE sqlite_sequence SET seq = (SELECT MAX(seq) FROM sqlite_sequence WHERE name GLOB '{TABLE}_[0-9]*') "
+            f"WHERE name = '{nom_partition(mois)}'"
+        )
+        conn.execute(insert(table_partition(mois)), lot)
+
+
+def supprimer(conn, mois: datetime.date):
+    """Supprime la partition d'un mois (purge) ; sur PostgreSQL elle est détachée par le DROP."""
+    conn.exec_driver_sql(f"DROP TABLE IF EXISTS {nom_partition(mois)}")
+    if _est_sqlite(conn):
+        _recreer_vue(conn)
+    _connues.get(conn.engine.url, set()).discard(mois)
+
+
+def partitions_expirees(conn, garder_mois: int, aujourd_hui=None):
+    """Partitions entièrement plus anciennes que les `garder_mois` derniers mois (mois courant compris)."""
+    limite = mois_precedent(premier_jour(aujourd_hui or datetime.date.today()), garder_mois - 1)
+    return [mois for mois in lister(conn) if mois < limite]
@@ -1,9 +1,22 @@
 # Fichier: app/schemas.py - VERSION FINALE COMPLÈTE ET INTÉGRALE
 
-from pydantic import BaseModel, EmailStr
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field
+from typing import Optional, List, Union, get_args, get_origin
 from datetime import date, datetime
 
+def nested_schema(annotation):
+    """Renvoie le schéma Pydantic imbriqué dans une annotation (X, Optional[X], List[X]) ou None."""
+    origin = get_origin(annotation)
+    if origin in (list, List, Union):
+        for arg in get_args(annotation):
+            nested = nested_schema(arg)
+            if nested is not None:
+                return nested
+        return None
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    return None
+
 # ==============================================================================
 # 1. SCHÉMAS DE BASE ET DE CRÉATION (Utilisés pour valider les données entrantes)
 # ==============================================================================
@@ -111,6 +124,13 @@ class VisiteCreate(VisiteBase):
     details_produits: List[DetailVisiteProduitBase] = []
     veilles_concurrentielles: List[VeilleConcurrentielleBase] = []
 
+# --- Envoi groupé (synchronisation hors ligne) ---
+class VisiteBatchItem(BaseModel):
+    idempotency_key: str = Field(min_length=1, max_length=64)
+    visite: VisiteCreate
+class VisiteBatchCreate(BaseModel):
+    visites: List[VisiteBatchItem] = Field(max_length=200)
+
 # ==============================================================================
 # 2. SCHÉMAS DE RÉPONSE (Utilisés pour formater les données sortantes)
 # ==============================================================================
@@ -203,6 +223,23 @@ class VisiteInfo(BaseModel):
     class Config:
         from_attributes = True
         
+class VisiteInfoPage(BaseModel):
+    items: List[VisiteInfo]
+    next_cursor: Optional[str] = None
+
+class SuppressionSync(BaseModel):
+    table: str
+    id: int
+
+class SyncReference(BaseModel):
+    categories_produit: List[CategorieProduit]
+    produits: List[Produit]
+    concurrents: List[Concurrent]
+    clients: List[Client]
+    suppressions: List[SuppressionSync]
+    next_since: str
+    has_more: bool
+
 class VisiteDetail(Visite):
     merchandiser: Merchandiser
     client: Client
@@ -212,12 +249,32 @@ class VisiteDetail(Visite):
     class Config:
         from_attributes = True
 
+class VisiteBatchResult(BaseModel):
+    idempotency_key: str
+    statut: str # 'cree', 'doublon' ou 'erreur'
+    visite_id: Optional[int] = None
+    detail: Optional[str] = None
+
+class VisiteValidationBatch(BaseModel):
+    visite_ids: List[int] = Field(min_length=1, max_length=200)
+    decision: str = Field(pattern='^(valide|rejete)$')
+
+class VisiteValidationResult(BaseModel):
+    visite_id: int
+    statut: str # 'valide', 'rejete', 'deja_traitee' ou 'introuvable'
+
 class Token(BaseModel):
     access_token: str
     token_type: str
     user_role: str
 class TokenData(BaseModel):
+    """Principal authentifié, reconstruit à partir des claims du jeton JWT."""
     email: Optional[str] = None
+    user_id: int
+    role: Optional[str] = None
+    merchandiser_id: Optional[int] = None
+    superviseur_id: Optional[int] = None
+    token_version: int = 0
 
 
 class ActiviteLog(BaseModel):
@@ -228,4 +285,8 @@ class ActiviteLog(BaseModel):
      class Config:
          from_attributes = True
 
+class ActiviteLogPage(BaseModel):
+    items: List[ActiviteLog]
+    next_cursor: Optional[str] = None
+
 
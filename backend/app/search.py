@@ -0,0 +1,227 @@
+# Fichier: app/search.py - Recherche approximative (clients, produits, utilisateurs)
+#
+# PostgreSQL : index trigrammes pg_trgm (GIN) pour la recherche par sous-chaîne et par
+# similarité, index B-tree sur lower(colonne) pour l'autocomplétion par préfixe
+# (voir la migration 0004). Les autres bases (SQLite en développement) utilisent un
+# index de trigrammes tenu en mémoire par le processus, construit à la première
+# recherche puis mis à jour par crud.py après chaque écriture.
+#
+# Dans les deux cas : les préfixes passent devant les sous-chaînes, elles-mêmes devant
+# les correspondances approximatives, et le nombre de résultats est borné.
+
+import bisect
+import math
+import re
+import threading
+
+from sqlalchemy import case, func, or_, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+SEARCH_DEFAULT_LIMIT = 50
+SEARCH_MAX_LIMIT = 200
+# Sous ce nombre de caractères il n'y a pas de trigramme exploitable : préfixe seulement
+MIN_TRIGRAM_QUERY = 3
+# Seuil de correspondance approximative (proche de pg_trgm.word_similarity_threshold)
+SIMILARITY_THRESHOLD = 0.6
+
+# Colonnes cherchées par entité ; la première est aussi la clé de tri
+CIBLES = {
+    "clients": (models.Client, ("nom_client", "contact")),
+    "produits": (models.Produit, ("nom_produit", "marque")),
+    "users": (models.User, ("nom", "email")),
+}
+
+
+def normaliser(texte) -> str:
+    return " ".join(str(texte).lower().split()) if texte else ""
+
+
+def _mots(texte: str):
+    return re.findall(r"\w+", texte)
+
+
+def trigrammes(texte: str):
+    """Trigrammes de chaque mot, précédé de deux espaces et suivi d'un (comme pg_trgm)."""
+    tris = set()
+    for mot in _mots(texte):
+        padded = f"  {mot} "
+        tris.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return tris
+
+
+def trigrammes_internes(texte: str):
+    """Trigrammes sans bourrage : présents dans tout texte qui contient `texte`."""
+    return {mot[i:i + 3] for mot in _mots(texte) for i in range(len(mot) - 2)}
+
+
+def _echapper_like(texte: str) -> str:
+    return texte.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class NgramIndex:
+    """
+    Index inversé trigramme -> ids, plus une liste triée des valeurs pour les préfixes.
+    Les ids trouvés sont relus en base : une entrée périmée (écriture annulée, autre
+    processus) ne peut que manquer ou mal classer un résultat, jamais en inventer un.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings = {}
+        self._valeurs = {}
+        self._tri = []
+
+    def construire(self, lignes):
+        """Remplit l'index d'un coup à partir de lignes (id, valeur, valeur...)."""
+        with self._lock:
+            for doc_id, *valeurs in lignes:
+                self._indexer(doc_id, valeurs)
+                self._tri.extend((valeur, doc_id) for valeur in self._valeurs[doc_id])
+            self._tri.sort()
+
+    def ajouter(self, doc_id: int, valeurs):
+        with self._lock:
+            self._retirer(doc_id)
+            self._indexer(doc_id, valeurs)
+            for valeur in self._valeurs[doc_id]:
+                bisect.insort(self._tri, (valeur, doc_id))
+
+    def _indexer(self, doc_id: int, valeurs):
+        valeurs = tuple(v for v in (normaliser(v) for v in valeurs) if v)
+        self._valeurs[doc_id] = valeurs
+        for valeur in valeurs:
+            for tri in trigrammes(valeur):
+                self._postings.setdefault(tri, set()).add(doc_id)
+
+    def retirer(self, doc_id: int):
+        with self._lock:
+            self._retirer(doc_id)
+
+    def _retirer(self, doc_id: int):
+        for valeur in self._valeurs.pop(doc_id, ()):
+            position = bisect.bisect_left(self._tri, (valeur, doc_id))
+            if position < len(self._tri) and self._tri[position] == (valeur, doc_id):
+                del self._tri[position]
+            for tri in trigrammes(valeur):
+                ids = self._postings.get(tri)
+                if ids is not None:
+                    ids.discard(doc_id)
+                    if not ids:
+                        del self._postings[tri]
+
+    def _prefixes(self, requete: str, limit: int):
+        ids = []
+        position = bisect.bisect_left(self._tri, (requete,))
+        while position < len(self._tri) and len(ids) < limit:
+            valeur, doc_id = self._tri[position]
+            if not valeur.startswith(requete):
+                break
+            if doc_id not in ids:
+                ids.append(doc_id)
+            position += 1
+        return ids
+
+    def rechercher(self, requete: str, limit: int, prefix: bool = False):
+        """Ids classés par pertinence (préfixe, puis sous-chaîne, puis similarité)."""
+        requete = normaliser(requete)
+        with self._lock:
+            if prefix or len(requete) < MIN_TRIGRAM_QUERY:
+                return self._prefixes(requete, limit)
+            vide = frozenset()
+            listes = sorted((self._postings.get(tri, vide) for tri in trigrammes(requete)), key=len)
+            if not listes:
+                return []
+            # Similarité >= seuil : au moins `requis` trigrammes communs, donc présence dans
+            # l'une des len(listes) - requis + 1 listes les plus courtes
+            requis = math.ceil(SIMILARITY_THRESHOLD * len(listes))
+            candidats = set().union(*listes[:len(listes) - requis + 1])
+            # Sous-chaîne : tous les trigrammes internes de la requête sont présents
+            internes = sorted((self._postings.get(tri, vide) for tri in trigrammes_internes(requete)), key=len)
+            contenants = set(internes[0]).intersection(*internes[1:]) if internes else set()
+            resultats = []
+            for doc_id in candidats | contenants:
+                valeurs = self._valeurs[doc_id]
+                if any(v.startswith(requete) for v in valeurs):
+                    rang = 2
+                elif any(requete in v for v in valeurs):
+                    rang = 1
+                else:
+                    rang = 0
+                similarite = sum(doc_id in liste for liste in listes) / len(listes)
+                if rang == 0 and similarite < SIMILARITY_THRESHOLD:
+                    continue
+                resultats.append((-rang, -similarite, valeurs[0] if valeurs else "", doc_id))
+        resultats.sort()
+        return [doc_id for *_, doc_id in resultats[:limit]]
+
+
+_index = {}
+_index_lock = threading.Lock()
+
+
+def _index_memoire(db: Session, cible: str) -> NgramIndex:
+    index = _index.get(cible)
+    if index is None:
+        with _index_lock:
+            index = _index.get(cible)
+            if index is None:
+                model, colonnes = CIBLES[cible]
+                index = NgramIndex()
+                index.construire(db.execute(select(model.id, *(getattr(model, c) for c in colonnes))))
+                _index[cible] = index
+    return index
+
+
+def indexer(cible: str, obj):
+    """Met à jour l'index en mémoire après l'écriture de `obj` (sans effet s'il n'est pas construit)."""
+    index = _index.get(cible)
+    if index is not None:
+        index.ajouter(obj.id, [getattr(obj, c) for c in CIBLES[cible][1]])
+
+
+def desindexer(cible: str, doc_id: int):
+    index = _index.get(cible)
+    if index is not None:
+        index.retirer(doc_id)
+
+
+def _stmt_trigrammes(model, colonnes, requete: str, prefix: bool):
+    """Requête PostgreSQL classée : préfixe, sous-chaîne (ILIKE), puis word_similarity."""
+    colonnes = [getattr(model, c) for c in colonnes]
+    motif = _echapper_like(requete)
+    est_prefixe = or_(*(func.lower(c).like(f"{motif}%", escape="\\") for c in colonnes))
+    if prefix or len(requete) < MIN_TRIGRAM_QUERY:
+        return select(model.id).where(est_prefixe).order_by(func.lower(colonnes[0]), model.id)
+    contient = or_(*(c.ilike(f"%{motif}%", escape="\\") for c in colonnes))
+    # "colonne %> requête" est l'opérateur word_similarity indexable par gin_trgm_ops
+    proche = or_(*(c.op("%>")(requete) for c in colonnes))
+    similarite = func.greatest(*(func.word_similarity(requete, c) for c in colonnes))
+    return (
+        select(model.id)
+        .where(or_(contient, proche))
+        .order_by(case((est_prefixe, 2), (contient, 1), else_=0).desc(), similarite.desc(), model.id)
+    )
+
+
+def rechercher(db: Session, cible: str, requete: str, limit: int = SEARCH_DEFAULT_LIMIT, prefix: bool = False, options=(), offset: int = 0):
+    """
+    Objets de `cible` correspondant à `requete`, les plus pertinents d'abord, par pages
+    de `limit` à partir du rang `offset`. Une requête vide parcourt toute la table par
+    id (listes des écrans d'admin) : une page pleine signale qu'il peut y en avoir d'autres.
+    """
+    model, colonnes = CIBLES[cible]
+    limit = max(1, min(limit, SEARCH_MAX_LIMIT))
+    offset = max(0, offset)
+    requete = normaliser(requete)
+    if not requete:
+        return db.query(model).options(*options).order_by(model.id).offset(offset).limit(limit).all()
+    if db.get_bind().dialect.name == "postgresql":
+        ids = db.execute(_stmt_trigrammes(model, colonnes, requete, prefix).offset(offset).limit(limit)).scalars().all()
+    else:
+        ids = _index_memoire(db, cible).rechercher(requete, offset + limit, prefix)[offset:]
+    if not ids:
+        return []
+    objets = {obj.id: obj for obj in db.query(model).options(*options).filter(model.id.in_(ids))}
+    return [objets[doc_id] for doc_id in ids if doc_id in objets]
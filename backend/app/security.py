@@ -1,6 +1,12 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Optional
+import asyncio
+import hashlib
+import hmac
+import threading
+import time
 from jose import JWTError, jwt
 from .schemas import TokenData # On importe TokenData depuis schemas
 import os
@@ -11,15 +17,71 @@ ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
 # --- Gestion des Mots de Passe ---
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Le coût bcrypt est fixé par BCRYPT_ROUNDS : un hash calculé avec un autre coût
+# est signalé par verify_and_update et recalculé à la connexion suivante.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS,
+)
+
+# bcrypt tourne sur un pool de threads dédié et borné, pour qu'un afflux de connexions
+# n'occupe pas les threads qui servent les autres routes. Au-delà de
+# PASSWORD_HASH_WORKERS calculs en cours + PASSWORD_HASH_QUEUE_MAX en attente,
+# les demandes sont refusées immédiatement (PasswordHashingBusy -> HTTP 503).
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_QUEUE_MAX = int(os.getenv("PASSWORD_HASH_QUEUE_MAX", "16"))
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+_hash_slots = threading.BoundedSemaphore(PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_MAX)
+
+class PasswordHashingBusy(Exception):
+    """La file d'attente de hachage des mots de passe est pleine."""
+
+def _submit_hashing(fn, *args):
+    if not _hash_slots.acquire(blocking=False):
+        raise PasswordHashingBusy()
+    try:
+        future = _hash_executor.submit(fn, *args)
+    except BaseException:
+        _hash_slots.release()
+        raise
+    # La place est libérée à la fin du calcul, même si l'appelant a abandonné l'attente.
+    future.add_done_callback(lambda _: _hash_slots.release())
+    return future
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+    return _submit_hashing(pwd_context.verify, plain_password, hashed_password).result()
 
 def get_password_hash(password):
-    return pwd_context.hash(password)
+    return _submit_hashing(pwd_context.hash, password).result()
+
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Vérifie le mot de passe sans bloquer la boucle d'événements.
+    Renvoie (valide, nouveau_hash) ; nouveau_hash est défini quand le hash stocké
+    doit être recalculé avec le coût courant.
+    """
+    future = _submit_hashing(pwd_context.verify_and_update, plain_password, hashed_password)
+    return await asyncio.wrap_future(future)
 
 # --- Gestion des Tokens JWT ---
+def user_claims(user) -> dict:
+    """
+    Claims qui rendent le jeton autoportant : rôle et profils métier y sont inscrits,
+    ce qui évite de recharger l'utilisateur à chaque requête authentifiée.
+    """
+    return {
+        "sub": user.email,
+        "uid": user.id,
+        "role": user.role.nom if user.role else None,
+        "mid": user.merchandiser_profile.id if user.merchandiser_profile else None,
+        "sid": user.superviseur_profile.id if user.superviseur_profile else None,
+        "ver": user.token_version or 0,
+    }
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -35,9 +97,58 @@ def verify_token(token: str, credentials_exception):
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         email: str = payload.get("sub")
-        if email is None:
+        user_id = payload.get("uid")
+        if email is None or user_id is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(
+            email=email,
+            user_id=user_id,
+            role=payload.get("role"),
+            merchandiser_id=payload.get("mid"),
+            superviseur_id=payload.get("sid"),
+            token_version=payload.get("ver", 0),
+        )
     except JWTError:
         raise credentials_exception
-    return token_data
\ No newline at end of file
+    return token_data
+
+# --- Jeton de dernière écriture ---
+# En-tête X-Last-Write : instant (epoch) de la dernière écriture d'un utilisateur, signé.
+# Le client le renvoie avec ses requêtes suivantes : le worker qui les reçoit sait que
+# l'utilisateur vient d'écrire, même si l'écriture est passée par un autre processus.
+def _signature_ecriture(corps: str) -> str:
+    return hmac.new(SECRET_KEY.encode(), corps.encode(), hashlib.sha256).hexdigest()[:32]
+
+def signer_ecriture(user_id: int, instant: float) -> str:
+    corps = f"{user_id}:{instant:.3f}"
+    return f"{corps}.{_signature_ecriture(corps)}"
+
+def verifier_ecriture(jeton: str, user_id: int) -> Optional[float]:
+    """Instant porté par le jeton, ou None s'il est invalide ou émis pour un autre utilisateur."""
+    corps, _, signature = jeton.rpartition(".")
+    if not hmac.compare_digest(signature, _signature_ecriture(corps)):
+        return None
+    uid, _, instant = corps.partition(":")
+    if uid != str(user_id):
+        return None
+    try:
+        return float(instant)
+    except ValueError:
+        return None
+
+# --- Révocation des Jetons ---
+# Cache local des versions de jeton : user_id -> (version, instant de lecture).
+# Une version à None signifie que l'utilisateur n'existe plus. Les autres processus
+# voient une révocation au plus tard après TOKEN_VERSION_TTL secondes.
+TOKEN_VERSION_TTL = int(os.getenv("TOKEN_VERSION_TTL", "60"))
+_token_versions = {}
+
+def get_cached_token_version(user_id: int) -> Optional[int]:
+    """Renvoie la version connue du jeton, ou lève KeyError si elle doit être relue en base."""
+    version, read_at = _token_versions[user_id]
+    if time.monotonic() - read_at > TOKEN_VERSION_TTL:
+        raise KeyError(user_id)
+    return version
+
+def remember_token_version(user_id: int, version: Optional[int]):
+    _token_versions[user_id] = (version, time.monotonic())
\ No newline at end of file
@@ -0,0 +1,98 @@
+# Fichier: app/serialization.py - Sérialisation JSON rapide des grosses réponses
+#
+# Le chemin standard d'une route avec response_model valide chaque objet ORM contre
+# son schéma (from_attributes) avant d'écrire le JSON : pour un détail de visite de
+# plusieurs centaines de lignes, ou une page de 1000 visites, la validation des objets
+# imbriqués domine le temps CPU. Ici on compile une fois par schéma une fonction qui
+# lit directement les attributs décrits par le schéma, et orjson écrit le résultat.
+#
+# Pas de validation : à réserver aux objets venant de la base, chargés avec
+# crud.loader_options(schema, ...) pour que les relations soient déjà présentes.
+
+import functools
+from operator import attrgetter, itemgetter
+from typing import List, Union, get_args, get_origin
+
+import orjson
+from fastapi.responses import JSONResponse, Response
+
+from . import schemas
+
+NDJSON = "application/x-ndjson"
+# Lignes NDJSON envoyées par écriture : assez peu pour que le premier octet parte
+# dès le premier lot lu en base, assez pour ne pas faire un envoi par objet
+NDJSON_LIGNES_PAR_ENVOI = 100
+
+
+class ORJSONReponse(JSONResponse):
+    """Réponse JSON écrite par orjson (classe par défaut des routes sans response_model)."""
+
+    def render(self, content) -> bytes:
+        return orjson.dumps(content)
+
+
+def _est_liste(annotation) -> bool:
+    origin = get_origin(annotation)
+    if origin in (list, List):
+        return True
+    if origin is Union:
+        return any(_est_liste(arg) for arg in get_args(annotation))
+    return False
+
+
+@functools.lru_cache(maxsize=None)
+def serialiseur(schema):
+    """
+    Fonction objet -> dict prêt pour orjson, construite à partir des champs du schéma.
+    L'objet peut être une instance ORM ou un dict (ex. la page renvoyée par crud.page_visites).
+    """
+    noms = tuple(schema.model_fields)
+    imbriques = []
+    for position, (nom, field) in enumerate(schema.model_fields.items()):
+        nested = schemas.nested_schema(field.annotation)
+        if nested is not None:
+            imbriques.append((position, serialiseur(nested), _est_liste(field.annotation)))
+    # attrgetter/itemgetter à plusieurs noms renvoient un tuple en un seul appel C
+    lire_attributs = attrgetter(*noms) if len(noms) > 1 else (lambda obj: (getattr(obj, noms[0]),))
+    lire_cles = itemgetter(*noms) if len(noms) > 1 else (lambda obj: (obj[noms[0]],))
+
+    def serialiser(obj):
+        valeurs = lire_cles(obj) if isinstance(obj, dict) else lire_attributs(obj)
+        if not imbriques:
+            return dict(zip(noms, valeurs))
+        valeurs = list(valeurs)
+        for position, sous, est_liste in imbriques:
+            valeur = valeurs[position]
+            if valeur is not None:
+                valeurs[position] = [sous(v) for v in valeur] if est_liste else sous(valeur)
+        return dict(zip(noms, valeurs))
+
+    return serialiser
+
+
+def dumps(schema, contenu, liste: bool = False) -> bytes:
+    serialiser = serialiseur(schema)
+    return orjson.dumps([serialiser(obj) for obj in contenu] if liste else serialiser(contenu))
+
+
+def reponse(schema, contenu, liste: bool = False) -> Response:
+    """Réponse JSON de `contenu` (ou d'une liste d'objets si `liste`) selon `schema`."""
+    return Response(content=dumps(schema, contenu, liste), media_type="application/json")
+
+
+def accepte_ndjson(request) -> bool:
+    """Le client demande-t-il le flux NDJSON (en-tête Accept) au lieu d'une page JSON ?"""
+    return NDJSON in request.headers.get("accept", "")
+
+
+def ndjson(schema, objets):
+    """Un objet JSON par ligne, au fil de l'itération de `objets`, par paquets de lignes."""
+    serialiser = serialiseur(schema)
+    paquet = []
+    for obj in objets:
+        paquet.append(orjson.dumps(serialiser(obj), option=orjson.OPT_APPEND_NEWLINE))
+        if len(paquet) == NDJSON_LIGNES_PAR_ENVOI:
+            yield b"".join(paquet)
+            paquet.clear()
+    if paquet:
+        yield b"".join(paquet)
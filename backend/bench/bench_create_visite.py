@@ -0,0 +1,86 @@
+# Fichier: bench/bench_create_visite.py
+#
+# Compare les deux chemins d'insertion de crud.create_visite (objets ORM ligne par
+# ligne vs INSERT multi-lignes) pour des visites de 10, 100 et 1000 lignes.
+#
+#   cd backend && python -m bench.bench_create_visite --repeat 20
+
+import argparse
+import time
+
+from bench.common import bootstrap_sqlite_app, summarize
+
+bootstrap_sqlite_app()
+
+from app import crud, database, models, schemas  # noqa: E402
+
+
+def seed(nb_produits):
+    db = database.SessionLocal()
+    try:
+        role = models.Role(nom="Merchandiser", description="Employé terrain")
+        categorie = models.CategorieProduit(nom="Bench")
+        db.add_all([role, categorie])
+        db.flush()
+        user = models.User(nom="Bench", email="bench@example.com", password_hash="x", role_id=role.id)
+        client = models.Client(nom_client="Hypermarché Bench")
+        concurrent = models.Concurrent(nom="Concurrent Bench")
+        db.add_all([user, client, concurrent])
+        db.flush()
+        merchandiser = models.Merchandiser(user_id=user.id, zone_geographique="Bench")
+        db.add(merchandiser)
+        db.add_all(models.Produit(nom_produit=f"Produit {i}", categorie_id=categorie.id) for i in range(nb_produits))
+        db.commit()
+        produit_ids = [row.id for row in db.query(models.Produit.id)]
+        return merchandiser.id, client.id, concurrent.id, produit_ids
+    finally:
+        db.close()
+
+
+def make_visite(nb_lignes, client_id, concurrent_id, produit_ids):
+    """Une visite de `nb_lignes` relevés de stock, plus un quart de commandes et un vingtième de veilles."""
+    return schemas.VisiteCreate(
+        client_id=client_id,
+        releves_stock=[
+            schemas.ReleveStockBase(produit_id=produit_ids[i % len(produit_ids)], quantite_en_stock=i)
+            for i in range(nb_lignes)
+        ],
+        details_produits=[
+            schemas.DetailVisiteProduitBase(produit_id=produit_ids[i % len(produit_ids)], type_detail="commande", quantite=i)
+            for i in range(max(1, nb_lignes // 4))
+        ],
+        veilles_concurrentielles=[
+            schemas.VeilleConcurrentielleBase(concurrent_id=concurrent_id, nombre_packs=i)
+            for i in range(max(1, nb_lignes // 20))
+        ],
+    )
+
+
+def run(visite, merchandiser_id, bulk, repeat):
+    latencies = []
+    for _ in range(repeat):
+        db = database.SessionLocal()
+        try:
+            start = time.perf_counter()
+            crud.create_visite(db, visite=visite, merchandiser_id=merchandiser_id, bulk=bulk)
+            latencies.append(time.perf_counter() - start)
+        finally:
+            db.close()
+    return summarize(latencies)
+
+
+def main(args):
+    merchandiser_id, client_id, concurrent_id, produit_ids = seed(max(args.sizes))
+    print(f"{'lignes':>7} {'mode':>6} {'p50 ms':>9} {'p95 ms':>9} {'moy. ms':>9}")
+    for nb_lignes in args.sizes:
+        visite = make_visite(nb_lignes, client_id, concurrent_id, produit_ids)
+        for label, bulk in (("orm", False), ("bulk", True)):
+            stats = run(visite, merchandiser_id, bulk, args.repeat)
+            print(f"{nb_lignes:>7} {label:>6} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['mean_ms']:>9}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark de crud.create_visite")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
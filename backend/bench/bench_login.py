@@ -0,0 +1,106 @@
+# Fichier: bench/bench_login.py
+#
+# Mesure le débit de /token et la latence p99 d'une route ordinaire pendant une rafale
+# de connexions concurrentes, puis sans rafale pour comparaison. La route de référence,
+# /merchandiser/dashboard-stats, est synchrone, sans cache et lit la base : elle partage
+# le pool de threads et le pool de connexions avec /token, ce que la rafale met à l'épreuve.
+#
+#   cd backend && python -m bench.bench_login --logins 64 --readers 8 --duration 10
+
+import argparse
+import asyncio
+import time
+
+from bench.common import bootstrap_sqlite_app, summarize
+
+app = bootstrap_sqlite_app()
+
+import httpx  # noqa: E402
+
+from app import database, models, security  # noqa: E402
+
+PASSWORD = "bench-password"
+READER_ROUTE = "/merchandiser/dashboard-stats"
+
+
+def seed(nb_users):
+    db = database.SessionLocal()
+    try:
+        role = models.Role(nom="Merchandiser", description="Employé terrain")
+        db.add(role)
+        db.flush()
+        password_hash = security.get_password_hash(PASSWORD)
+        users = [
+            models.User(nom=f"Bench {i}", email=f"bench{i}@example.com", password_hash=password_hash, role_id=role.id)
+            for i in range(nb_users)
+        ]
+        db.add_all(users)
+        db.flush()
+        # Profil merchandiser : le jeton porte alors le merchandiser_id du tableau de bord
+        db.add_all(models.Merchandiser(user_id=user.id, zone_geographique="Bench") for user in users)
+        db.commit()
+    finally:
+        db.close()
+
+
+async def login_worker(client, worker_id, nb_users, deadline, stats):
+    email = f"bench{worker_id % nb_users}@example.com"
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.post("/token", data={"username": email, "password": PASSWORD})
+        elapsed = time.perf_counter() - start
+        if response.status_code == 200:
+            stats["ok"].append(elapsed)
+        elif response.status_code == 503:
+            stats["rejected"] += 1
+            await asyncio.sleep(0.05)
+        else:
+            stats["errors"] += 1
+
+
+async def reader_worker(client, token, deadline, latencies):
+    headers = {"Authorization": f"Bearer {token}"}
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get(READER_ROUTE, headers=headers)
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+
+async def run_phase(client, token, nb_logins, nb_readers, nb_users, duration):
+    deadline = time.perf_counter() + duration
+    login_stats = {"ok": [], "rejected": 0, "errors": 0}
+    reader_latencies = []
+    await asyncio.gather(
+        *(login_worker(client, i, nb_users, deadline, login_stats) for i in range(nb_logins)),
+        *(reader_worker(client, token, deadline, reader_latencies) for _ in range(nb_readers)),
+    )
+    return login_stats, reader_latencies
+
+
+async def main(args):
+    seed(args.users)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        response = await client.post("/token", data={"username": "bench0@example.com", "password": PASSWORD})
+        token = response.json()["access_token"]
+
+        print(f"bcrypt rounds={security.BCRYPT_ROUNDS} workers={security.PASSWORD_HASH_WORKERS} "
+              f"queue={security.PASSWORD_HASH_QUEUE_MAX}")
+        for label, nb_logins in (("sans connexions", 0), ("avec connexions", args.logins)):
+            login_stats, reader_latencies = await run_phase(client, token, nb_logins, args.readers, args.users, args.duration)
+            readers = summarize(reader_latencies)
+            print(f"[{label}] {READER_ROUTE} : {readers['count']} req, p50={readers['p50_ms']} ms, p99={readers['p99_ms']} ms")
+            if nb_logins:
+                logins = summarize(login_stats["ok"])
+                print(f"[{label}] /token : {logins['count'] / args.duration:.1f} connexions/s, "
+                      f"p99={logins['p99_ms']} ms, rejetées (503)={login_stats['rejected']}, erreurs={login_stats['errors']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--logins", type=int, default=64, help="clients concurrents sur /token")
+    parser.add_argument("--readers", type=int, default=8, help=f"clients concurrents sur {READER_ROUTE}")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque phase (s)")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,96 @@
+# Fichier: bench/bench_search.py
+#
+# Latence de crud.search_clients sur un grand nombre de clients, comparée à l'ancien
+# filtre ILIKE '%q%' sans limite. Sur SQLite la recherche passe par l'index en mémoire
+# de app/search.py (sa construction est mesurée à part) ; avec BENCH_DATABASE_URL
+# pointant sur PostgreSQL, par les index pg_trgm de la migration 0004.
+#
+#   cd backend && python -m bench.bench_search --clients 100000 --repeat 50
+
+import argparse
+import random
+import time
+
+from bench.common import bootstrap_sqlite_app, summarize
+
+bootstrap_sqlite_app()
+
+from sqlalchemy import insert  # noqa: E402
+
+from app import crud, database, models, search  # noqa: E402
+
+SYLLABES = ["ba", "bou", "ca", "dja", "do", "fe", "ga", "ke", "la", "lou", "ma", "mba", "ndo", "ngo", "pa", "ra", "sa", "ta", "to", "ya", "zo"]
+TYPES = ["Boutique", "Supermarché", "Épicerie", "Kiosque", "Dépôt", "Hypermarché"]
+LOT = 5000
+
+
+def nom_aleatoire(rng):
+    return "".join(rng.choice(SYLLABES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def seed(nb_clients):
+    rng = random.Random(7)
+    lignes = [
+        {"nom_client": f"{rng.choice(TYPES)} {nom_aleatoire(rng)} {nom_aleatoire(rng)}", "contact": f"{nom_aleatoire(rng)} 6{rng.randrange(10**8):08d}"}
+        for _ in range(nb_clients)
+    ]
+    with database.engine.begin() as conn:
+        for debut in range(0, len(lignes), LOT):
+            conn.execute(insert(models.Client), lignes[debut:debut + LOT])
+    return [ligne["nom_client"] for ligne in rng.sample(lignes, 200)]
+
+
+def requetes(noms, rng):
+    """Sous-chaînes, préfixes d'autocomplétion et fautes de frappe tirés de vrais noms."""
+    for nom in noms:
+        mot = nom.split()[1].lower()
+        yield "sous-chaîne", mot[1:6], False
+        yield "préfixe", nom[:rng.randint(1, 5)], True
+        faute = list(mot)
+        faute[rng.randrange(len(faute))] = "x"
+        yield "faute de frappe", "".join(faute), False
+
+
+def ancien_search_clients(db, query):
+    search_filter = models.Client.nom_client.ilike(f"%{query}%") | models.Client.contact.ilike(f"%{query}%")
+    return db.query(models.Client).filter(search_filter).all()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=50, help="requêtes par catégorie")
+    parser.add_argument("--limit", type=int, default=search.SEARCH_DEFAULT_LIMIT)
+    args = parser.parse_args()
+
+    rng = random.Random(11)
+    noms = seed(args.clients)
+    db = database.SessionLocal()
+    try:
+        debut = time.perf_counter()
+        crud.search_clients(db, "initialisation")
+        print(f"{args.clients} clients ({database.engine.dialect.name}) ; première recherche : {(time.perf_counter() - debut) * 1000:.0f} ms")
+
+        latences, resultats = {}, {}
+        for categorie, requete, prefix in requetes(noms[:args.repeat], rng):
+            debut = time.perf_counter()
+            trouves = crud.search_clients(db, requete, limit=args.limit, prefix=prefix)
+            latences.setdefault(categorie, []).append(time.perf_counter() - debut)
+            resultats.setdefault(categorie, []).append(len(trouves))
+        for categorie, requete, prefix in list(requetes(noms[:args.repeat], rng))[::3]:
+            debut = time.perf_counter()
+            trouves = ancien_search_clients(db, requete)
+            latences.setdefault("ancien ILIKE", []).append(time.perf_counter() - debut)
+            resultats.setdefault("ancien ILIKE", []).append(len(trouves))
+    finally:
+        db.close()
+
+    print(f"{'requête':>16} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'résultats moy.':>15}")
+    for categorie, valeurs in latences.items():
+        stats = summarize(valeurs)
+        moyenne = sum(resultats[categorie]) / len(resultats[categorie])
+        print(f"{categorie:>16} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9} {moyenne:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# Fichier: bench/bench_serialization.py
+#
+# Coût de la sérialisation JSON d'un détail de visite de 500 relevés de stock et d'une
+# page de 1000 VisiteInfo, selon trois chemins :
+#   - jsonable_encoder : validation from_attributes, jsonable_encoder puis json.dumps
+#     (ancien chemin de FastAPI, encore suivi par les routes à response_class explicite) ;
+#   - pydantic : validation from_attributes puis dump_json (chemin actuel des routes
+#     avec response_model) ;
+#   - prébâti : app/serialization.py (lecture directe des attributs + orjson).
+# Les objets ORM sont construits en mémoire : seule la sérialisation est mesurée.
+# Le script vérifie aussi que les trois chemins produisent le même JSON.
+#
+#   cd backend && python -m bench.bench_serialization --repeat 50
+
+import argparse
+import datetime
+import json
+import sys
+import time
+
+from bench.common import bootstrap_sqlite_app, summarize
+
+bootstrap_sqlite_app()
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+
+from app import models, schemas, serialization  # noqa: E402
+
+
+def make_user(i, role):
+    return models.User(id=i, nom=f"User {i}", email=f"user{i}@example.com", is_active=True, role=role)
+
+
+def make_produits(nb):
+    categories = [models.CategorieProduit(id=i, nom=f"Catégorie {i}") for i in range(10)]
+    return [
+        models.Produit(id=i, nom_produit=f"Produit {i}", marque="Marque", categorie_id=i % 10, categorie=categories[i % 10])
+        for i in range(nb)
+    ]
+
+
+def make_visite(i, merchandiser, client):
+    return models.Visite(
+        id=i, merchandiser_id=merchandiser.id, merchandiser=merchandiser, client_id=client.id, client=client,
+        date_visite=datetime.date(2024, 1, 1) + datetime.timedelta(days=i % 365), statut_validation="valide",
+        observations_generales="RAS", fifo_respecte=True, planogramme_respecte=False,
+    )
+
+
+def jeux_de_donnees(nb_lignes, nb_visites):
+    role = models.Role(id=1, nom="Merchandiser", description="Employé terrain")
+    merchandisers = [
+        models.Merchandiser(id=i, user=make_user(i, role), zone_geographique=f"Zone {i % 5}") for i in range(50)
+    ]
+    clients = [
+        models.Client(id=i, nom_client=f"Client {i}", contact="6 00 00 00 00", typologie="Boutique", localisation="Douala")
+        for i in range(200)
+    ]
+    produits = make_produits(nb_lignes)
+    concurrent = models.Concurrent(id=1, nom="Concurrent")
+
+    detail = make_visite(1, merchandisers[0], clients[0])
+    detail.releves_stock = [
+        models.ReleveStock(id=i, produit_id=p.id, produit=p, quantite_en_stock=i % 40, est_en_rupture=i % 7 == 0, type_rupture="")
+        for i, p in enumerate(produits)
+    ]
+    detail.details_produits = [
+        models.DetailVisiteProduit(id=i, produit_id=p.id, produit=p, type_detail="commande", quantite=3, observation="")
+        for i, p in enumerate(produits[:50])
+    ]
+    detail.veilles_concurrentielles = [
+        models.VeilleConcurrentielle(id=1, concurrent_id=1, concurrent=concurrent, marque="X", nombre_packs=2, activite_observee="", mecanisme="")
+    ]
+    page = {
+        "items": [make_visite(i, merchandisers[i % 50], clients[i % 200]) for i in range(nb_visites)],
+        "next_cursor": "curseur",
+    }
+    return [
+        (f"VisiteDetail, {nb_lignes} relevés", schemas.VisiteDetail, detail),
+        (f"VisiteInfoPage, {nb_visites} visites", schemas.VisiteInfoPage, page),
+    ]
+
+
+def chemins(schema):
+    adaptateur = TypeAdapter(schema)
+    return {
+        "jsonable_encoder": lambda obj: json.dumps(jsonable_encoder(adaptateur.validate_python(obj, from_attributes=True))).encode(),
+        "pydantic": lambda obj: adaptateur.dump_json(adaptateur.validate_python(obj, from_attributes=True)),
+        "prébâti": lambda obj: serialization.dumps(schema, obj),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lignes", type=int, default=500, help="relevés de stock du détail de visite")
+    parser.add_argument("--visites", type=int, default=1000, help="visites de la page")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    ecarts = 0
+    print(f"{'réponse':>28} {'chemin':>17} {'p50 ms':>9} {'p95 ms':>9} {'octets':>9}")
+    for nom, schema, obj in jeux_de_donnees(args.lignes, args.visites):
+        attendu = None
+        for chemin, serialiser in chemins(schema).items():
+            latences = []
+            for _ in range(args.repeat):
+                debut = time.perf_counter()
+                corps = serialiser(obj)
+                latences.append(time.perf_counter() - debut)
+            stats = summarize(latences)
+            print(f"{nom:>28} {chemin:>17} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {len(corps):>9}")
+            if attendu is None:
+                attendu = json.loads(corps)
+            elif json.loads(corps) != attendu:
+                print(f"     JSON différent de jsonable_encoder pour {chemin}")
+                ecarts += 1
+    if ecarts:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
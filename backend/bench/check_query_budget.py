@@ -0,0 +1,208 @@
+# Fichier: bench/check_query_budget.py
+#
+# Budget de requêtes SQL par route et détection des N+1. Sur un jeu de données généré
+# par bench/seed.py, chaque route de BUDGETS est appelée dans le processus (pages
+# pleines, caches vidés) en relevant les instructions SQL qu'elle émet. Échec si :
+#   - la route dépasse son budget (nombre d'instructions par requête HTTP) ;
+#   - une même forme d'instruction (SQL aux paramètres près) revient au moins
+#     --seuil fois dans la requête : chargement paresseux d'une relation par objet
+#     (schemas.VisiteInfo, VisiteDetail, Superviseur...) au lieu d'un chargement groupé.
+# Le nombre d'instructions d'une route ne doit pas dépendre du volume : un budget se
+# fixe une fois pour toutes, et un dépassement signale une régression.
+#
+#   cd backend && python -m bench.check_query_budget
+#   python -m bench.check_query_budget --verbose     # affiche toutes les instructions
+
+import argparse
+import asyncio
+import contextvars
+import re
+import sys
+from collections import Counter
+from typing import NamedTuple, Optional
+
+from bench.common import bootstrap_sqlite_app
+from bench import seed
+
+app = bootstrap_sqlite_app()
+
+import httpx  # noqa: E402
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+
+from app import cache, crud, database, models  # noqa: E402
+
+PAGE = crud.MAX_PAGE_SIZE
+SEUIL_REPETITIONS = 3
+
+_instructions = contextvars.ContextVar("instructions_sql", default=None)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _relever(conn, cursor, statement, parameters, context, executemany):
+    # Seules les instructions émises pendant une requête mesurée (pas le thread du journal d'activité)
+    instructions = _instructions.get()
+    if instructions is not None:
+        instructions.append(statement)
+
+
+_PARAMETRES = r"(?:\?|%\(\w+\)s|%s|\$\d+|:\w+)"
+_LISTE_PARAMETRES = re.compile(rf"\(\s*{_PARAMETRES}(?:\s*,\s*{_PARAMETRES})*\s*\)")
+_NOMBRE = re.compile(r"\b\d+\b")
+_ESPACES = re.compile(r"\s+")
+
+
+def forme(sql: str) -> str:
+    """SQL aux paramètres près : listes IN (?, ?, ...) ramenées à une seule, nombres littéraux masqués."""
+    sql = _ESPACES.sub(" ", sql).strip()
+    sql = _LISTE_PARAMETRES.sub("(?)", sql)
+    return _NOMBRE.sub("N", sql)
+
+
+def repetitions(instructions, seuil: int):
+    """Formes répétées au moins `seuil` fois, avec leur nombre : le signe d'un N+1."""
+    return {sql: nombre for sql, nombre in Counter(map(forme, instructions)).items() if nombre >= seuil}
+
+
+class Budget(NamedTuple):
+    methode: str
+    chemin: str
+    profil: str  # admin, superviseur ou merchandiser
+    max_requetes: int
+    # Nom du corps JSON (POST/PUT) construit par _contexte, et en-tête Accept éventuel
+    corps: Optional[str] = None
+    accept: Optional[str] = None
+
+
+# Nombre maximal d'instructions SQL par requête HTTP (authentification comprise, une
+# fois la version du jeton en cache). À ajuster en connaissance de cause seulement.
+BUDGETS = [
+    Budget("GET", f"/superviseur/visites/historique?limit={PAGE}", "superviseur", 1),
+    Budget("GET", "/superviseur/visites/historique", "superviseur", 1, accept="application/x-ndjson"),
+    Budget("GET", f"/superviseur/visites/en-attente?limit={PAGE}", "superviseur", 1),
+    Budget("GET", f"/admin/visites/validees?limit={PAGE}", "admin", 1),
+    Budget("GET", f"/admin/visites/en-attente/all?limit={PAGE}", "admin", 1),
+    Budget("GET", "/visites/{visite}", "superviseur", 4),
+    Budget("GET", "/superviseur/dashboard-stats", "superviseur", 1),
+    Budget("GET", "/admin/dashboard-stats", "admin", 2),
+    Budget("GET", "/merchandiser/dashboard-stats", "merchandiser", 3),
+    Budget("GET", "/superviseurs/", "admin", 1),
+    Budget("GET", "/admin/users", "admin", 1),
+    Budget("GET", "/admin/activity-logs?limit=100", "admin", 1),
+    Budget("GET", "/superviseur/export/visites-validees", "superviseur", 1),
+    Budget("GET", "/clients/", "merchandiser", 1),
+    Budget("GET", "/produits/", "merchandiser", 1),
+    Budget("GET", "/sync/reference", "merchandiser", 5),
+    Budget("POST", "/visites/", "merchandiser", 8, corps="visite"),
+    Budget("PUT", "/visites/validation-batch", "superviseur", 4, corps="validation"),
+]
+
+
+def _vider_caches():
+    cache.dashboard_superviseur.clear()
+    cache.references.clear()
+
+
+async def _connexion(client, email, mot_de_passe):
+    response = await client.post("/token", data={"username": email, "password": mot_de_passe})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _contexte(jeu):
+    """Ids utilisés par les chemins et les corps : une visite et des visites en attente de l'équipe du superviseur."""
+    superviseur_id = jeu["superviseurs"][0][0]
+    db = database.SessionLocal()
+    try:
+        equipe = select(models.Merchandiser.id).where(models.Merchandiser.manager_id == superviseur_id)
+        visite = db.execute(select(models.Visite.id).where(models.Visite.merchandiser_id.in_(equipe)).limit(1)).scalar()
+        en_attente = db.execute(
+            select(models.Visite.id).where(models.Visite.merchandiser_id.in_(equipe), models.Visite.statut_validation == "soumis").limit(50)
+        ).scalars().all()
+    finally:
+        db.close()
+    produits = jeu["produits"][:5]
+    return {
+        "visite": visite,
+        "corps": {
+            "visite": {
+                "client_id": jeu["clients"][0],
+                "releves_stock": [{"produit_id": p, "quantite_en_stock": 3} for p in produits],
+                "details_produits": [{"produit_id": p, "type_detail": "commande", "quantite": 6} for p in produits],
+                "veilles_concurrentielles": [{"concurrent_id": jeu["concurrents"][0], "nombre_packs": 2}],
+            },
+            "validation": {"visite_ids": en_attente, "decision": "valide"},
+        },
+    }
+
+
+async def _appeler(client, budget, entetes, ctx):
+    chemin = budget.chemin.format(**ctx)
+    if budget.accept:
+        entetes = {**entetes, "Accept": budget.accept}
+    corps = ctx["corps"][budget.corps] if budget.corps else None
+    return await client.request(budget.methode, chemin, headers=entetes, json=corps)
+
+
+async def mesurer(budget, client, entetes, ctx):
+    """Instructions SQL émises par un appel de la route, caches vidés ; lève si la route répond en erreur."""
+    _vider_caches()
+    instructions = []
+    jeton = _instructions.set(instructions)
+    try:
+        response = await _appeler(client, budget, entetes, ctx)
+    finally:
+        _instructions.reset(jeton)
+    if response.status_code >= 400:
+        raise RuntimeError(f"{budget.methode} {budget.chemin} : HTTP {response.status_code} {response.text[:200]}")
+    return instructions
+
+
+async def executer(args, jeu):
+    ctx = _contexte(jeu)
+    echecs = 0
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        entetes = {
+            "admin": await _connexion(client, jeu["admin"], jeu["mot_de_passe"]),
+            "superviseur": await _connexion(client, jeu["superviseurs"][0][1], jeu["mot_de_passe"]),
+            "merchandiser": await _connexion(client, jeu["merchandisers"][0][1], jeu["mot_de_passe"]),
+        }
+        # Met en cache la version du jeton de chaque profil : elle n'est lue qu'une fois par TTL
+        for profil in entetes:
+            await client.get("/users/me/", headers=entetes[profil])
+
+        for budget in BUDGETS:
+            instructions = await mesurer(budget, client, entetes[budget.profil], ctx)
+            repetees = repetitions(instructions, args.seuil)
+            depasse = len(instructions) > budget.max_requetes
+            statut = "OK  " if not (depasse or repetees) else "ÉCHEC"
+            libelle = f"{budget.methode} {budget.chemin}" + (f" ({budget.accept})" if budget.accept else "")
+            print(f"{statut} {libelle} : {len(instructions)} instruction(s), budget {budget.max_requetes}")
+            for sql, nombre in repetees.items():
+                print(f"     N+1 probable, {nombre} fois : {sql[:160]}")
+            if args.verbose or depasse:
+                for sql in instructions:
+                    print(f"     - {forme(sql)[:160]}")
+            echecs += bool(depasse or repetees)
+    return echecs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Budget de requêtes SQL par route et détection des N+1.")
+    seed.ajouter_arguments(parser)
+    parser.set_defaults(visites=5000, merchandisers=40, superviseurs=4, clients=500, produits=60)
+    parser.add_argument("--seuil", type=int, default=SEUIL_REPETITIONS, help="répétitions d'une même forme signalées comme N+1")
+    parser.add_argument("--verbose", action="store_true", help="affiche les instructions de chaque route")
+    args = parser.parse_args()
+
+    print(f"Génération de {args.visites} visites ({database.engine.dialect.name})...")
+    jeu = seed.generer(database.engine, seed.volumes_depuis(args), args.graine)
+    echecs = asyncio.run(executer(args, jeu))
+    if echecs:
+        print(f"{echecs} route(s) hors budget ou avec N+1.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# Fichier: bench/check_query_plans.py
+#
+# Vérifie par EXPLAIN que les requêtes des routes chaudes passent par un index.
+# Le schéma est créé par les migrations Alembic (donc avec leurs index), rempli d'un
+# jeu de données volumineux (bench/seed.py), puis chaque requête (construite par les
+# mêmes fonctions que crud.py) est expliquée. Code de sortie 1 si une requête parcourt entièrement
+# une grande table : à lancer avant de fusionner une migration ou une nouvelle requête.
+#
+#   cd backend && python -m bench.check_query_plans --visites 50000
+#   BENCH_DATABASE_URL=postgresql://... python -m bench.check_query_plans --visites 200000
+
+import argparse
+import datetime
+import json
+import re
+import sys
+
+from bench.common import bootstrap_sqlite_app
+
+bootstrap_sqlite_app()
+
+from sqlalchemy import func, select  # noqa: E402
+
+from app import crud, database, models  # noqa: E402
+from bench.seed import generer  # noqa: E402
+
+GRANDES_TABLES = {"visites", "releves_stock", "details_visite_produit", "veilles_concurrentielles"}
+
+
+def seed(nb_visites, lignes_par_visite):
+    jeu = generer(database.engine, {
+        "superviseurs": 10, "merchandisers": 200, "clients": 2000, "produits": 50,
+        "visites": nb_visites, "lignes": lignes_par_visite,
+    })
+    premiere, derniere = jeu["visites"]
+    return jeu["superviseurs"][0][0], jeu["merchandisers"][0][0], (premiere + derniere) // 2
+
+
+def requetes_chaudes(superviseur_id, merchandiser_id, visite_id):
+    """(nom, requête) pour chaque route fréquente ; mêmes constructeurs que crud.py."""
+    aujourd_hui = datetime.date.today()
+    curseur = crud.encode_cursor(aujourd_hui - datetime.timedelta(days=365), visite_id)
+    yield "visites validées, page 1", crud.page_visites_stmt(crud.visites_validees_stmt(), None, crud.DEFAULT_PAGE_SIZE)[0]
+    yield "visites validées, page suivante", crud.page_visites_stmt(crud.visites_validees_stmt(), curseur, crud.DEFAULT_PAGE_SIZE)[0]
+    yield "visites en attente", crud.page_visites_stmt(crud.visites_en_attente_stmt(), None, crud.DEFAULT_PAGE_SIZE)[0]
+    yield "équipe : en attente", crud.page_visites_stmt(crud.visites_equipe_stmt(superviseur_id, 'soumis'), None, crud.DEFAULT_PAGE_SIZE)[0]
+    yield "équipe : historique", crud.page_visites_stmt(crud.visites_equipe_stmt(superviseur_id, 'valide'), curseur, crud.DEFAULT_PAGE_SIZE)[0]
+    yield "tableau de bord superviseur", crud.dashboard_superviseur_stmt(superviseur_id)
+    yield "export CSV de l'équipe", crud.export_visites_validees_stmt(superviseur_id, aujourd_hui - datetime.timedelta(days=30), aujourd_hui)
+    yield "détail de visite", crud.visite_detail_stmt(visite_id)
+    for model in (models.ReleveStock, models.DetailVisiteProduit, models.VeilleConcurrentielle):
+        # Requêtes émises par selectinload pour les lignes du détail de visite
+        yield f"détail de visite : {model.__tablename__}", select(model).where(model.visite_id.in_([visite_id]))
+    yield "merchandiser : visites du jour", (
+        select(func.count(models.Visite.id))
+        .where(models.Visite.merchandiser_id == merchandiser_id, models.Visite.date_visite == aujourd_hui)
+    )
+    yield "merchandiser : dernières visites", (
+        select(models.Visite).where(models.Visite.merchandiser_id == merchandiser_id).order_by(models.Visite.id.desc()).limit(3)
+    )
+    yield "lot : clé d'idempotence", (
+        select(models.Visite.id)
+        .where(models.Visite.merchandiser_id == merchandiser_id, models.Visite.idempotency_key == "bench")
+    )
+
+
+def _sql_et_parametres(stmt, dialect):
+    compiled = stmt.compile(dialect=dialect, compile_kwargs={"render_postcompile": True})
+    params = compiled.params
+    if compiled.positiontup is not None:
+        params = tuple(params[nom] for nom in compiled.positiontup)
+    return str(compiled), params
+
+
+def parcours_complets(conn, stmt):
+    """Tables de GRANDES_TABLES lues entièrement d'après le plan, et le plan brut."""
+    sql, params = _sql_et_parametres(stmt, conn.dialect)
+    if conn.dialect.name == "sqlite":
+        plan = [ligne[-1] for ligne in conn.exec_driver_sql("EXPLAIN QUERY PLAN " + sql, params)]
+        # "SCAN t" et "SCAN t USING INDEX i" parcourent toute la table ; seul SEARCH utilise l'index pour filtrer
+        tables = {m.group(1) for m in (re.match(r"SCAN (\w+)", detail) for detail in plan) if m}
+        return tables & GRANDES_TABLES, "\n".join(plan)
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + sql, params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    tables = set()
+    noeuds = [plan[0]["Plan"]]
+    while noeuds:
+        noeud = noeuds.pop()
+        if noeud.get("Node Type") == "Seq Scan":
+            tables.add(noeud.get("Relation Name"))
+        noeuds.extend(noeud.get("Plans", []))
+    return tables & GRANDES_TABLES, json.dumps(plan, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--visites", type=int, default=50000, help="nombre de visites générées")
+    parser.add_argument("--lignes", type=int, default=2, help="lignes de stock et de commande par visite")
+    parser.add_argument("--verbose", action="store_true", help="affiche tous les plans")
+    args = parser.parse_args()
+
+    print(f"Génération de {args.visites} visites ({database.engine.dialect.name})...")
+    ids = seed(args.visites, args.lignes)
+    echecs = 0
+    with database.engine.connect() as conn:
+        for nom, stmt in requetes_chaudes(*ids):
+            tables, plan = parcours_complets(conn, stmt)
+            statut = "OK  " if not tables else "SCAN"
+            print(f"{statut} {nom}" + (f" ({', '.join(sorted(tables))})" if tables else ""))
+            if tables or args.verbose:
+                print("     " + plan.replace("\n", "\n     "))
+            echecs += bool(tables)
+    if echecs:
+        print(f"{echecs} requête(s) sans index sur une grande table.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
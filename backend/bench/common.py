@@ -0,0 +1,62 @@
+# Fichier: bench/common.py - Outils partagés par les scripts de benchmark
+
+import os
+import statistics
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def bootstrap_sqlite_app(db_path=None):
+    """
+    Configure l'application sur une base SQLite fichier (ou sur BENCH_DATABASE_URL,
+    par exemple une base PostgreSQL locale), puis importe `app.main`.
+    Doit être appelé avant tout autre import de l'application.
+    """
+    database_url = os.getenv("BENCH_DATABASE_URL")
+    if not database_url:
+        if db_path is None:
+            db_path = os.path.join(tempfile.mkdtemp(prefix="merchflow-bench-"), "bench.db")
+        database_url = f"sqlite:///{db_path}"
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    from app import main
+    upgrade_schema()
+    return main.app
+
+
+def upgrade_schema():
+    """Crée ou met à jour le schéma de la base de benchmark par les migrations Alembic."""
+    from alembic import command
+    from alembic.config import Config
+
+    command.upgrade(Config(os.path.join(BACKEND_DIR, "alembic.ini")), "head")
+
+
+def percentile(values, pct):
+    """Percentile (0-100) par interpolation linéaire ; 0.0 pour une liste vide."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(latencies_s):
+    """Résumé p50/p95/p99/moyenne en millisecondes."""
+    ms = [value * 1000 for value in latencies_s]
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 2) if ms else 0.0,
+        "p50_ms": round(percentile(ms, 50), 2),
+        "p95_ms": round(percentile(ms, 95), 2),
+        "p99_ms": round(percentile(ms, 99), 2),
+    }
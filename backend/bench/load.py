@@ -0,0 +1,221 @@
+# Fichier: bench/load.py
+#
+# Banc de charge des routes fréquentes, dans le processus (httpx.ASGITransport, sans
+# serveur) : connexion, tableaux de bord, listes de visites, détail, création de
+# visite et export CSV, sur un jeu de données généré par bench/seed.py. Chaque
+# scénario tourne `--duree` secondes avec `--concurrence` clients ; on relève le débit
+# et les latences p50/p95/p99.
+#
+# Les résultats sont comparés à une référence enregistrée (bench/baselines/) ; code de
+# sortie 1 si un scénario régresse au-delà de --tolerance. --enregistrer remplace la
+# référence. Une référence ne vaut que pour la machine, la base et les volumes qui
+# l'ont produite (ils y sont notés) : la régénérer après un changement d'environnement.
+#
+#   cd backend && python -m bench.load --visites 100000
+#   cd backend && python -m bench.load --visites 100000 --enregistrer
+#   python -m bench.load --scenarios "détail visite,création visite" --duree 10
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+from bench.common import BACKEND_DIR, bootstrap_sqlite_app, summarize
+from bench import seed
+
+app = bootstrap_sqlite_app()
+
+import httpx  # noqa: E402
+
+from app import audit, database  # noqa: E402
+
+DOSSIER_REFERENCES = os.path.join(BACKEND_DIR, "bench", "baselines")
+# Comptes connectés par profil : les requêtes tournent sur plusieurs utilisateurs
+NB_SUPERVISEURS_CONNECTES = 5
+NB_MERCHANDISERS_CONNECTES = 20
+
+
+async def _connexion(client, email, mot_de_passe):
+    response = await client.post("/token", data={"username": email, "password": mot_de_passe})
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def _nouvelle_visite(rng, jeu):
+    produits = rng.sample(jeu["produits"], 4)
+    return {
+        "client_id": rng.choice(jeu["clients"]),
+        "observations_generales": "Banc de charge",
+        "releves_stock": [{"produit_id": p, "quantite_en_stock": rng.randint(0, 50), "est_en_rupture": False} for p in produits],
+        "details_produits": [{"produit_id": produits[0], "type_detail": "commande", "quantite": 12}],
+        "veilles_concurrentielles": [{"concurrent_id": rng.choice(jeu["concurrents"]), "marque": "Alpha", "nombre_packs": 3}],
+    }
+
+
+def scenarios(jeu):
+    """(nom, fonction(client, contexte, rng) -> réponse) pour chaque route mesurée."""
+    il_y_a_30_jours = (datetime.date.today() - datetime.timedelta(days=30)).isoformat()
+    premiere_visite, derniere_visite = jeu["visites"]
+
+    def login(client, ctx, rng):
+        email = rng.choice(jeu["merchandisers"][:NB_MERCHANDISERS_CONNECTES])[1]
+        return client.post("/token", data={"username": email, "password": jeu["mot_de_passe"]})
+
+    def admin(chemin):
+        return lambda client, ctx, rng: client.get(chemin, headers=ctx["admin"])
+
+    def superviseur(chemin):
+        return lambda client, ctx, rng: client.get(chemin, headers=rng.choice(ctx["superviseurs"]))
+
+    def merchandiser(chemin):
+        return lambda client, ctx, rng: client.get(chemin, headers=rng.choice(ctx["merchandisers"]))
+
+    def detail(client, ctx, rng):
+        return client.get(f"/visites/{rng.randint(premiere_visite, derniere_visite)}", headers=rng.choice(ctx["superviseurs"]))
+
+    def creation(client, ctx, rng):
+        return client.post("/visites/", json=_nouvelle_visite(rng, jeu), headers=rng.choice(ctx["merchandisers"]))
+
+    return [
+        ("connexion", login),
+        ("tableau de bord admin", admin("/admin/dashboard-stats")),
+        ("tableau de bord superviseur", superviseur("/superviseur/dashboard-stats")),
+        ("tableau de bord merchandiser", merchandiser("/merchandiser/dashboard-stats")),
+        ("visites validées (page)", admin("/admin/visites/validees")),
+        ("équipe : en attente (page)", superviseur("/superviseur/visites/en-attente")),
+        ("équipe : historique (page)", superviseur("/superviseur/visites/historique")),
+        ("détail visite", detail),
+        ("création visite", creation),
+        ("export CSV 30 jours", superviseur(f"/superviseur/export/visites-validees?date_debut={il_y_a_30_jours}")),
+    ]
+
+
+async def _client_charge(client, ctx, requete, graine, fin, stats):
+    rng = random.Random(graine)
+    while time.perf_counter() < fin:
+        debut = time.perf_counter()
+        response = await requete(client, ctx, rng)
+        duree = time.perf_counter() - debut
+        if response.status_code < 400:
+            stats["latences"].append(duree)
+        else:
+            stats["erreurs"] += 1
+
+
+async def mesurer(client, ctx, requete, concurrence, duree):
+    # Échauffement non mesuré : caches, pool de connexions, sérialiseurs compilés
+    rng = random.Random(0)
+    await asyncio.gather(*(requete(client, ctx, rng) for _ in range(concurrence)))
+    stats = {"latences": [], "erreurs": 0}
+    debut = time.perf_counter()
+    await asyncio.gather(*(_client_charge(client, ctx, requete, i, debut + duree, stats) for i in range(concurrence)))
+    ecoule = time.perf_counter() - debut
+    resume = summarize(stats["latences"])
+    return {
+        "requetes": resume.pop("count"),
+        "erreurs": stats["erreurs"],
+        "debit_rps": round(len(stats["latences"]) / ecoule, 1),
+        **resume,
+    }
+
+
+def comparer(resultats, reference, tolerance):
+    """Affiche l'écart avec la référence ; renvoie les scénarios en régression."""
+    regressions = []
+    for nom, mesure in resultats.items():
+        avant = reference["scenarios"].get(nom)
+        if not avant:
+            continue
+        ecart_p95 = (mesure["p95_ms"] - avant["p95_ms"]) / avant["p95_ms"] * 100 if avant["p95_ms"] else 0.0
+        ecart_debit = (mesure["debit_rps"] - avant["debit_rps"]) / avant["debit_rps"] * 100 if avant["debit_rps"] else 0.0
+        regresse = ecart_p95 > tolerance or ecart_debit < -tolerance or (mesure["erreurs"] and not avant["erreurs"])
+        print(f"{'RÉGRESSION' if regresse else 'ok':10} {nom:32} p95 {avant['p95_ms']:>8} -> {mesure['p95_ms']:>8} ms ({ecart_p95:+.0f} %)"
+              f"   débit {avant['debit_rps']:>7} -> {mesure['debit_rps']:>7} req/s ({ecart_debit:+.0f} %)")
+        if regresse:
+            regressions.append(nom)
+    return regressions
+
+
+async def executer(args, jeu):
+    choisis = [nom.strip() for nom in args.scenarios.split(",")] if args.scenarios else None
+    resultats = {}
+    # ASGITransport ne déclenche pas le démarrage de l'application : le journal d'activité
+    # est lancé ici pour que son écriture en arrière-plan fasse partie de la mesure
+    audit.journal.demarrer()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        ctx = {
+            "admin": await _connexion(client, jeu["admin"], jeu["mot_de_passe"]),
+            "superviseurs": [await _connexion(client, email, jeu["mot_de_passe"]) for _, email in jeu["superviseurs"][:NB_SUPERVISEURS_CONNECTES]],
+            "merchandisers": [await _connexion(client, email, jeu["mot_de_passe"]) for _, email in jeu["merchandisers"][:NB_MERCHANDISERS_CONNECTES]],
+        }
+        connus = [nom for nom, _ in scenarios(jeu)]
+        if choisis and set(choisis) - set(connus):
+            raise SystemExit(f"Scénario inconnu : {', '.join(sorted(set(choisis) - set(connus)))} (connus : {', '.join(connus)})")
+        print(f"{'scénario':32} {'req':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for nom, requete in scenarios(jeu):
+            if choisis and nom not in choisis:
+                continue
+            mesure = await mesurer(client, ctx, requete, args.concurrence, args.duree)
+            resultats[nom] = mesure
+            print(f"{nom:32} {mesure['requetes']:>6} {mesure['erreurs']:>4} {mesure['debit_rps']:>8} "
+                  f"{mesure['p50_ms']:>8} {mesure['p95_ms']:>8} {mesure['p99_ms']:>8}")
+    audit.journal.arreter()
+    return resultats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Banc de charge des routes fréquentes, comparé à une référence enregistrée.")
+    seed.ajouter_arguments(parser)
+    parser.set_defaults(visites=50000)
+    parser.add_argument("--concurrence", type=int, default=8, help="clients simultanés par scénario")
+    parser.add_argument("--duree", type=float, default=5.0, help="durée de chaque scénario (s)")
+    parser.add_argument("--scenarios", default=None, help="noms des scénarios à lancer, séparés par des virgules")
+    parser.add_argument("--reference", default=None, help="fichier de référence (bench/baselines/load-<base>.json par défaut)")
+    parser.add_argument("--enregistrer", action="store_true", help="écrit les résultats comme nouvelle référence")
+    parser.add_argument("--tolerance", type=float, default=25.0, help="régression tolérée sur p95 et débit, en %% (25 par défaut)")
+    args = parser.parse_args()
+
+    dialecte = database.engine.dialect.name
+    chemin = args.reference or os.path.join(DOSSIER_REFERENCES, f"load-{dialecte}.json")
+    print(f"Génération de {args.visites} visites ({dialecte})...")
+    jeu = seed.generer(database.engine, seed.volumes_depuis(args), args.graine)
+    resultats = asyncio.run(executer(args, jeu))
+
+    execution = {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "base": dialecte,
+        "machine": f"{platform.machine()} / {os.cpu_count()} CPU / Python {platform.python_version()}",
+        "volumes": jeu["volumes"],
+        "concurrence": args.concurrence,
+        "duree_s": args.duree,
+        "scenarios": resultats,
+    }
+    if args.enregistrer:
+        os.makedirs(os.path.dirname(chemin), exist_ok=True)
+        with open(chemin, "w", encoding="utf-8") as fichier:
+            json.dump(execution, fichier, indent=2, ensure_ascii=False)
+            fichier.write("\n")
+        print(f"Référence enregistrée : {chemin}")
+        return
+    if not os.path.exists(chemin):
+        print(f"Pas de référence ({chemin}) : relancer avec --enregistrer pour en créer une.")
+        return
+    with open(chemin, encoding="utf-8") as fichier:
+        reference = json.load(fichier)
+    print(f"\nComparaison avec la référence du {reference['date']} ({reference['machine']}) :")
+    if (reference["volumes"], reference["concurrence"], reference["duree_s"]) != (jeu["volumes"], args.concurrence, args.duree):
+        print("  attention : volumes ou paramètres différents de la référence, écarts peu significatifs")
+    regressions = comparer(resultats, reference, args.tolerance)
+    if regressions:
+        print(f"{len(regressions)} scénario(s) au-delà de la tolérance de {args.tolerance:.0f} %.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
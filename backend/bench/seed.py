@@ -0,0 +1,283 @@
+# Fichier: bench/seed.py - Jeu de données synthétique pour les benchmarks
+#
+# Remplit la base par le schéma réel (app/models.py) avec des volumes réalistes :
+# superviseurs et leurs équipes de merchandisers, clients répartis par zone, catalogue
+# de produits, concurrents, et un historique de visites avec relevés de stock,
+# commandes/incidents et veille concurrentielle. Les visites anciennes sont validées
+# ou rejetées par le superviseur de l'équipe, les plus récentes sont en attente.
+# Insertion par INSERT multi-lignes (Core), puis recalcul des compteurs et des cumuls
+# mensuels comme le ferait l'application.
+#
+#   cd backend && python -m bench.seed --db /tmp/merchflow.db --visites 1000000
+#   BENCH_DATABASE_URL=postgresql://... python -m bench.seed --visites 1000000
+#
+# Tous les comptes créés ont le mot de passe MOT_DE_PASSE.
+
+import argparse
+import datetime
+import random
+import time
+
+from bench.common import BACKEND_DIR  # noqa: F401  (ajoute backend/ au chemin d'import)
+
+from sqlalchemy import func, insert, select, text
+
+MOT_DE_PASSE = "bench-password"
+EMAIL_ADMIN = "admin@example.com"
+LOT = 5000
+
+ZONES = ["Littoral", "Centre", "Ouest", "Nord-Ouest", "Sud-Ouest", "Adamaoua", "Est", "Sud"]
+TYPOLOGIES = ["Supermarché", "Boutique", "Grossiste", "Station-service", "Kiosque"]
+CATEGORIES = ["Boissons", "Biscuits", "Confiserie", "Produits laitiers", "Hygiène", "Entretien", "Conserves", "Céréales"]
+MARQUES = ["Alpha", "Bravo", "Delta", "Kappa", "Sigma", "Omega"]
+RUPTURES = ["rayon", "entrepôt"]
+INCIDENTS = ["Produit abîmé", "Date courte", "Étiquette manquante"]
+ACTIVITES = ["Promotion", "Dégustation", "Nouveau présentoir", "Baisse de prix"]
+
+
+def volumes_par_defaut():
+    return {
+        "superviseurs": 20,
+        "merchandisers": 400,
+        "clients": 5000,
+        "produits": 300,
+        "concurrents": 25,
+        "visites": 100000,
+        "jours": 365,
+        "lignes": 4,
+    }
+
+
+def _prochain_id(conn, model):
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def _inserer(conn, model, lignes):
+    for debut in range(0, len(lignes), LOT):
+        conn.execute(insert(model), lignes[debut:debut + LOT])
+
+
+def _inserer_avec_ids(conn, model, lignes):
+    """Insère en attribuant les ids (à la suite des existants) et les renvoie, sans relire la table."""
+    premier = _prochain_id(conn, model)
+    for i, ligne in enumerate(lignes):
+        ligne["id"] = premier + i
+    _inserer(conn, model, lignes)
+    return [ligne["id"] for ligne in lignes]
+
+
+def _recaler_sequences(conn, tables):
+    """PostgreSQL : les séquences ne voient pas les ids insérés explicitement."""
+    if conn.dialect.name != "postgresql":
+        return
+    for table in tables:
+        conn.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT COALESCE(MAX(id), 0) + 1 FROM {table}), false)"))
+
+
+def _role(conn, models, nom, description):
+    role_id = conn.execute(select(models.Role.id).where(models.Role.nom == nom)).scalar()
+    if role_id is None:
+        role_id = conn.execute(insert(models.Role).values(nom=nom, description=description)).inserted_primary_key[0]
+    return role_id
+
+
+def _lignes_visite(rng, visite_id, produits, concurrent_ids, nb_lignes):
+    releves, details, veilles = [], [], []
+    for produit_id in rng.sample(produits, min(len(produits), max(1, int(rng.gauss(nb_lignes, 1))))):
+        rupture = rng.random() < 0.08
+        releves.append({
+            "visite_id": visite_id, "produit_id": produit_id,
+            "quantite_en_stock": 0 if rupture else rng.randint(1, 120),
+            "est_en_rupture": rupture, "type_rupture": rng.choice(RUPTURES) if rupture else "",
+        })
+        if rupture or rng.random() < 0.4:
+            details.append({
+                "visite_id": visite_id, "produit_id": produit_id, "type_detail": "commande",
+                "quantite": rng.randint(6, 96), "observation": "",
+            })
+        elif rng.random() < 0.03:
+            details.append({
+                "visite_id": visite_id, "produit_id": produit_id, "type_detail": "incident",
+                "quantite": rng.randint(1, 5), "observation": rng.choice(INCIDENTS),
+            })
+    if rng.random() < 0.3:
+        veilles.append({
+            "visite_id": visite_id, "concurrent_id": rng.choice(concurrent_ids), "marque": rng.choice(MARQUES),
+            "nombre_packs": rng.randint(0, 40), "activite_observee": rng.choice(ACTIVITES), "mecanisme": "",
+        })
+    return releves, details, veilles
+
+
+def generer(engine, volumes=None, graine: int = 42, progression=None):
+    """
+    Génère le jeu de données dans la base de `engine` (schéma déjà créé) et renvoie
+    de quoi s'y connecter : emails et ids des comptes, bornes des ids de visites.
+    `progression(n)` est appelé après chaque lot de visites insérées.
+    """
+    from app import crud, database, models, security
+
+    volumes = {**volumes_par_defaut(), **(volumes or {})}
+    rng = random.Random(graine)
+    aujourd_hui = datetime.date.today()
+    password_hash = security.get_password_hash(MOT_DE_PASSE)
+
+    with engine.begin() as conn:
+        role_admin = _role(conn, models, "Administrateur", "Gère tout le système")
+        role_superviseur = _role(conn, models, "Superviseur", "Gère une équipe de merchandisers")
+        role_merchandiser = _role(conn, models, "Merchandiser", "Employé terrain")
+
+        def comptes(prefixe, nombre, role_id):
+            return _inserer_avec_ids(conn, models.User, [
+                {"nom": f"{prefixe.capitalize()} {i}", "email": f"{prefixe}{i}@example.com", "password_hash": password_hash,
+                 "role_id": role_id, "is_active": True, "token_version": 0}
+                for i in range(nombre)
+            ])
+
+        if conn.execute(select(models.User.id).where(models.User.email == EMAIL_ADMIN)).first() is None:
+            _inserer_avec_ids(conn, models.User, [{"nom": "Admin", "email": EMAIL_ADMIN, "password_hash": password_hash, "role_id": role_admin, "is_active": True, "token_version": 0}])
+        superviseur_users = comptes("superviseur", volumes["superviseurs"], role_superviseur)
+        merchandiser_users = comptes("merchandiser", volumes["merchandisers"], role_merchandiser)
+        superviseur_ids = _inserer_avec_ids(conn, models.Superviseur, [{"user_id": uid} for uid in superviseur_users])
+
+        # Chaque équipe couvre une zone ; les clients d'une zone sont visités par son équipe
+        zone_equipe = {sid: ZONES[i % len(ZONES)] for i, sid in enumerate(superviseur_ids)}
+        manager_de = {}
+        merchandisers = []
+        for i, uid in enumerate(merchandiser_users):
+            manager_id = superviseur_ids[i % len(superviseur_ids)]
+            merchandisers.append({"user_id": uid, "manager_id": manager_id, "zone_geographique": zone_equipe[manager_id]})
+        merchandiser_ids = _inserer_avec_ids(conn, models.Merchandiser, merchandisers)
+        for merchandiser_id, ligne in zip(merchandiser_ids, merchandisers):
+            manager_de[merchandiser_id] = ligne["manager_id"]
+
+        clients = [
+            {"nom_client": f"{rng.choice(TYPOLOGIES)} {i}", "contact": f"6{rng.randrange(10**8):08d}",
+             "typologie": rng.choice(TYPOLOGIES), "localisation": ZONES[i % len(ZONES)], "version_sync": 0}
+            for i in range(volumes["clients"])
+        ]
+        client_ids = _inserer_avec_ids(conn, models.Client, clients)
+        clients_par_zone = {}
+        for client_id, ligne in zip(client_ids, clients):
+            clients_par_zone.setdefault(ligne["localisation"], []).append(client_id)
+        # Portefeuille de chaque merchandiser : quelques dizaines de clients de sa zone
+        portefeuilles = {
+            merchandiser_id: rng.sample(clients_par_zone[ligne["zone_geographique"]], min(40, len(clients_par_zone[ligne["zone_geographique"]])))
+            for merchandiser_id, ligne in zip(merchandiser_ids, merchandisers)
+        }
+
+        categorie_ids = []
+        for nom in CATEGORIES:
+            categorie_id = conn.execute(select(models.CategorieProduit.id).where(models.CategorieProduit.nom == nom)).scalar()
+            if categorie_id is None:
+                categorie_id = _inserer_avec_ids(conn, models.CategorieProduit, [{"nom": nom, "version_sync": 0}])[0]
+            categorie_ids.append(categorie_id)
+        produit_ids = _inserer_avec_ids(conn, models.Produit, [
+            {"nom_produit": f"Produit {i}", "marque": rng.choice(MARQUES), "categorie_id": rng.choice(categorie_ids), "version_sync": 0}
+            for i in range(volumes["produits"])
+        ])
+        premier_concurrent = _prochain_id(conn, models.Concurrent)
+        concurrent_ids = _inserer_avec_ids(conn, models.Concurrent, [
+            {"nom": f"Concurrent {premier_concurrent + i}", "version_sync": 0} for i in range(volumes["concurrents"])
+        ])
+        # Gamme suivie par chaque merchandiser : les relevés portent sur ces produits
+        gammes = {merchandiser_id: rng.sample(produit_ids, min(30, len(produit_ids))) for merchandiser_id in merchandiser_ids}
+
+    premiere_visite = None
+    restantes = volumes["visites"]
+    while restantes > 0:
+        nombre = min(LOT, restantes)
+        with engine.begin() as conn:
+            visites = []
+            for _ in range(nombre):
+                merchandiser_id = rng.choice(merchandiser_ids)
+                age = int(rng.triangular(0, volumes["jours"], 0))
+                date_visite = aujourd_hui - datetime.timedelta(days=age)
+                if age < 3:
+                    statut = "soumis"
+                else:
+                    statut = rng.choices(["valide", "rejete", "soumis"], weights=[90, 6, 4 if age < 30 else 0])[0]
+                decidee = statut != "soumis"
+                visites.append({
+                    "merchandiser_id": merchandiser_id,
+                    "client_id": rng.choice(portefeuilles[merchandiser_id]),
+                    "date_visite": date_visite,
+                    "statut_validation": statut,
+                    "observations_generales": "",
+                    "fifo_respecte": rng.random() < 0.9,
+                    "planogramme_respecte": rng.random() < 0.85,
+                    "validateur_id": manager_de[merchandiser_id] if decidee else None,
+                    "date_validation": date_visite + datetime.timedelta(days=rng.randint(0, 2)) if decidee else None,
+                    "heure_debut": datetime.time(rng.randint(8, 17), rng.choice((0, 15, 30, 45))),
+                })
+            visite_ids = _inserer_avec_ids(conn, models.Visite, visites)
+            premiere_visite = premiere_visite or visite_ids[0]
+            releves, details, veilles = [], [], []
+            for visite_id, visite in zip(visite_ids, visites):
+                lignes = _lignes_visite(rng, visite_id, gammes[visite["merchandiser_id"]], concurrent_ids, volumes["lignes"])
+                releves += lignes[0]
+                details += lignes[1]
+                veilles += lignes[2]
+            _inserer(conn, models.ReleveStock, releves)
+            _inserer(conn, models.DetailVisiteProduit, details)
+            _inserer(conn, models.VeilleConcurrentielle, veilles)
+        restantes -= nombre
+        if progression:
+            progression(volumes["visites"] - restantes)
+
+    with engine.begin() as conn:
+        _recaler_sequences(conn, ["users", "superviseurs", "merchandisers", "clients", "categories_produit", "produits", "concurrents", "visites"])
+    db = database.SessionLocal()
+    try:
+        crud.reconcilier_compteurs(db)
+        crud.reconstruire_stats_mensuelles(db)
+    finally:
+        db.close()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+    return {
+        "mot_de_passe": MOT_DE_PASSE,
+        "admin": EMAIL_ADMIN,
+        "superviseurs": [(sid, f"superviseur{i}@example.com") for i, sid in enumerate(superviseur_ids)],
+        "merchandisers": [(mid, f"merchandiser{i}@example.com") for i, mid in enumerate(merchandiser_ids)],
+        "clients": client_ids,
+        "produits": produit_ids,
+        "concurrents": concurrent_ids,
+        "visites": (premiere_visite, premiere_visite + volumes["visites"] - 1) if premiere_visite else None,
+        "volumes": volumes,
+    }
+
+
+def ajouter_arguments(parser):
+    """Options de volume communes à seed.py et aux scripts qui s'en servent."""
+    for nom, valeur in volumes_par_defaut().items():
+        parser.add_argument(f"--{nom}", type=int, default=valeur, help=f"{valeur} par défaut")
+    parser.add_argument("--graine", type=int, default=42, help="graine du générateur aléatoire")
+
+
+def volumes_depuis(args):
+    return {nom: getattr(args, nom) for nom in volumes_par_defaut()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Génère un jeu de données synthétique (schéma créé par les migrations).")
+    parser.add_argument("--db", default=None, help="fichier SQLite à remplir (sinon BENCH_DATABASE_URL, ou un fichier temporaire)")
+    ajouter_arguments(parser)
+    args = parser.parse_args()
+
+    from bench.common import bootstrap_sqlite_app
+    bootstrap_sqlite_app(args.db)
+    from app import database
+
+    debut = time.perf_counter()
+    print(f"Génération de {args.visites} visites dans {database.engine.url.render_as_string(hide_password=True)}...")
+    jeu = generer(
+        database.engine, volumes_depuis(args), args.graine,
+        progression=lambda n: print(f"  {n} visites ({time.perf_counter() - debut:.0f} s)") if n % 100000 == 0 else None,
+    )
+    print(f"Terminé en {time.perf_counter() - debut:.0f} s. Comptes : {jeu['admin']}, {jeu['superviseurs'][0][1]}, "
+          f"{jeu['merchandisers'][0][1]}... (mot de passe : {jeu['mot_de_passe']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+# Fichier: migrations/env.py - Environnement Alembic
+#
+# Le schéma cible est models.Base.metadata ; l'URL est celle de l'application
+# (app/config.py), ou celle passée par le code appelant (config.attributes["connection"]).
+
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app import models, partitions
+from app.config import settings
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = models.Base.metadata
+
+
+def include_object(obj, name, type_, reflected, compare_to):
+    """
+    Ignore à la comparaison les index réservés à un autre dialecte (models.index_recherche)
+    et le journal partitionné, dont le schéma est géré par app/partitions.py.
+    """
+    if type_ == "table" and (obj.info.get("partitionnee") or partitions.MOTIF_PARTITION.match(name)):
+        return False
+    if type_ == "index" and not reflected and obj._ddl_if is not None:
+        dialecte = obj._ddl_if.dialect
+        return dialecte is None or dialecte == context.get_context().dialect.name
+    return True
+
+
+def run_migrations_offline():
+    """Génère le SQL sans se connecter (`alembic upgrade head --sql`)."""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url") or settings.database_url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        render_as_batch=True,
+        include_object=include_object,
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def _run(connection):
+    # render_as_batch : ALTER TABLE recréé par copie sur SQLite
+    context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True, include_object=include_object)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online():
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        _run(connection)
+        return
+    engine = create_engine(config.get_main_option("sqlalchemy.url") or settings.database_url, poolclass=pool.NullPool)
+    with engine.connect() as connection:
+        _run(connection)
+    engine.dispose()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
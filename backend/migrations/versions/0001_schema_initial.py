@@ -0,0 +1,144 @@
+"""Schéma initial, tel que créé par create_all avant l'arrivée des migrations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+
+Une base existante créée par create_all avec ce schéma se marque sans rien exécuter :
+`alembic stamp 0001`, puis `alembic upgrade head`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def _id():
+    return sa.Column('id', sa.Integer(), primary_key=True)
+
+
+def upgrade():
+    op.create_table(
+        'roles',
+        _id(),
+        sa.Column('nom', sa.String(50), nullable=False, unique=True),
+        sa.Column('description', sa.Text(), nullable=True),
+    )
+    op.create_table(
+        'users',
+        _id(),
+        sa.Column('nom', sa.String(100), nullable=False),
+        sa.Column('email', sa.String(255), nullable=False),
+        sa.Column('password_hash', sa.String(255), nullable=False),
+        sa.Column('is_active', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.TIMESTAMP(), nullable=True),
+        sa.Column('role_id', sa.Integer(), sa.ForeignKey('roles.id'), nullable=True),
+    )
+    op.create_index('ix_users_email', 'users', ['email'], unique=True)
+    op.create_table(
+        'superviseurs',
+        _id(),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True, unique=True),
+    )
+    op.create_table(
+        'merchandisers',
+        _id(),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True, unique=True),
+        sa.Column('zone_geographique', sa.String(100), nullable=True),
+        sa.Column('manager_id', sa.Integer(), sa.ForeignKey('superviseurs.id'), nullable=True),
+    )
+    op.create_table(
+        'clients',
+        _id(),
+        sa.Column('nom_client', sa.String(200), nullable=False),
+        sa.Column('contact', sa.String(100), nullable=True),
+        sa.Column('typologie', sa.String(100), nullable=True),
+        sa.Column('localisation', sa.String(255), nullable=True),
+        sa.Column('createur_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+    )
+    op.create_table(
+        'categories_produit',
+        _id(),
+        sa.Column('nom', sa.String(100), nullable=False, unique=True),
+    )
+    op.create_table(
+        'produits',
+        _id(),
+        sa.Column('nom_produit', sa.String(200), nullable=False),
+        sa.Column('marque', sa.String(100), nullable=True),
+        sa.Column('categorie_id', sa.Integer(), sa.ForeignKey('categories_produit.id'), nullable=True),
+    )
+    op.create_table(
+        'concurrents',
+        _id(),
+        sa.Column('nom', sa.String(255), nullable=False, unique=True),
+    )
+    op.create_table(
+        'visites',
+        _id(),
+        sa.Column('merchandiser_id', sa.Integer(), sa.ForeignKey('merchandisers.id'), nullable=True),
+        sa.Column('client_id', sa.Integer(), sa.ForeignKey('clients.id'), nullable=True),
+        sa.Column('date_visite', sa.Date(), nullable=True),
+        sa.Column('statut_validation', sa.String(50), nullable=True),
+        sa.Column('observations_generales', sa.Text(), nullable=True),
+        sa.Column('fifo_respecte', sa.Boolean(), nullable=True),
+        sa.Column('planogramme_respecte', sa.Boolean(), nullable=True),
+        sa.Column('validateur_id', sa.Integer(), sa.ForeignKey('superviseurs.id'), nullable=True),
+        sa.Column('date_validation', sa.Date(), nullable=True),
+        sa.Column('heure_debut', sa.Time(), nullable=True),
+    )
+    op.create_table(
+        'releves_stock',
+        _id(),
+        sa.Column('visite_id', sa.Integer(), sa.ForeignKey('visites.id'), nullable=True),
+        sa.Column('produit_id', sa.Integer(), sa.ForeignKey('produits.id'), nullable=True),
+        sa.Column('quantite_en_stock', sa.Integer(), nullable=True),
+        sa.Column('est_en_rupture', sa.Boolean(), nullable=True),
+        sa.Column('type_rupture', sa.String(100), nullable=True),
+    )
+    op.create_table(
+        'details_visite_produit',
+        _id(),
+        sa.Column('visite_id', sa.Integer(), sa.ForeignKey('visites.id'), nullable=True),
+        sa.Column('produit_id', sa.Integer(), sa.ForeignKey('produits.id'), nullable=True),
+        sa.Column('type_detail', sa.String(50), nullable=False),
+        sa.Column('quantite', sa.Integer(), nullable=True),
+        sa.Column('observation', sa.Text(), nullable=True),
+    )
+    op.create_table(
+        'veilles_concurrentielles',
+        _id(),
+        sa.Column('visite_id', sa.Integer(), sa.ForeignKey('visites.id'), nullable=True),
+        sa.Column('concurrent_id', sa.Integer(), sa.ForeignKey('concurrents.id'), nullable=True),
+        sa.Column('marque', sa.String(255), nullable=True),
+        sa.Column('nombre_packs', sa.Integer(), nullable=True),
+        sa.Column('activite_observee', sa.Text(), nullable=True),
+        sa.Column('mecanisme', sa.Text(), nullable=True),
+    )
+    op.create_table(
+        'activite_logs',
+        _id(),
+        sa.Column('timestamp', sa.TIMESTAMP(), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('action', sa.Text(), nullable=False),
+    )
+    # create_all indexait aussi chaque clé primaire (index=True sur les colonnes id)
+    for table in (
+        'roles', 'users', 'superviseurs', 'merchandisers', 'clients', 'categories_produit', 'produits',
+        'concurrents', 'visites', 'releves_stock', 'details_visite_produit', 'veilles_concurrentielles',
+        'activite_logs',
+    ):
+        op.create_index(f'ix_{table}_id', table, ['id'])
+
+
+def downgrade():
+    for table in (
+        'activite_logs', 'veilles_concurrentielles', 'details_visite_produit', 'releves_stock', 'visites',
+        'concurrents', 'produits', 'categories_produit', 'clients', 'merchandisers', 'superviseurs', 'users',
+        'roles',
+    ):
+        op.drop_table(table)
@@ -0,0 +1,47 @@
+"""Version des jetons, clé d'idempotence des visites, tables de statistiques
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch:
+        batch.add_column(sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+    with op.batch_alter_table('visites') as batch:
+        batch.add_column(sa.Column('idempotency_key', sa.String(64), nullable=True))
+        batch.create_unique_constraint('uq_visites_merchandiser_idempotency', ['merchandiser_id', 'idempotency_key'])
+    op.create_table(
+        'stat_compteurs',
+        sa.Column('cle', sa.String(100), primary_key=True),
+        sa.Column('valeur', sa.BigInteger(), nullable=False),
+    )
+    op.create_table(
+        'stat_merchandiser_mois',
+        sa.Column('merchandiser_id', sa.Integer(), sa.ForeignKey('merchandisers.id'), primary_key=True),
+        sa.Column('mois', sa.Date(), primary_key=True),
+        sa.Column('nb_visites', sa.Integer(), nullable=False),
+        sa.Column('nb_visites_validees', sa.Integer(), nullable=False),
+        sa.Column('quantite_commandee', sa.BigInteger(), nullable=False),
+        sa.Column('quantite_validee', sa.BigInteger(), nullable=False),
+    )
+    # Les tables de statistiques se remplissent au démarrage de l'API (ou via app.cli)
+
+
+def downgrade():
+    op.drop_table('stat_merchandiser_mois')
+    op.drop_table('stat_compteurs')
+    with op.batch_alter_table('visites') as batch:
+        batch.drop_constraint('uq_visites_merchandiser_idempotency', type_='unique')
+        batch.drop_column('idempotency_key')
+    with op.batch_alter_table('users') as batch:
+        batch.drop_column('token_version')
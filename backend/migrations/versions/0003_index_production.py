@@ -0,0 +1,41 @@
+"""Index des filtres fréquents : listes de visites, équipes, lignes de visite
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+
+Sur PostgreSQL les index sont créés avec CREATE INDEX CONCURRENTLY, hors transaction,
+pour ne pas bloquer les écritures pendant la construction.
+"""
+from alembic import op
+
+
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+INDEX = (
+    ('ix_visites_statut_date', 'visites', ['statut_validation', 'date_visite', 'id']),
+    ('ix_visites_merchandiser_date', 'visites', ['merchandiser_id', 'date_visite', 'id']),
+    ('ix_visites_client_id', 'visites', ['client_id']),
+    ('ix_merchandisers_manager_id', 'merchandisers', ['manager_id']),
+    ('ix_releves_stock_visite_id', 'releves_stock', ['visite_id']),
+    ('ix_releves_stock_produit_id', 'releves_stock', ['produit_id']),
+    ('ix_details_visite_produit_visite_id', 'details_visite_produit', ['visite_id']),
+    ('ix_details_visite_produit_produit_id', 'details_visite_produit', ['produit_id']),
+    ('ix_veilles_concurrentielles_visite_id', 'veilles_concurrentielles', ['visite_id']),
+    ('ix_veilles_concurrentielles_concurrent_id', 'veilles_concurrentielles', ['concurrent_id']),
+)
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for nom, table, colonnes in INDEX:
+            op.create_index(nom, table, colonnes, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for nom, table, _ in INDEX:
+            op.drop_index(nom, table_name=table, postgresql_concurrently=True, if_exists=True)
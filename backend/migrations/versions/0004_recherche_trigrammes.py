@@ -0,0 +1,44 @@
+"""Index de recherche : trigrammes pg_trgm et préfixes sur lower(colonne)
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+
+PostgreSQL uniquement (voir app/search.py) ; sur SQLite la recherche passe par un
+index en mémoire et cette révision ne fait rien.
+"""
+from alembic import op
+
+
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+COLONNES = (
+    ('clients', 'nom_client'),
+    ('clients', 'contact'),
+    ('produits', 'nom_produit'),
+    ('produits', 'marque'),
+    ('users', 'nom'),
+    ('users', 'email'),
+)
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    with op.get_context().autocommit_block():
+        for table, colonne in COLONNES:
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{colonne}_trgm ON {table} USING gin ({colonne} gin_trgm_ops)')
+            op.execute(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_{table}_{colonne}_lower ON {table} (lower({colonne}) text_pattern_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    with op.get_context().autocommit_block():
+        for table, colonne in COLONNES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_{colonne}_trgm')
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS ix_{table}_{colonne}_lower')
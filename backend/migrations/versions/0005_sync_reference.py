@@ -0,0 +1,45 @@
+"""Suivi des modifications des données de référence pour /sync/reference
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18
+
+Les lignes existantes reçoivent la version 0 : la première synchronisation d'un
+appareil (sans `since`) les renvoie toutes.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+TABLES = ('clients', 'produits', 'categories_produit', 'concurrents')
+
+
+def upgrade():
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column('updated_at', sa.TIMESTAMP(), nullable=True))
+            batch.add_column(sa.Column('version_sync', sa.BigInteger(), nullable=False, server_default='0'))
+        op.create_index(f'ix_{table}_version_sync', table, ['version_sync', 'id'])
+    op.create_table(
+        'suppressions_reference',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('table_nom', sa.String(50), nullable=False),
+        sa.Column('objet_id', sa.Integer(), nullable=False),
+        sa.Column('supprime_le', sa.TIMESTAMP(), nullable=True),
+        sa.Column('version_sync', sa.BigInteger(), nullable=False),
+    )
+    op.create_index('ix_suppressions_reference_version_sync', 'suppressions_reference', ['version_sync', 'id'])
+
+
+def downgrade():
+    op.drop_table('suppressions_reference')
+    for table in TABLES:
+        op.drop_index(f'ix_{table}_version_sync', table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column('version_sync')
+            batch.drop_column('updated_at')
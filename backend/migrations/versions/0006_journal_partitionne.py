@@ -0,0 +1,145 @@
+"""Journal d'activité partitionné par mois, index (timestamp DESC, id DESC)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18
+
+activite_logs devient une table partitionnée par mois sur PostgreSQL, et une vue sur
+une table par mois sur SQLite ; les entrées existantes sont recopiées dans leur
+partition avec leurs ids. Les partitions du mois courant et du suivant sont créées
+aussi ; les mois suivants le sont à l'exécution par app/partitions.py.
+Sur PostgreSQL la copie verrouille le journal : à passer hors des heures de pointe
+sur un gros historique.
+
+Le schéma est figé ici (sans import de app/partitions.py) : une évolution ultérieure
+du module ne doit pas changer ce que produit cette migration.
+"""
+import datetime
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+TABLE = 'activite_logs'
+ANCIEN = f'{TABLE}_avant_partitions'
+MOTIF_PARTITION = re.compile(rf"^{TABLE}_(\d{{4}})_(\d{{2}})$")
+
+
+def _premier_jour(valeur):
+    return datetime.date(valeur.year, valeur.month, 1)
+
+
+def _mois_suivant(mois):
+    return datetime.date(mois.year + mois.month // 12, mois.month % 12 + 1, 1)
+
+
+def _nom_partition(mois):
+    return f"{TABLE}_{mois.year:04d}_{mois.month:02d}"
+
+
+def _partitions(conn):
+    """Mois des partitions existantes, du plus ancien au plus récent."""
+    mois = []
+    for nom in sa.inspect(conn).get_table_names():
+        trouve = MOTIF_PARTITION.match(nom)
+        if trouve:
+            mois.append(datetime.date(int(trouve.group(1)), int(trouve.group(2)), 1))
+    return sorted(mois)
+
+
+def _creer_partition_sqlite(conn, mois):
+    nom = _nom_partition(mois)
+    conn.exec_driver_sql(
+        f'CREATE TABLE {nom} (id INTEGER PRIMARY KEY AUTOINCREMENT, "timestamp" TIMESTAMP NOT NULL, '
+        f'user_id INTEGER REFERENCES users (id), action TEXT NOT NULL)'
+    )
+    conn.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('{nom}', 0)")
+    conn.exec_driver_sql(f'CREATE INDEX ix_{nom}_timestamp ON {nom} ("timestamp" DESC, id DESC)')
+
+
+def _creer_partition_postgresql(conn, mois):
+    conn.exec_driver_sql(
+        f"CREATE TABLE {_nom_partition(mois)} PARTITION OF {TABLE} "
+        f"FOR VALUES FROM ('{mois.isoformat()}') TO ('{_mois_suivant(mois).isoformat()}')"
+    )
+
+
+def upgrade():
+    conn = op.get_bind()
+    sqlite = conn.dialect.name == "sqlite"
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} RENAME TO {ANCIEN}")
+    conn.exec_driver_sql(f"DROP INDEX IF EXISTS ix_{TABLE}_id")
+    conn.exec_driver_sql(
+        f'UPDATE {ANCIEN} SET "timestamp" = COALESCE((SELECT MIN("timestamp") FROM {ANCIEN}), CURRENT_TIMESTAMP) '
+        f'WHERE "timestamp" IS NULL'
+    )
+    if not sqlite:
+        conn.exec_driver_sql(
+            f'CREATE TABLE {TABLE} (id BIGSERIAL, "timestamp" TIMESTAMP NOT NULL, '
+            f'user_id INTEGER REFERENCES users (id), action TEXT NOT NULL, PRIMARY KEY (id, "timestamp")) '
+            f'PARTITION BY RANGE ("timestamp")'
+        )
+        conn.exec_driver_sql(f'CREATE INDEX ix_{TABLE}_timestamp ON {TABLE} ("timestamp" DESC, id DESC)')
+
+    # Mois de l'historique, plus le mois courant et le suivant
+    courant = _premier_jour(datetime.datetime.utcnow())
+    couverts = {courant, _mois_suivant(courant)}
+    debut, fin = conn.exec_driver_sql(f'SELECT MIN("timestamp"), MAX("timestamp") FROM {ANCIEN}').one()
+    if debut is not None:
+        if isinstance(debut, str):
+            debut, fin = datetime.datetime.fromisoformat(debut), datetime.datetime.fromisoformat(fin)
+        mois = _premier_jour(debut)
+        while mois <= _premier_jour(fin):
+            couverts.add(mois)
+            mois = _mois_suivant(mois)
+
+    for mois in sorted(couverts):
+        if sqlite:
+            _creer_partition_sqlite(conn, mois)
+            conn.exec_driver_sql(
+                f'INSERT INTO {_nom_partition(mois)} (id, "timestamp", user_id, action) '
+                f'SELECT id, "timestamp", user_id, action FROM {ANCIEN} WHERE "timestamp" >= ? AND "timestamp" < ?',
+                (mois.isoformat(), _mois_suivant(mois).isoformat()),
+            )
+        else:
+            _creer_partition_postgresql(conn, mois)
+
+    if sqlite:
+        branches = [f'SELECT id, "timestamp", user_id, action FROM {_nom_partition(mois)}' for mois in sorted(couverts)]
+        conn.exec_driver_sql(f"CREATE VIEW {TABLE} AS " + " UNION ALL ".join(branches))
+        # Les ids restent uniques d'un mois à l'autre : toutes les séquences repartent du plus grand id copié
+        conn.exec_driver_sql(
+            f"UPDATE sqlite_sequence SET seq = (SELECT COALESCE(MAX(id), 0) FROM {ANCIEN}) WHERE name GLOB '{TABLE}_[0-9]*'"
+        )
+    else:
+        conn.exec_driver_sql(
+            f'INSERT INTO {TABLE} (id, "timestamp", user_id, action) SELECT id, "timestamp", user_id, action FROM {ANCIEN}'
+        )
+        conn.exec_driver_sql(
+            f"SELECT setval(pg_get_serial_sequence('{TABLE}', 'id'), (SELECT COALESCE(MAX(id), 0) + 1 FROM {TABLE}), false)"
+        )
+    conn.exec_driver_sql(f"DROP TABLE {ANCIEN}")
+
+
+def downgrade():
+    conn = op.get_bind()
+    op.create_table(
+        'activite_logs_plat',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('timestamp', sa.TIMESTAMP(), nullable=True),
+        sa.Column('user_id', sa.Integer(), sa.ForeignKey('users.id'), nullable=True),
+        sa.Column('action', sa.Text(), nullable=False),
+    )
+    op.execute('INSERT INTO activite_logs_plat (id, "timestamp", user_id, action) SELECT id, "timestamp", user_id, action FROM activite_logs')
+    mois_existants = _partitions(conn)
+    op.execute("DROP VIEW activite_logs" if conn.dialect.name == "sqlite" else "DROP TABLE activite_logs")
+    for mois in mois_existants:
+        op.execute(f"DROP TABLE IF EXISTS {_nom_partition(mois)}")
+    op.rename_table('activite_logs_plat', 'activite_logs')
+    op.create_index('ix_activite_logs_id', 'activite_logs', ['id'])
@@ -0,0 +1,29 @@
+"""date_visite obligatoire
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18
+
+La pagination des visites repose sur (date_visite, id) : une visite sans date ne peut
+pas être mise dans un curseur et échappe à la comparaison de tuples. Les visites
+existantes sans date reçoivent leur date de validation, à défaut la date du jour.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("UPDATE visites SET date_visite = COALESCE(date_validation, CURRENT_DATE) WHERE date_visite IS NULL")
+    with op.batch_alter_table('visites') as batch:
+        batch.alter_column('date_visite', existing_type=sa.Date(), nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('visites') as batch:
+        batch.alter_column('date_visite', existing_type=sa.Date(), nullable=True)
@@ -0,0 +1,86 @@
+"""Journal d'activité : ON DELETE SET NULL sur user_id
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-18
+
+Supprimer un utilisateur qui s'est déjà connecté violait la clé étrangère
+activite_logs.user_id (PostgreSQL) : ses entrées du journal sont désormais gardées,
+sans utilisateur.
+  - PostgreSQL : la contrainte est remplacée sur la table partitionnée, qui la
+    propage à ses partitions.
+  - SQLite : les clés étrangères ne se modifient pas ; chaque partition est recréée
+    par copie (ids, séquence et index conservés), puis la vue activite_logs.
+"""
+import re
+
+from alembic import op
+
+
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+TABLE = 'activite_logs'
+MOTIF_PARTITION = re.compile(rf"^{TABLE}_\d{{4}}_\d{{2}}$")
+
+
+def _partitions(conn):
+    noms = conn.exec_driver_sql(
+        "SELECT name FROM sqlite_master WHERE type = 'table' ORDER BY name"
+    ).scalars().all()
+    return [nom for nom in noms if MOTIF_PARTITION.match(nom)]
+
+
+def _reconstruire_sqlite(conn, reference):
+    conn.exec_driver_sql(f"DROP VIEW IF EXISTS {TABLE}")
+    partitions = _partitions(conn)
+    for nom in partitions:
+        seq = conn.exec_driver_sql(f"SELECT seq FROM sqlite_sequence WHERE name = '{nom}'").scalar()
+        conn.exec_driver_sql(
+            f'CREATE TABLE {nom}_nouvelle (id INTEGER PRIMARY KEY AUTOINCREMENT, "timestamp" TIMESTAMP NOT NULL, '
+            f'user_id INTEGER {reference}, action TEXT NOT NULL)'
+        )
+        conn.exec_driver_sql(
+            f'INSERT INTO {nom}_nouvelle (id, "timestamp", user_id, action) SELECT id, "timestamp", user_id, action FROM {nom}'
+        )
+        conn.exec_driver_sql(f"DROP TABLE {nom}")
+        conn.exec_driver_sql(f"ALTER TABLE {nom}_nouvelle RENAME TO {nom}")
+        conn.exec_driver_sql(f'CREATE INDEX ix_{nom}_timestamp ON {nom} ("timestamp" DESC, id DESC)')
+        if seq is not None:
+            # Séquence d'origine, alignée sur tout le journal : elle peut dépasser le plus grand
+            # id de la partition, et doit exister même si la partition est vide
+            conn.exec_driver_sql(f"DELETE FROM sqlite_sequence WHERE name = '{nom}'")
+            conn.exec_driver_sql(f"INSERT INTO sqlite_sequence (name, seq) VALUES ('{nom}', {seq})")
+    branches = [f'SELECT id, "timestamp", user_id, action FROM {nom}' for nom in partitions]
+    if not branches:
+        branches = ['SELECT NULL AS id, NULL AS "timestamp", NULL AS user_id, NULL AS action WHERE 0']
+    conn.exec_driver_sql(f"CREATE VIEW {TABLE} AS " + " UNION ALL ".join(branches))
+
+
+def _remplacer_contrainte_postgresql(conn, reference):
+    # Contrainte du parent seulement : celles des partitions en héritent (conparentid)
+    noms = conn.exec_driver_sql(
+        f"SELECT conname FROM pg_constraint WHERE conrelid = '{TABLE}'::regclass AND contype = 'f' "
+        f"AND conparentid = 0 AND confrelid = 'users'::regclass"
+    ).scalars().all()
+    for nom in noms:
+        conn.exec_driver_sql(f'ALTER TABLE {TABLE} DROP CONSTRAINT "{nom}"')
+    conn.exec_driver_sql(f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fkey FOREIGN KEY (user_id) {reference}")
+
+
+def _changer_reference(reference):
+    conn = op.get_bind()
+    if conn.dialect.name == "sqlite":
+        _reconstruire_sqlite(conn, reference)
+    else:
+        _remplacer_contrainte_postgresql(conn, reference)
+
+
+def upgrade():
+    _changer_reference("REFERENCES users (id) ON DELETE SET NULL")
+
+
+def downgrade():
+    _changer_reference("REFERENCES users (id)")
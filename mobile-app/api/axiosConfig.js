@@ -3,6 +3,11 @@ import AsyncStorage from '@react-native-async-storage/async-storage';
 
 const axiosInstance = axios.create(); // On ne met PAS de baseURL ici
 
+// Jeton de dernière écriture (en-tête X-Last-Write) renvoyé par l'API après une écriture :
+// représenté aux requêtes suivantes, il fait lire nos propres écritures (la visite qui
+// vient d'être soumise) sur le primaire, quel que soit le serveur qui répond.
+let lastWrite = null;
+
 // --- INTERCEPTEUR DE REQUÊTE DYNAMIQUE ---
 axiosInstance.interceptors.request.use(
   async (config) => {
@@ -20,6 +25,9 @@ axiosInstance.interceptors.request.use(
     if (token) {
       config.headers.Authorization = `Bearer ${token}`;
     }
+    if (lastWrite) {
+      config.headers['X-Last-Write'] = lastWrite;
+    }
     
     return config;
   },
@@ -28,4 +36,12 @@ axiosInstance.interceptors.request.use(
   }
 );
 
+// --- INTERCEPTEUR DE RÉPONSE : garde le dernier jeton d'écriture reçu ---
+axiosInstance.interceptors.response.use((response) => {
+  if (response.headers['x-last-write']) {
+    lastWrite = response.headers['x-last-write'];
+  }
+  return response;
+});
+
 export default axiosInstance;
\ No newline at end of file
@@ -0,0 +1,48 @@
+import AsyncStorage from '@react-native-async-storage/async-storage';
+import axiosInstance from './axiosConfig';
+
+// Catalogue de référence (clients, produits, catégories, concurrents) gardé sur
+// l'appareil et mis à jour par /sync/reference : seules les modifications depuis la
+// dernière synchronisation sont téléchargées, page par page.
+const STORAGE_KEY = 'referenceData';
+const TABLES = ['categories_produit', 'produits', 'concurrents', 'clients'];
+
+const emptyReference = (apiUrl) => ({ apiUrl, since: null, ...Object.fromEntries(TABLES.map(table => [table, {}])) });
+
+// Catalogue stocké, utilisable hors connexion (vide si l'adresse du serveur a changé)
+export const loadReference = async () => {
+  const apiUrl = await AsyncStorage.getItem('apiUrl');
+  const raw = await AsyncStorage.getItem(STORAGE_KEY);
+  const reference = raw ? JSON.parse(raw) : null;
+  return reference && reference.apiUrl === apiUrl ? reference : emptyReference(apiUrl);
+};
+
+export const syncReference = async () => {
+  let reference = await loadReference();
+  let hasMore = true;
+  while (hasMore) {
+    let data;
+    try {
+      const params = reference.since ? { since: reference.since } : {};
+      ({ data } = await axiosInstance.get('/sync/reference', { params }));
+    } catch (error) {
+      // Jeton refusé par le serveur : on repart d'une synchronisation complète
+      if (error.response?.status === 400 && reference.since) {
+        reference = emptyReference(reference.apiUrl);
+        continue;
+      }
+      throw error;
+    }
+    TABLES.forEach(table => data[table].forEach(item => { reference[table][item.id] = item; }));
+    data.suppressions.forEach(({ table, id }) => { delete reference[table]?.[id]; });
+    reference.since = data.next_since;
+    hasMore = data.has_more;
+    // Sauvegarde à chaque page : une synchronisation interrompue reprend où elle s'est arrêtée
+    await AsyncStorage.setItem(STORAGE_KEY, JSON.stringify(reference));
+  }
+  return reference;
+};
+
+// Éléments d'une table du catalogue, triés par `key`
+export const referenceList = (reference, table, key) =>
+  Object.values(reference[table]).sort((a, b) => String(a[key]).localeCompare(String(b[key])));
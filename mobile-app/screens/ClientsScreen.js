@@ -1,15 +1,9 @@
-import React, { useState, useEffect, useContext } from 'react';
+import React, { useState, useEffect } from 'react';
 import { View, Text, StyleSheet, FlatList, ActivityIndicator, SafeAreaView, TouchableOpacity } from 'react-native';
-import axios from 'axios';
-import { AuthContext } from '../context/AuthContext';
-import axiosInstance from '../api/axiosConfig';
+import { loadReference, referenceList, syncReference } from '../api/referenceSync';
 import Ionicons from 'react-native-vector-icons/Ionicons';
 import { useNavigation } from '@react-navigation/native'; // Il manque cet import !
 
-// --- À CONFIGURER ---
-const API_URL = 'http://10.89.65.117:8000'; 
-// --------------------
-
 // --- CORRECTION N°1 : ClientItem doit accepter 'client' et 'onPress' ---
 const ClientItem = ({ client, onPress }) => (
   <TouchableOpacity style={styles.itemContainer} onPress={onPress}>
@@ -29,7 +23,6 @@ export default function ClientsScreen() {
   const [clients, setClients] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
   const [error, setError] = useState(null);
-  const { userToken } = useContext(AuthContext);
   
   // Il faut initialiser la navigation ici
   const navigation = useNavigation();
@@ -42,24 +35,22 @@ export default function ClientsScreen() {
     });
   };
 
-  // Cette fonction va chercher les données sur le backend
+  // Synchronise le catalogue local avec le backend (seules les modifications sont téléchargées)
   const fetchClients = async () => {
     try {
       setIsLoading(true);
       setError(null);
-      
-      const response = await axios.get(`${API_URL}/clients/`, {
-        headers: {
-          // On ajoute le token à la requête pour être autorisé
-          'Authorization': `Bearer ${userToken}`
-        }
-      });
-      
-      setClients(response.data); // On stocke la liste des clients dans notre état
-
+      const reference = await syncReference();
+      setClients(referenceList(reference, 'clients', 'nom_client'));
     } catch (e) {
-      console.error("Erreur lors de la récupération des clients", e);
-      setError("Impossible de charger la liste des clients.");
+      console.error("Erreur lors de la synchronisation des clients", e);
+      // Hors connexion : on affiche la dernière liste synchronisée, s'il y en a une
+      const clientsLocaux = referenceList(await loadReference(), 'clients', 'nom_client');
+      if (clientsLocaux.length) {
+        setClients(clientsLocaux);
+      } else {
+        setError("Impossible de charger la liste des clients.");
+      }
     } finally {
       setIsLoading(false);
     }
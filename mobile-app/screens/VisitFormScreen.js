@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { View, Text, StyleSheet, TouchableOpacity, ScrollView, Alert, ActivityIndicator, TextInput, SafeAreaView, Switch } from 'react-native';
 import axiosInstance from '../api/axiosConfig';
+import { loadReference, referenceList, syncReference } from '../api/referenceSync';
 import RNPickerSelect from 'react-native-picker-select';
 import Ionicons from 'react-native-vector-icons/Ionicons';
 
@@ -87,12 +88,12 @@ export default function VisitFormScreen({ route, navigation }) {
   useEffect(() => {
     const fetchData = async () => {
       try {
-        const [produitsRes, concurrentsRes] = await Promise.all([
-          axiosInstance.get('/produits/'),
-          axiosInstance.get('/concurrents/')
-        ]);
-        setProduitsForPicker(produitsRes.data.map(p => ({ label: p.nom_produit, value: p.id })));
-        setConcurrentsForPicker(concurrentsRes.data.map(c => ({ label: c.nom, value: c.id })));
+        // Catalogue local synchronisé ; hors connexion, la dernière version stockée
+        const reference = await syncReference().catch(() => loadReference());
+        const produits = referenceList(reference, 'produits', 'nom_produit');
+        if (!produits.length) throw new Error("Catalogue vide");
+        setProduitsForPicker(produits.map(p => ({ label: p.nom_produit, value: p.id })));
+        setConcurrentsForPicker(referenceList(reference, 'concurrents', 'nom').map(c => ({ label: c.nom, value: c.id })));
       } catch (error) { Alert.alert("Erreur", "Impossible de charger les données initiales."); }
       finally { setIsLoading(false); }
     };
@@ -9,6 +9,11 @@ const axiosInstance = axios.create({
   baseURL: API_URL,
 });
 
+// Jeton de dernière écriture (en-tête X-Last-Write) renvoyé par l'API après une écriture :
+// représenté aux requêtes suivantes, il fait lire nos propres écritures sur le primaire,
+// quel que soit le serveur qui répond.
+let lastWrite = null;
+
 // --- L'INTERCEPTEUR DE REQUÊTE ---
 // C'est cette partie qui ajoute le token
 axiosInstance.interceptors.request.use(
@@ -20,6 +25,9 @@ axiosInstance.interceptors.request.use(
     if (token) {
       config.headers['Authorization'] = `Bearer ${token}`;
     }
+    if (lastWrite) {
+      config.headers['X-Last-Write'] = lastWrite;
+    }
     
     // 3. On retourne la configuration (avec ou sans token)
     return config;
@@ -30,4 +38,13 @@ axiosInstance.interceptors.request.use(
   }
 );
 
+// --- L'INTERCEPTEUR DE RÉPONSE ---
+// Garde le dernier jeton d'écriture reçu
+axiosInstance.interceptors.response.use((response) => {
+  if (response.headers['x-last-write']) {
+    lastWrite = response.headers['x-last-write'];
+  }
+  return response;
+});
+
 export default axiosInstance;
\ No newline at end of file
@@ -24,8 +24,8 @@ function AdminDashboardPage() {
         
         // On met à jour l'état des stats
         setStats(statsRes.data);
-        // On met à jour l'état des activités
-        setActivities(activitiesRes.data);
+        // On met à jour l'état des activités (réponse paginée : { items, next_cursor })
+        setActivities(activitiesRes.data.items);
 
       } catch (error) {
         console.error("Erreur chargement données admin:", error);
@@ -5,6 +5,9 @@ import './ManagementPages.css';
 
 Modal.setAppElement('#root');
 
+// Taille des pages de la liste ; une page pleine signale qu'il peut y en avoir d'autres
+const TAILLE_PAGE = 50;
+
 function ClientManagementPage() {
   const [clients, setClients] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
@@ -18,18 +21,29 @@ function ClientManagementPage() {
 
   // État pour la recherche
   const [searchTerm, setSearchTerm] = useState('');
+  const [hasMore, setHasMore] = useState(false);
 
   const fetchData = useCallback(async (query = '') => {
     try {
       if (!query && !clients.length) setIsLoading(true);
-      const response = await axiosInstance.get(`/admin/clients/search?query=${query}`);
+      const response = await axiosInstance.get('/admin/clients/search', { params: { query, limit: TAILLE_PAGE } });
       setClients(response.data);
+      setHasMore(response.data.length === TAILLE_PAGE);
     } catch (error) { console.error("Erreur de chargement:", error); }
     finally { setIsLoading(false); }
   }, [clients.length]);
 
   useEffect(() => { fetchData(); }, [fetchData]);
 
+  // Page suivante de la liste (ou des résultats de la recherche en cours), ajoutée à la suite
+  const fetchMore = async () => {
+    try {
+      const response = await axiosInstance.get('/admin/clients/search', { params: { query: searchTerm, limit: TAILLE_PAGE, offset: clients.length } });
+      setClients(prev => [...prev, ...response.data]);
+      setHasMore(response.data.length === TAILLE_PAGE);
+    } catch (error) { console.error("Erreur de chargement:", error); }
+  };
+
   const handleCreate = async (e) => {
     e.preventDefault();
     try {
@@ -102,6 +116,9 @@ function ClientManagementPage() {
             ))}
           </tbody>
         </table>
+        {hasMore && (
+          <button onClick={fetchMore} className="action-button">Charger plus</button>
+        )}
       </div>
 
       <Modal isOpen={isModalOpen} onRequestClose={closeEditModal} className="modal" overlayClassName="overlay">
@@ -36,11 +36,12 @@ function DashboardPage({ onLogout }) {
   };
 
   // Préparation des données pour le graphique en barres
+  // (performanceEquipe est une liste par merchandiser : deux homonymes restent distincts)
   const barChartData = {
-    labels: stats ? Object.keys(stats.performanceEquipe) : [],
+    labels: stats ? stats.performanceEquipe.map(m => m.nom) : [],
     datasets: [{
       label: 'Nombre de Visites',
-      data: stats ? Object.values(stats.performanceEquipe) : [],
+      data: stats ? stats.performanceEquipe.map(m => m.visites) : [],
       backgroundColor: 'rgba(0, 123, 255, 0.6)',
       borderColor: 'rgba(0, 123, 255, 1)',
       borderWidth: 1,
@@ -81,7 +82,7 @@ function DashboardPage({ onLogout }) {
           </div>
           <div className="widget chart-widget">
             <h3>Activité de l'Équipe</h3>
-            {stats && Object.keys(stats.performanceEquipe).length > 0 ? (
+            {stats && stats.performanceEquipe.length > 0 ? (
               <Bar options={barChartOptions} data={barChartData} />
             ) : <p>Pas de données de performance à afficher.</p>}
           </div>
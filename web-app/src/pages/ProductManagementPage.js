@@ -5,6 +5,9 @@ import './ManagementPages.css';
 
 Modal.setAppElement('#root');
 
+// Taille des pages de la liste ; une page pleine signale qu'il peut y en avoir d'autres
+const TAILLE_PAGE = 50;
+
 function ProductManagementPage() {
   const [produits, setProduits] = useState([]);
   const [categories, setCategories] = useState([]);
@@ -19,15 +22,17 @@ function ProductManagementPage() {
 
   // État pour la recherche
   const [searchTerm, setSearchTerm] = useState('');
+  const [hasMore, setHasMore] = useState(false);
 
   const fetchData = useCallback(async (query = '') => {
     try {
       if (!query && !produits.length) setIsLoading(true); // Affiche le chargement uniquement la première fois
       const [produitsRes, categoriesRes] = await Promise.all([
-        axiosInstance.get(`/admin/produits/search?query=${query}`),
+        axiosInstance.get('/admin/produits/search', { params: { query, limit: TAILLE_PAGE } }),
         axiosInstance.get('/categories-produit/')
       ]);
       setProduits(produitsRes.data);
+      setHasMore(produitsRes.data.length === TAILLE_PAGE);
       setCategories(categoriesRes.data);
       if (categoriesRes.data.length > 0 && newProduit.categorie_id === '') {
         setNewProduit(prev => ({ ...prev, categorie_id: categoriesRes.data[0].id }));
@@ -41,6 +46,15 @@ function ProductManagementPage() {
     fetchData(); 
   }, [fetchData]); // On ajoute fetchData comme dépendance
 
+  // Page suivante de la liste (ou des résultats de la recherche en cours), ajoutée à la suite
+  const fetchMore = async () => {
+    try {
+      const response = await axiosInstance.get('/admin/produits/search', { params: { query: searchTerm, limit: TAILLE_PAGE, offset: produits.length } });
+      setProduits(prev => [...prev, ...response.data]);
+      setHasMore(response.data.length === TAILLE_PAGE);
+    } catch (error) { console.error("Erreur de chargement:", error); }
+  };
+
   const handleCreate = async (e) => {
     e.preventDefault();
     try {
@@ -118,6 +132,9 @@ function ProductManagementPage() {
             ))}
           </tbody>
         </table>
+        {hasMore && (
+          <button onClick={fetchMore} className="action-button">Charger plus</button>
+        )}
       </div>
 
       <Modal isOpen={isModalOpen} onRequestClose={closeEditModal} className="modal" overlayClassName="overlay">
@@ -6,17 +6,20 @@ import './ManagementPages.css';
 
 function SupervisorHistoryPage() {
   const [visites, setVisites] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const navigate = useNavigate();
 
+  const fetchHistory = async (cursor = null) => {
+    try {
+      const response = await axiosInstance.get('/superviseur/visites/historique', { params: cursor ? { cursor } : {} });
+      setVisites(prev => (cursor ? [...prev, ...response.data.items] : response.data.items));
+      setNextCursor(response.data.next_cursor);
+    } catch (error) { console.error(error); }
+    finally { setIsLoading(false); }
+  };
+
   useEffect(() => {
-    const fetchHistory = async () => {
-      try {
-        const response = await axiosInstance.get('/superviseur/visites/historique');
-        setVisites(response.data);
-      } catch (error) { console.error(error); } 
-      finally { setIsLoading(false); }
-    };
     fetchHistory();
   }, []);
 
@@ -73,6 +76,9 @@ function SupervisorHistoryPage() {
           ))}
         </tbody>
       </table>
+      {nextCursor && (
+        <button onClick={() => fetchHistory(nextCursor)} className="action-button">Charger plus</button>
+      )}
     </div>
   );
 }
@@ -5,6 +5,9 @@ import './ManagementPages.css';
 
 Modal.setAppElement('#root');
 
+// Taille des pages de la liste ; une page pleine signale qu'il peut y en avoir d'autres
+const TAILLE_PAGE = 50;
+
 function UserManagementPage() {
   const [users, setUsers] = useState([]);
   const [roles, setRoles] = useState([]);
@@ -20,6 +23,7 @@ function UserManagementPage() {
   
   // --- État pour la RECHERCHE ---
   const [searchTerm, setSearchTerm] = useState('');
+  const [hasMore, setHasMore] = useState(false);
 
   // Fonction de chargement des données
   const fetchData = useCallback(async (query = '') => {
@@ -29,7 +33,7 @@ function UserManagementPage() {
     try {
       // On lance tous les appels en parallèle
       const [usersRes, rolesRes, superviseursRes] = await Promise.all([
-        axiosInstance.get(`/admin/users/search?query=${query}`),
+        axiosInstance.get('/admin/users/search', { params: { query, limit: TAILLE_PAGE } }),
         axiosInstance.get('/roles/'),
         axiosInstance.get('/superviseurs/')
       ]);
@@ -37,6 +41,7 @@ function UserManagementPage() {
       const filteredRoles = rolesRes.data.filter(r => r.nom.toLowerCase() !== 'administrateur');
       
       setUsers(usersRes.data);
+      setHasMore(usersRes.data.length === TAILLE_PAGE);
       setRoles(filteredRoles);
       setSuperviseurs(superviseursRes.data);
       
@@ -60,6 +65,15 @@ function UserManagementPage() {
     fetchData();
   }, [fetchData]);
   
+  // Page suivante de la liste (ou des résultats de la recherche en cours), ajoutée à la suite
+  const fetchMore = async () => {
+    try {
+      const response = await axiosInstance.get('/admin/users/search', { params: { query: searchTerm, limit: TAILLE_PAGE, offset: users.length } });
+      setUsers(prev => [...prev, ...response.data]);
+      setHasMore(response.data.length === TAILLE_PAGE);
+    } catch (error) { console.error("Erreur de chargement:", error); }
+  };
+
   // --- Logique CRUD ---
   const handleCreateUser = async (event) => {
     event.preventDefault();
@@ -206,6 +220,9 @@ function UserManagementPage() {
             ))}
           </tbody>
         </table>
+        {hasMore && (
+          <button onClick={fetchMore} className="action-button">Charger plus</button>
+        )}
       </div>
       <Modal isOpen={isModalOpen} onRequestClose={closeEditModal} className="modal" overlayClassName="overlay">
         {editingUser && (
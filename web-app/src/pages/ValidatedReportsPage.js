@@ -7,22 +7,25 @@ import './ManagementPages.css'; // On réutilise le même style que les autres p
 
 function ValidatedReportsPage() {
   const [visites, setVisites] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const navigate = useNavigate();
 
+  // La route est paginée par curseur : chaque page s'ajoute à la liste déjà affichée.
+  const fetchValidatedVisites = async (cursor = null) => {
+    try {
+      const response = await axiosInstance.get('/admin/visites/validees', { params: cursor ? { cursor } : {} });
+      setVisites(prev => (cursor ? [...prev, ...response.data.items] : response.data.items));
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error("Erreur lors du chargement des rapports validés :", error);
+      alert("Impossible de charger les rapports.");
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
   useEffect(() => {
-    const fetchValidatedVisites = async () => {
-      try {
-        // On appelle la nouvelle route pour les rapports validés
-        const response = await axiosInstance.get('/admin/visites/validees');
-        setVisites(response.data);
-      } catch (error) {
-        console.error("Erreur lors du chargement des rapports validés :", error);
-        alert("Impossible de charger les rapports.");
-      } finally {
-        setIsLoading(false);
-      }
-    };
     fetchValidatedVisites();
   }, []);
 
@@ -74,6 +77,9 @@ function ValidatedReportsPage() {
         ) : (
           <p>Aucun rapport validé trouvé dans l'historique.</p>
         )}
+        {nextCursor && (
+          <button onClick={() => fetchValidatedVisites(nextCursor)} className="action-button">Charger plus</button>
+        )}
       </div>
     </div>
   );
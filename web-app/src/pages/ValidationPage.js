@@ -5,20 +5,24 @@ import './ValidationPage.css'; // On importe le fichier de style
 
 function ValidationPage() {
   const [visites, setVisites] = useState([]);
+  const [nextCursor, setNextCursor] = useState(null);
   const [isLoading, setIsLoading] = useState(true);
   const navigate = useNavigate();
 
+  // La liste est paginée par curseur : on ajoute chaque nouvelle page à la suite.
+  const fetchVisites = async (cursor = null) => {
+    try {
+      const response = await axiosInstance.get('/superviseur/visites/en-attente', { params: cursor ? { cursor } : {} });
+      setVisites(prev => (cursor ? [...prev, ...response.data.items] : response.data.items));
+      setNextCursor(response.data.next_cursor);
+    } catch (error) {
+      console.error(error);
+    } finally {
+      setIsLoading(false);
+    }
+  };
+
   useEffect(() => {
-    const fetchVisites = async () => {
-      try {
-        const response = await axiosInstance.get('/superviseur/visites/en-attente');
-        setVisites(response.data);
-      } catch (error) {
-        console.error(error);
-      } finally {
-        setIsLoading(false);
-      }
-    };
     fetchVisites();
   }, []);
 
@@ -66,6 +70,9 @@ function ValidationPage() {
         ) : (
           <p className="no-data-message">🎉 Aucun rapport en attente pour le moment !</p>
         )}
+        {nextCursor && (
+          <button onClick={() => fetchVisites(nextCursor)} className="action-button">Charger plus</button>
+        )}
       </main>
     </div>
   );